@@ -148,6 +148,8 @@ def stringify_timecode(timecode, timecode_sub):
 
 # MoCap Frame Classes
 class FramePrefixData:
+    __slots__ = ('frame_number',)
+
     def __init__(self, frame_number):
         self.frame_number = frame_number
 
@@ -158,6 +160,8 @@ class FramePrefixData:
 
 
 class MarkerData:
+    __slots__ = ('model_name', 'marker_pos_list')
+
     def __init__(self):
         self.model_name = ""
         self.marker_pos_list = []
@@ -165,8 +169,10 @@ class MarkerData:
     def set_model_name(self, model_name):
         self.model_name = model_name
 
-    def add_pos(self, pos):
-        self.marker_pos_list.append(copy.deepcopy(pos))
+    def add_pos(self, pos, take_ownership=False):
+        if not take_ownership:
+            pos = copy.deepcopy(pos)
+        self.marker_pos_list.append(pos)
         return len(self.marker_pos_list)
 
     def get_num_points(self):
@@ -191,17 +197,21 @@ class MarkerData:
 
 
 class MarkerSetData:
+    __slots__ = ('marker_data_list', 'unlabeled_markers')
+
     def __init__(self):
         self.marker_data_list = []
         self.unlabeled_markers = MarkerData()
         self.unlabeled_markers.set_model_name("")
 
-    def add_marker_data(self, marker_data):
-        self.marker_data_list.append(copy.deepcopy(marker_data))
+    def add_marker_data(self, marker_data, take_ownership=False):
+        if not take_ownership:
+            marker_data = copy.deepcopy(marker_data)
+        self.marker_data_list.append(marker_data)
         return len(self.marker_data_list)
 
-    def add_unlabeled_marker(self, pos):
-        self.unlabeled_markers.add_pos(pos)
+    def add_unlabeled_marker(self, pos, take_ownership=False):
+        self.unlabeled_markers.add_pos(pos, take_ownership)
 
     def get_marker_set_count(self):
         return len(self.marker_data_list)
@@ -230,11 +240,15 @@ class MarkerSetData:
 
 
 class LegacyMarkerData:
+    __slots__ = ('marker_pos_list',)
+
     def __init__(self):
         self.marker_pos_list = []
 
-    def add_pos(self, pos):
-        self.marker_pos_list.append(copy.deepcopy(pos))
+    def add_pos(self, pos, take_ownership=False):
+        if not take_ownership:
+            pos = copy.deepcopy(pos)
+        self.marker_pos_list.append(pos)
         return len(self.marker_pos_list)
 
     def get_marker_count(self):
@@ -255,6 +269,8 @@ class LegacyMarkerData:
 
 
 class RigidBodyMarker:
+    __slots__ = ('pos', 'id_num', 'size', 'error', 'marker_num')
+
     def __init__(self):
         self.pos = [0.0, 0.0, 0.0]
         self.id_num = 0
@@ -278,6 +294,9 @@ class RigidBodyMarker:
 
 
 class RigidBody:
+    __slots__ = ('id_num', 'pos', 'rot', 'rb_marker_list', 'tracking_valid',
+                 'error', 'marker_num')
+
     def __init__(self, new_id, pos, rot):
         self.id_num = new_id
         self.pos = pos
@@ -287,8 +306,10 @@ class RigidBody:
         self.error = 0.0
         self.marker_num = -1
 
-    def add_rigid_body_marker(self, rigid_body_marker):
-        self.rb_marker_list.append(copy.deepcopy(rigid_body_marker))
+    def add_rigid_body_marker(self, rigid_body_marker, take_ownership=False):
+        if not take_ownership:
+            rigid_body_marker = copy.deepcopy(rigid_body_marker)
+        self.rb_marker_list.append(rigid_body_marker)
         return len(self.rb_marker_list)
 
     def get_as_string(self, tab_str=0, level=0):
@@ -333,11 +354,15 @@ class RigidBody:
 
 
 class RigidBodyData:
+    __slots__ = ('rigid_body_list',)
+
     def __init__(self):
         self.rigid_body_list = []
 
-    def add_rigid_body(self, rigid_body):
-        self.rigid_body_list.append(copy.deepcopy(rigid_body))
+    def add_rigid_body(self, rigid_body, take_ownership=False):
+        if not take_ownership:
+            rigid_body = copy.deepcopy(rigid_body)
+        self.rigid_body_list.append(rigid_body)
         return len(self.rigid_body_list)
 
     def get_rigid_body_count(self):
@@ -357,13 +382,54 @@ class RigidBodyData:
         return out_str
 
 
+class RigidBodyArrays:
+    """Rigid body data decoded as arrays instead of per-body objects.
+
+    block is a structured array with id, pos, rot, error and param fields,
+    the fields are views into block. block owns its memory, a copy of the
+    packet's records, so the arrays stay valid after the receive buffer the
+    packet was decoded from is reused."""
+    __slots__ = ('block', 'ids', 'positions', 'orientations', 'errors',
+                 'tracking_valid')
+
+    def __init__(self, block):
+        self.block = block
+        self.ids = block['id']
+        self.positions = block['pos']
+        self.orientations = block['rot']
+        self.errors = block['error']
+        self.tracking_valid = (block['param'] & 0x01) != 0
+
+    def get_rigid_body_count(self):
+        return len(self.block)
+
+    def to_rigid_body_data(self):
+        """Build the object based RigidBodyData for callers that need it"""
+        rigid_body_data = RigidBodyData()
+        for i in range(len(self.block)):
+            rigid_body = RigidBody(int(self.ids[i]),
+                                   tuple(self.positions[i].tolist()),
+                                   tuple(self.orientations[i].tolist()))
+            rigid_body.error = float(self.errors[i])
+            rigid_body.tracking_valid = bool(self.tracking_valid[i])
+            rigid_body_data.add_rigid_body(rigid_body)
+        return rigid_body_data
+
+    def get_as_string(self, tab_str="  ", level=0):
+        return self.to_rigid_body_data().get_as_string(tab_str, level)
+
+
 class Skeleton:
+    __slots__ = ('id_num', 'rigid_body_list')
+
     def __init__(self, new_id=0):
         self.id_num = new_id
         self.rigid_body_list = []
 
-    def add_rigid_body(self, rigid_body):
-        self.rigid_body_list.append(copy.deepcopy(rigid_body))
+    def add_rigid_body(self, rigid_body, take_ownership=False):
+        if not take_ownership:
+            rigid_body = copy.deepcopy(rigid_body)
+        self.rigid_body_list.append(rigid_body)
         return len(self.rigid_body_list)
 
     def get_as_string(self, tab_str="  ", level=0):
@@ -381,11 +447,15 @@ class Skeleton:
 
 
 class SkeletonData:
+    __slots__ = ('skeleton_list',)
+
     def __init__(self):
         self.skeleton_list = []
 
-    def add_skeleton(self, new_skeleton):
-        self.skeleton_list.append(copy.deepcopy(new_skeleton))
+    def add_skeleton(self, new_skeleton, take_ownership=False):
+        if not take_ownership:
+            new_skeleton = copy.deepcopy(new_skeleton)
+        self.skeleton_list.append(new_skeleton)
 
     def get_skeleton_count(self):
         return len(self.skeleton_list)
@@ -405,6 +475,9 @@ class SkeletonData:
 
 
 class AssetMarkerData:
+    __slots__ = ('marker_id', 'pos', 'marker_size', 'marker_params',
+                 'residual', 'marker_num')
+
     def __init__(self, marker_id, pos, marker_size=0.0, marker_params=0,
                  residual=0.0, marker_num=-1):
         self.marker_id = marker_id
@@ -443,6 +516,8 @@ class AssetMarkerData:
 
 
 class AssetRigidBodyData:
+    __slots__ = ('id_num', 'pos', 'rot', 'mean_error', 'param', 'rb_num')
+
     def __init__(self, new_id, pos, rot, mean_error=0.0, param=0):
         self.id_num = new_id
         self.pos = pos
@@ -471,6 +546,8 @@ class AssetRigidBodyData:
 
 
 class Asset:
+    __slots__ = ('asset_id', 'rigid_body_list', 'marker_list')
+
     def __init__(self):
         self.asset_id = 0
         self.rigid_body_list = []
@@ -479,12 +556,16 @@ class Asset:
     def set_id(self, new_id):
         self.asset_id = new_id
 
-    def add_rigid_body(self, rigid_body):
-        self.rigid_body_list.append(copy.deepcopy(rigid_body))
+    def add_rigid_body(self, rigid_body, take_ownership=False):
+        if not take_ownership:
+            rigid_body = copy.deepcopy(rigid_body)
+        self.rigid_body_list.append(rigid_body)
         return len(self.rigid_body_list)
 
-    def add_marker(self, marker):
-        self.marker_list.append(copy.deepcopy(marker))
+    def add_marker(self, marker, take_ownership=False):
+        if not take_ownership:
+            marker = copy.deepcopy(marker)
+        self.marker_list.append(marker)
         return len(self.marker_list)
 
     def get_rigid_body_count(self):
@@ -518,11 +599,15 @@ class Asset:
 
 
 class AssetData:
+    __slots__ = ('asset_list',)
+
     def __init__(self):
         self.asset_list = []
 
-    def add_asset(self, new_asset):
-        self.asset_list.append(copy.deepcopy(new_asset))
+    def add_asset(self, new_asset, take_ownership=False):
+        if not take_ownership:
+            new_asset = copy.deepcopy(new_asset)
+        self.asset_list.append(new_asset)
 
     def get_asset_count(self):
         return len(self.asset_list)
@@ -542,6 +627,8 @@ class AssetData:
 
 
 class LabeledMarker:
+    __slots__ = ('id_num', 'pos', 'size', 'param', 'residual', 'marker_num')
+
     def __init__(self, new_id, pos, size=0.0, param=0, residual=0.0):
         self.id_num = new_id
         self.pos = pos
@@ -591,11 +678,15 @@ class LabeledMarker:
 
 
 class LabeledMarkerData:
+    __slots__ = ('labeled_marker_list',)
+
     def __init__(self):
         self.labeled_marker_list = []
 
-    def add_labeled_marker(self, labeled_marker):
-        self.labeled_marker_list.append(copy.deepcopy(labeled_marker))
+    def add_labeled_marker(self, labeled_marker, take_ownership=False):
+        if not take_ownership:
+            labeled_marker = copy.deepcopy(labeled_marker)
+        self.labeled_marker_list.append(labeled_marker)
         return len(self.labeled_marker_list)
 
     def get_labeled_marker_count(self):
@@ -616,12 +707,16 @@ class LabeledMarkerData:
 
 
 class ForcePlateChannelData:
+    __slots__ = ('frame_list',)
+
     def __init__(self):
         # list of floats
         self.frame_list = []
 
-    def add_frame_entry(self, frame_entry):
-        self.frame_list.append(copy.deepcopy(frame_entry))
+    def add_frame_entry(self, frame_entry, take_ownership=False):
+        if not take_ownership:
+            frame_entry = copy.deepcopy(frame_entry)
+        self.frame_list.append(frame_entry)
         return len(self.frame_list)
 
     def get_as_string(self, tab_str, level, channel_num=-1):
@@ -645,12 +740,16 @@ class ForcePlateChannelData:
 
 
 class ForcePlate:
+    __slots__ = ('id_num', 'channel_data_list')
+
     def __init__(self, new_id=0):
         self.id_num = new_id
         self.channel_data_list = []
 
-    def add_channel_data(self, channel_data):
-        self.channel_data_list.append(copy.deepcopy(channel_data))
+    def add_channel_data(self, channel_data, take_ownership=False):
+        if not take_ownership:
+            channel_data = copy.deepcopy(channel_data)
+        self.channel_data_list.append(channel_data)
         return len(self.channel_data_list)
 
     def get_as_string(self, tab_str, level):
@@ -667,11 +766,15 @@ class ForcePlate:
 
 
 class ForcePlateData:
+    __slots__ = ('force_plate_list',)
+
     def __init__(self):
         self.force_plate_list = []
 
-    def add_force_plate(self, force_plate):
-        self.force_plate_list.append(copy.deepcopy(force_plate))
+    def add_force_plate(self, force_plate, take_ownership=False):
+        if not take_ownership:
+            force_plate = copy.deepcopy(force_plate)
+        self.force_plate_list.append(force_plate)
         return len(self.force_plate_list)
 
     def get_force_plate_count(self):
@@ -693,12 +796,16 @@ class ForcePlateData:
 
 
 class DeviceChannelData:
+    __slots__ = ('frame_list',)
+
     def __init__(self):
         # list of floats
         self.frame_list = []
 
-    def add_frame_entry(self, frame_entry):
-        self.frame_list.append(copy.deepcopy(frame_entry))
+    def add_frame_entry(self, frame_entry, take_ownership=False):
+        if not take_ownership:
+            frame_entry = copy.deepcopy(frame_entry)
+        self.frame_list.append(frame_entry)
         return len(self.frame_list)
 
     def get_as_string(self, tab_str, level, channel_num=-1):
@@ -722,12 +829,16 @@ class DeviceChannelData:
 
 
 class Device:
+    __slots__ = ('id_num', 'channel_data_list')
+
     def __init__(self, new_id):
         self.id_num = new_id
         self.channel_data_list = []
 
-    def add_channel_data(self, channel_data):
-        self.channel_data_list.append(copy.deepcopy(channel_data))
+    def add_channel_data(self, channel_data, take_ownership=False):
+        if not take_ownership:
+            channel_data = copy.deepcopy(channel_data)
+        self.channel_data_list.append(channel_data)
         return len(self.channel_data_list)
 
     def get_as_string(self, tab_str, level, device_num):
@@ -746,11 +857,15 @@ class Device:
 
 
 class DeviceData:
+    __slots__ = ('device_list',)
+
     def __init__(self):
         self.device_list = []
 
-    def add_device(self, device):
-        self.device_list.append(copy.deepcopy(device))
+    def add_device(self, device, take_ownership=False):
+        if not take_ownership:
+            device = copy.deepcopy(device)
+        self.device_list.append(device)
         return len(self.device_list)
 
     def get_device_count(self):
@@ -769,6 +884,12 @@ class DeviceData:
 
 
 class FrameSuffixData:
+    __slots__ = ('timecode', 'timecode_sub', 'timestamp',
+                 'stamp_camera_mid_exposure', 'stamp_data_received',
+                 'stamp_transmit', 'prec_timestamp_secs',
+                 'prec_timestamp_frac_secs', 'param', 'is_recording',
+                 'tracked_models_changed')
+
     def __init__(self):
         self.timecode = -1
         self.timecode_sub = -1
@@ -822,6 +943,11 @@ class FrameSuffixData:
 
 
 class MoCapData:
+    __slots__ = ('prefix_data', 'marker_set_data', 'legacy_other_markers',
+                 'rigid_body_data', 'asset_data', 'skeleton_data',
+                 'labeled_marker_data', 'force_plate_data', 'device_data',
+                 'suffix_data')
+
     def __init__(self):
         # Packet Parts
         self.prefix_data = None
@@ -0,0 +1,246 @@
+# Latest-frame ring buffer between the NatNet receive thread and a consumer
+#
+# One writer (the thread decoding packets) and any number of readers.
+# Every slot is preallocated, the writer never waits on a reader and a
+# reader never takes a lock. A slot is published by storing its sequence
+# number after the data is written; single attribute stores are atomic
+# under the GIL, so readers only ever see whole frames.
+
+import time
+import threading
+import numpy as np
+
+
+class RigidBodyFrame:
+    """Rigid bodies of one decoded frame.
+
+    The arrays are views into a FrameBuffer slot. They stay valid until the
+    writer wraps around to the slot again, is_current() tells whether that
+    has happened."""
+    def __init__(self, frame_buffer, sequence, slot):
+        count = frame_buffer.counts[slot]
+        self.frame_buffer = frame_buffer
+        self.sequence = sequence
+        self.slot = slot
+        self.frame_number = int(frame_buffer.frame_numbers[slot])
+        self.timestamp = float(frame_buffer.timestamps[slot])
+        self.receive_time = float(frame_buffer.receive_times[slot])
+        self.decode_time = float(frame_buffer.decode_times[slot])
+        self.timecode = int(frame_buffer.timecodes[slot])
+        self.timecode_sub = int(frame_buffer.timecode_subs[slot])
+        # Seconds, NaN if the server doesn't stamp its frames
+        self.motive_latency = float(frame_buffer.motive_latencies[slot])
+        self.transmit_time = float(frame_buffer.transmit_times[slot])
+        self.ids = frame_buffer.ids[slot, :count]
+        self.positions = frame_buffer.positions[slot, :count]
+        self.orientations = frame_buffer.orientations[slot, :count]
+        self.errors = frame_buffer.errors[slot, :count]
+        self.tracking_valid = frame_buffer.tracking_valid[slot, :count]
+
+    def is_current(self):
+        return self.frame_buffer.slot_sequences[self.slot] == self.sequence
+
+    def get_age(self):
+        """Seconds since the frame was decoded"""
+        return time.perf_counter() - self.receive_time
+
+    def get_rigid_body_count(self):
+        return len(self.ids)
+
+
+class FrameBuffer:
+    def __init__(self, capacity=256, max_rigid_bodies=64):
+        self.capacity = capacity
+        self.max_rigid_bodies = max_rigid_bodies
+
+        # Sequence number stored in each slot, -1 while empty or being written
+        self.slot_sequences = np.full(capacity, -1, dtype=np.int64)
+        self.frame_numbers = np.zeros(capacity, dtype=np.int64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.receive_times = np.zeros(capacity, dtype=np.float64)
+        # perf_counter time the frame was pushed, i.e. decoding ended
+        self.decode_times = np.zeros(capacity, dtype=np.float64)
+        self.timecodes = np.zeros(capacity, dtype=np.int64)
+        self.timecode_subs = np.zeros(capacity, dtype=np.int64)
+        # Mid-exposure to transmit on the server, and the transmit time in
+        # seconds of the server's clock
+        self.motive_latencies = np.full(capacity, np.nan)
+        self.transmit_times = np.full(capacity, np.nan)
+        self.counts = np.zeros(capacity, dtype=np.int32)
+        self.ids = np.zeros((capacity, max_rigid_bodies), dtype=np.int32)
+        self.positions = np.zeros((capacity, max_rigid_bodies, 3), dtype=np.float32) #type: ignore  # noqa E501
+        self.orientations = np.zeros((capacity, max_rigid_bodies, 4), dtype=np.float32) #type: ignore  # noqa E501
+        self.errors = np.zeros((capacity, max_rigid_bodies), dtype=np.float32)
+        self.tracking_valid = np.zeros((capacity, max_rigid_bodies), dtype=bool)
+
+        # Number of frames published, the newest frame is write_sequence - 1
+        self.write_sequence = 0
+        # Newest sequence handed out by get_since
+        self.read_sequence = -1
+        self.last_frame_number = None
+        # Frame number last seen at each frame number modulo capacity, tells
+        # a late frame from a duplicate
+        self.seen_frame_numbers = np.full(capacity, -1, dtype=np.int64)
+
+        # Frames missing from the stream (gaps in the frame number)
+        self.dropped_frame_count = 0
+        # Frames that arrived after a newer one, not published
+        self.reordered_frame_count = 0
+        # Times the frame numbers started over (Motive restarted or looped
+        # a take), a frame more than capacity frames older than the newest
+        self.restart_count = 0
+        # Frames overwritten before get_since returned them
+        self.overwritten_frame_count = 0
+        # Frames with more rigid bodies than max_rigid_bodies
+        self.truncated_frame_count = 0
+
+        # Set on every publish so a consumer can sleep until the next frame
+        self.new_frame_event = threading.Event()
+
+    def push(self, frame_number, timestamp, ids, positions, orientations,
+             errors, tracking_valid, receive_time=None, timecode=0,
+             timecode_sub=0, motive_latency=np.nan, transmit_time=np.nan):
+        """Copy one frame into the next slot. Called by the receive thread
+        only, never blocks. A frame that arrives after a newer one is
+        counted and dropped, so the latest frame never goes back in time.
+        Returns whether the frame was published."""
+        decode_time = time.perf_counter()
+        if receive_time is None:
+            receive_time = decode_time
+
+        last_frame_number = self.last_frame_number
+        if last_frame_number is not None and frame_number <= last_frame_number: #type: ignore  # noqa E501
+            if frame_number >= last_frame_number - self.capacity:
+                # A late frame was counted in a gap when its successor came
+                if self.seen_frame_numbers[frame_number % self.capacity] != frame_number: #type: ignore  # noqa E501
+                    self.seen_frame_numbers[frame_number % self.capacity] = frame_number #type: ignore  # noqa E501
+                    self.dropped_frame_count -= 1
+                self.reordered_frame_count += 1
+                return False
+            self.restart_count += 1
+            last_frame_number = None
+
+        sequence = self.write_sequence
+        slot = sequence % self.capacity
+        count = len(ids)
+        if count > self.max_rigid_bodies:
+            count = self.max_rigid_bodies
+            self.truncated_frame_count += 1
+
+        # Invalidate the slot so readers holding an older view notice
+        self.slot_sequences[slot] = -1
+        self.frame_numbers[slot] = frame_number
+        self.timestamps[slot] = timestamp
+        self.receive_times[slot] = receive_time
+        self.decode_times[slot] = decode_time
+        self.timecodes[slot] = timecode
+        self.timecode_subs[slot] = timecode_sub
+        self.motive_latencies[slot] = motive_latency
+        self.transmit_times[slot] = transmit_time
+        self.counts[slot] = count
+        self.ids[slot, :count] = ids[:count]
+        self.positions[slot, :count] = positions[:count]
+        self.orientations[slot, :count] = orientations[:count]
+        self.errors[slot, :count] = errors[:count]
+        self.tracking_valid[slot, :count] = tracking_valid[:count]
+        self.slot_sequences[slot] = sequence
+
+        # Publish
+        self.write_sequence = sequence + 1
+        self.new_frame_event.set()
+
+        if last_frame_number is not None and frame_number > last_frame_number + 1: #type: ignore  # noqa E501
+            self.dropped_frame_count += frame_number - last_frame_number - 1
+        self.last_frame_number = frame_number
+        self.seen_frame_numbers[frame_number % self.capacity] = frame_number #type: ignore  # noqa E501
+        return True
+
+    def push_rigid_body_data(self, frame_number, timestamp, rigid_body_data,
+                             receive_time=None, timecode=0, timecode_sub=0,
+                             motive_latency=np.nan, transmit_time=np.nan):
+        """Push the rigid bodies of a decoded frame, either the
+        RigidBodyArrays of the fast path or an object based RigidBodyData.
+        Returns whether the frame was published."""
+        if hasattr(rigid_body_data, 'block'):
+            return self.push(frame_number, timestamp, rigid_body_data.ids,
+                      rigid_body_data.positions, rigid_body_data.orientations,
+                      rigid_body_data.errors, rigid_body_data.tracking_valid,
+                      receive_time, timecode, timecode_sub, motive_latency,
+                      transmit_time)
+
+        rigid_body_list = rigid_body_data.rigid_body_list
+        return self.push(frame_number, timestamp,
+                  [rigid_body.id_num for rigid_body in rigid_body_list],
+                  [rigid_body.pos for rigid_body in rigid_body_list],
+                  [rigid_body.rot for rigid_body in rigid_body_list],
+                  [rigid_body.error for rigid_body in rigid_body_list],
+                  [rigid_body.tracking_valid for rigid_body in rigid_body_list],
+                  receive_time, timecode, timecode_sub, motive_latency,
+                  transmit_time)
+
+    def __read(self, sequence):
+        slot = sequence % self.capacity
+        if self.slot_sequences[slot] != sequence:
+            return None
+        frame = RigidBodyFrame(self, sequence, slot)
+        # The writer may have wrapped onto the slot while we read it
+        if not frame.is_current():
+            return None
+        return frame
+
+    def get_latest(self, max_age=None):
+        """Newest frame, or None if there is none or it is older than
+        max_age seconds"""
+        sequence = self.write_sequence - 1
+        if sequence < 0:
+            return None
+
+        frame = self.__read(sequence)
+        if frame is None:
+            return None
+        if max_age is not None and frame.get_age() > max_age:
+            return None
+        return frame
+
+    def wait_for_frame(self, sequence, timeout=None):
+        """Block until a frame newer than sequence is published. Returns
+        False on timeout."""
+        if self.write_sequence - 1 > sequence:
+            return True
+        self.new_frame_event.clear()
+        # A frame published between the check and the clear set the event
+        # before it was cleared, check again
+        if self.write_sequence - 1 > sequence:
+            return True
+        return self.new_frame_event.wait(timeout)
+
+    def get_since(self, frame_number):
+        """Frames newer than frame_number still held by the buffer, oldest
+        first"""
+        newest = self.write_sequence - 1
+        oldest = max(0, self.write_sequence - self.capacity)
+
+        frames = []
+        for sequence in range(newest, oldest - 1, -1):
+            frame = self.__read(sequence)
+            if frame is None or frame.frame_number <= frame_number:
+                break
+            frames.append(frame)
+        frames.reverse()
+
+        if frames:
+            first_sequence = frames[0].sequence
+            if first_sequence == oldest and self.read_sequence + 1 < oldest:
+                self.overwritten_frame_count += oldest - max(self.read_sequence + 1, 0) #type: ignore  # noqa E501
+            self.read_sequence = max(self.read_sequence, frames[-1].sequence)
+        return frames
+
+    def get_stats(self):
+        return {
+            "frame_count": self.write_sequence,
+            "dropped_frame_count": self.dropped_frame_count,
+            "reordered_frame_count": self.reordered_frame_count,
+            "restart_count": self.restart_count,
+            "overwritten_frame_count": self.overwritten_frame_count,
+            "truncated_frame_count": self.truncated_frame_count,
+        }
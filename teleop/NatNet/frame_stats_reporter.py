@@ -0,0 +1,46 @@
+# Rate limited frame statistics for the NatNet client
+#
+# A line per frame on stdout costs more than decoding the frame at 240 Hz
+# and up, and scrolls by too fast to read. The reporter prints at most one
+# line per period instead: the latest frame number, the frame rate and the
+# frames missing from the stream since the previous line.
+
+import time
+
+
+class FrameStatsReporter:
+    """Prints "MoCap Frame: N" with the frame rate at most once per period
+    seconds. A period of 0 prints every frame, None never prints."""
+    def __init__(self, period=1.0):
+        self.period = period
+        self.frame_count = 0
+        self.report_count = 0
+        self.last_report_time = None
+        self.last_report_frame_count = 0
+        self.last_dropped_frame_count = 0
+
+    def frame(self, frame_number, now=None, dropped_frame_count=0):
+        """Count a decoded frame at perf_counter time now, print a line if
+        the period has passed. dropped_frame_count is the running total of
+        frames missing from the stream."""
+        self.frame_count += 1
+        if self.period is None:
+            return False
+        if now is None:
+            now = time.perf_counter()
+        if self.last_report_time is None:
+            # First frame, nothing to compute a rate over yet
+            print("MoCap Frame: %d" % frame_number)
+        else:
+            elapsed = now - self.last_report_time
+            if elapsed < self.period:
+                return False
+            frames = self.frame_count - self.last_report_frame_count
+            print("MoCap Frame: %d  %.1f frames/s  %d dropped" % (
+                frame_number, frames / elapsed if elapsed > 0 else 0.0,
+                dropped_frame_count - self.last_dropped_frame_count))
+        self.last_report_time = now
+        self.last_report_frame_count = self.frame_count
+        self.last_dropped_frame_count = dropped_frame_count
+        self.report_count += 1
+        return True
@@ -0,0 +1,251 @@
+# asyncio transport for the NatNet client
+#
+# The sockets are read by the event loop instead of two blocking threads.
+# Packets are decoded by a NatNetClient that has no sockets of its own, so
+# frames still land in its frame buffer and listeners; frames() hands them
+# out as an async iterator too. Requests wait for the server's reply with a
+# timeout and are resent if it doesn't come. NatNet replies carry no request
+# id, so one request is in flight at a time.
+
+import asyncio
+import os
+import socket
+import time
+
+from natnet_client import NatNetClient
+from packet_receiver import size_receive_buffer
+
+# Message IDs answering each request
+RESPONSE_IDS = {
+    NatNetClient.NAT_CONNECT: (NatNetClient.NAT_SERVERINFO,),
+    NatNetClient.NAT_REQUEST: (NatNetClient.NAT_RESPONSE,),
+    NatNetClient.NAT_REQUEST_MODELDEF: (NatNetClient.NAT_MODELDEF,),
+    NatNetClient.NAT_REQUEST_FRAMEOFDATA: (NatNetClient.NAT_FRAMEOFDATA,),
+}
+
+
+def parse_response(data):
+    """Value of a NAT_RESPONSE packet, an int return code or a string"""
+    packet_size = int.from_bytes(data[2:4], byteorder='little', signed=True)
+    if packet_size == 4:
+        return int.from_bytes(data[4:8], byteorder='little', signed=True)
+    return bytes(data[4:]).partition(b'\0')[0].decode('utf-8')
+
+
+class NatNetProtocol(asyncio.DatagramProtocol):
+    """Passes each datagram of a socket to the client with its receive
+    time"""
+    def __init__(self, client):
+        self.client = client
+
+    def datagram_received(self, data, addr):
+        self.client.handle_packet(data, time.perf_counter())
+
+    def error_received(self, exc):
+        self.client.error_count += 1
+
+
+class AsyncNatNetClient:
+    """NatNet client on an asyncio event loop.
+
+        async with AsyncNatNetClient() as client:
+            await client.connect()
+            async for mocap_data, receive_time in client.frames():
+                ...
+
+    Addresses, ports and the connection type are those of the decoder, a
+    NatNetClient (by default configured from natnet_config.yaml). Frames the
+    consumer doesn't take in time are dropped oldest first once
+    frame_queue_size are waiting."""
+    def __init__(self, decoder=None, frame_queue_size=64,
+                 keep_alive_period=1.0):
+        self.decoder = NatNetClient() if decoder is None else decoder
+        self.decoder.set_print_level(0)
+        # Keep any listener the caller set on the decoder
+        self.frame_listener = self.decoder.new_frame_with_data_listener
+        self.decoder.new_frame_with_data_listener = self.__queue_frame
+        self.frame_queue_size = frame_queue_size
+        self.keep_alive_period = keep_alive_period
+
+        self.command_transport = None
+        self.data_transport = None
+        self.keep_alive_task = None
+        self.frame_queue = None
+        self.request_lock = None
+        # (reply message IDs, future) of the request in flight
+        self.pending = None
+        self.closed = False
+
+        self.frame_count = 0
+        self.dropped_frame_count = 0
+        self.timeout_count = 0
+        self.error_count = 0
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    def __create_command_socket(self):
+        decoder = self.decoder
+        result = socket.socket(socket.AF_INET, socket.SOCK_DGRAM,
+                               socket.IPPROTO_UDP)
+        if decoder.server_ip_address == decoder.local_ip_address:
+            result.bind(('', 0))
+        else:
+            result.bind((decoder.local_ip_address, 0))
+        return result
+
+    def __create_data_socket(self):
+        decoder = self.decoder
+        result = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, 0)
+        result.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        result.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                          socket.inet_aton(decoder.multicast_address) +
+                          socket.inet_aton(decoder.local_ip_address))
+        # Linux only delivers group traffic to sockets bound to the group
+        # (or any) address, Windows needs the interface address
+        if os.name == 'nt':
+            result.bind((decoder.local_ip_address, decoder.data_port))
+        else:
+            result.bind((decoder.multicast_address, decoder.data_port))
+        return result
+
+    async def open(self):
+        """Create the sockets and start receiving"""
+        loop = asyncio.get_running_loop()
+        decoder = self.decoder
+        self.frame_queue = asyncio.Queue(self.frame_queue_size)
+        self.request_lock = asyncio.Lock()
+
+        # Unicast frames arrive on the command socket
+        sockets = [self.__create_command_socket()]
+        if decoder.use_multicast:
+            sockets.append(self.__create_data_socket())
+        for sock in sockets:
+            size_receive_buffer(sock, decoder.frame_rate, decoder.max_packet_size, decoder.receive_buffer_seconds) #type: ignore  # noqa E501
+
+        self.command_transport, _ = await loop.create_datagram_endpoint(
+            lambda: NatNetProtocol(self), sock=sockets[0])
+        if decoder.use_multicast:
+            self.data_transport, _ = await loop.create_datagram_endpoint(
+                lambda: NatNetProtocol(self), sock=sockets[1])
+        else:
+            # The server stops streaming to unicast clients that go quiet
+            self.keep_alive_task = loop.create_task(self.__keep_alive())
+
+    async def close(self):
+        """Stop receiving, end frames() and close the sockets"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.keep_alive_task is not None:
+            self.keep_alive_task.cancel()
+            try:
+                await self.keep_alive_task
+            except asyncio.CancelledError:
+                pass
+        for transport in (self.command_transport, self.data_transport):
+            if transport is not None:
+                transport.close()
+        self.decoder.stop_capture()
+        if self.pending is not None and not self.pending[1].done():
+            self.pending[1].cancel()
+        if self.frame_queue is not None:
+            self.__put_frame(None)
+
+    async def __keep_alive(self):
+        address = (self.decoder.server_ip_address, self.decoder.command_port)
+        while True:
+            self.decoder.send_keep_alive(self.command_transport, *address)
+            await asyncio.sleep(self.keep_alive_period)
+
+    def handle_packet(self, data, receive_time):
+        """Decode a packet and complete the request it answers"""
+        if self.decoder.capture_writer is not None:
+            self.decoder.capture_writer.write(data, receive_time)
+        try:
+            message_id = self.decoder.process_message(data, receive_time=receive_time) #type: ignore  # noqa E501
+        except Exception as e:
+            # An exception would close the transport
+            self.error_count += 1
+            print("ERROR: could not decode NatNet packet: %s" % e)
+            return
+
+        if self.pending is None:
+            return
+        response_ids, future = self.pending
+        if future.done():
+            return
+        if message_id in response_ids:
+            future.set_result((message_id, data))
+        elif message_id == NatNetClient.NAT_UNRECOGNIZED_REQUEST:
+            future.set_exception(ValueError("Request not recognized by the NatNet server")) #type: ignore  # noqa E501
+
+    def __put_frame(self, item):
+        if self.frame_queue.full():
+            self.frame_queue.get_nowait()
+            self.dropped_frame_count += 1
+        self.frame_queue.put_nowait(item)
+
+    def __queue_frame(self, data_dict):
+        if self.frame_listener is not None:
+            self.frame_listener(data_dict)
+        if self.closed:
+            return
+        self.__put_frame((data_dict["mocap_data"], self.decoder.receive_time))
+        self.frame_count += 1
+
+    async def frames(self):
+        """Decoded frames as (MoCapData, receive perf_counter time), oldest
+        first, until close()"""
+        while True:
+            item = await self.frame_queue.get()
+            if item is None:
+                return
+            yield item
+
+    async def request(self, command, command_str="", timeout=1.0, retries=2):
+        """Send a request and wait up to timeout seconds for the reply,
+        resending it up to retries times. Returns (message ID, packet) of the
+        reply, raises asyncio.TimeoutError if none came."""
+        address = (self.decoder.server_ip_address, self.decoder.command_port)
+        async with self.request_lock:
+            future = asyncio.get_running_loop().create_future()
+            self.pending = (RESPONSE_IDS.get(command, ()), future)
+            try:
+                for _ in range(retries + 1):
+                    self.decoder.send_request(self.command_transport, command, command_str, address) #type: ignore  # noqa E501
+                    try:
+                        return await asyncio.wait_for(asyncio.shield(future), timeout) #type: ignore  # noqa E501
+                    except asyncio.TimeoutError:
+                        self.timeout_count += 1
+            finally:
+                self.pending = None
+        raise asyncio.TimeoutError("No reply to NatNet request %d from %s:%d after %d tries" % (command, address[0], address[1], retries + 1)) #type: ignore  # noqa E501
+
+    async def connect(self, timeout=1.0, retries=2):
+        """Ask for the server info, returns the server's NatNet version"""
+        await self.request(NatNetClient.NAT_CONNECT, "", timeout, retries)
+        return self.decoder.get_nat_net_version_server()
+
+    async def send_command(self, command_str, timeout=1.0, retries=2):
+        """Send a command string, returns the server's reply: an int return
+        code or a string"""
+        message_id, data = await self.request(NatNetClient.NAT_REQUEST, command_str, timeout, retries) #type: ignore  # noqa E501
+        return parse_response(data)
+
+    async def get_data_descriptions(self, timeout=1.0, retries=2):
+        """Request the model definitions, returns the DataDescriptions"""
+        await self.request(NatNetClient.NAT_REQUEST_MODELDEF, "", timeout, retries) #type: ignore  # noqa E501
+        return self.decoder.data_descriptions
+
+    def get_stats(self):
+        return {
+            "frame_count": self.frame_count,
+            "dropped_frame_count": self.dropped_frame_count,
+            "timeout_count": self.timeout_count,
+            "error_count": self.error_count,
+        }
@@ -27,30 +27,41 @@ import struct
 from threading import Thread
 import copy
 import time
+import numpy as np
 import DataDescriptions
 import MoCapData
+from frame_buffer import FrameBuffer
+from frame_stats_reporter import FrameStatsReporter
 from natnet_parser import NatNetParser
+from packet_receiver import PacketReceiver, size_receive_buffer
+from packet_capture import PacketCaptureWriter
+
+
+# Debug tracing, off unless set to True. Calls on the per packet and per
+# frame paths, assets included, are guarded with "if TRACE:" /
+# "if TRACE_MF:" so a disabled trace costs one global lookup and never
+# formats its arguments. Data description, server info and command reply
+# traces run once per model definition or request and aren't guarded.
+TRACE = False
+TRACE_DD = False
+TRACE_MF = False
 
 
 def trace(*args):
-    # uncomment the one you want to use
-    # print("".join(map(str,args)))
-    pass
+    if TRACE:
+        print("".join(map(str, args)))
 
 
 # Used for Data Description functions
 def trace_dd(*args):
-    # uncomment the one you want to use
-
-    # print("".join(map(str,args)))
-    pass
+    if TRACE_DD:
+        print("".join(map(str, args)))
 
 
 # Used for MoCap Frame Data functions
 def trace_mf(*args):
-    # uncomment the one you want to use
-    # print("".join(map(str,args)))
-    pass
+    if TRACE_MF:
+        print("".join(map(str, args)))
 
 
 def get_message_id(data):
@@ -68,6 +79,56 @@ NNIntValue = struct.Struct('<I')
 FPCalMatrixRow = struct.Struct('<ffffffffffff')
 FPCorners = struct.Struct('<ffffffffffff')
 
+# NatNet 3.0 and later rigid body record:
+# ID, position, orientation, mean marker error, params
+RigidBodyRecord = struct.Struct('<i3f4ffh')
+RigidBodyRecordDtype = np.dtype([('id', '<i4'),
+                                 ('pos', '<f4', (3,)),
+                                 ('rot', '<f4', (4,)),
+                                 ('error', '<f4'),
+                                 ('param', '<i2')])
+assert RigidBodyRecordDtype.itemsize == RigidBodyRecord.size
+
+# Frame sections NatNetClient.decode_mask can select. Sections left out are
+# jumped over using their byte count (NatNet 4.1 and later) and come out as
+# empty containers; older streams have no byte counts and are always fully
+# decoded. The frame prefix and suffix are always decoded.
+DECODE_MARKER_SETS = 0x01
+DECODE_LEGACY_MARKERS = 0x02
+DECODE_RIGID_BODIES = 0x04
+DECODE_SKELETONS = 0x08
+DECODE_ASSETS = 0x10
+DECODE_LABELED_MARKERS = 0x20
+DECODE_FORCE_PLATES = 0x40
+DECODE_DEVICES = 0x80
+DECODE_ALL = 0xFF
+
+
+def rigid_body_keep_table(ids):
+    """Lookup table for unpack_rigid_body_block: entry ID + 1 is True for
+    the rigid body IDs to keep, entry 0 catches negative IDs"""
+    ids = np.asarray(ids, dtype=np.int64)
+    ids = ids[ids >= 0]
+    table = np.zeros(int(ids.max(initial=-1)) + 3, dtype=bool)
+    table[ids + 1] = True
+    return table
+
+
+def unpack_rigid_body_block(data, rigid_body_count, offset=0, keep_table=None):
+    """Decodes a NatNet 3.0+ rigid body block with a single np.frombuffer
+    call. Returns the block size in bytes and a RigidBodyArrays holding a
+    copy of the records, only those kept by a rigid_body_keep_table() if
+    given. data is usually a view of a receive buffer that is reused a few
+    packets later, so the records can't be left in it."""
+    block = np.frombuffer(data, dtype=RigidBodyRecordDtype,
+                          count=rigid_body_count, offset=offset)
+    if keep_table is not None:
+        # IDs past the table end clip to its last entry, which is False
+        block = block[keep_table.take(block['id'] + 1, mode='clip')]
+    else:
+        block = block.copy()
+    return rigid_body_count * RigidBodyRecord.size, MoCapData.RigidBodyArrays(block) #type: ignore  # noqa E501
+
 
 class NatNetClient:
     # print_level = 0 off
@@ -78,10 +139,10 @@ class NatNetClient:
     def __init__(self):
 
         # file path to natnet config file
-        self.config_path = "../../config/natnet_config.yaml"
+        self.config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../config/natnet_config.yaml") #type: ignore  # noqa E501
 
         # Dictionary Containing config data
-        self.config = NatNetParser.parse_config_file(self.config_path)
+        self.config = NatNetParser().parse_config_file(self.config_path)['natnet_config'] #type: ignore  # noqa E501
 
         # Change this value to the IP address of the NatNet server.
         self.server_ip_address = self.config['server_address']
@@ -105,12 +166,74 @@ class NatNetClient:
         # NatNet Data channel
         self.data_port = self.config['data_port']
 
+        # The kernel receive buffers hold receive_buffer_seconds of frames
+        # of up to max_packet_size bytes at frame_rate, so a stalled
+        # receive thread doesn't lose bursts. Linux charges at least ~2 KiB
+        # per datagram whatever its size.
+        self.frame_rate = self.config.get('frame_rate', 240)
+        self.max_packet_size = self.config.get('max_packet_size', 16384)
+        self.receive_buffer_seconds = self.config.get('receive_buffer_seconds', 0.5) #type: ignore  # noqa E501
+        # PacketReceiver of each socket, created by its thread
+        self.data_receiver = None
+        self.command_receiver = None
+
         # Set this to a callback method of your choice.
         # Allows receiving per-rigid-body data at each frame.
         self.rigid_body_listener = None
         self.new_frame_listener = None
+
+        # Set this to a callback method of your choice.
+        # Receives the RigidBodyArrays of each frame decoded by the fast path.
+        self.rigid_body_block_listener = None
+
+        # Decode NatNet 3.0+ rigid bodies into arrays instead of
+        # per-body RigidBody objects.
+        self.fast_rigid_body_decode = True
+
+        # Frame sections to decode, DECODE_* flags. See set_decode_mask().
+        self.decode_mask = DECODE_ALL
+        # Rigid bodies to keep, IDs or names. None keeps all of them.
+        # See set_rigid_body_filter().
+        self.rigid_body_filter = None
+        # IDs the filter resolved to and their rigid_body_keep_table(),
+        # None while it keeps every rigid body
+        self.rigid_body_filter_ids = None
+        self.rigid_body_filter_table = None
+        # Frame sections jumped over instead of decoded
+        self.skipped_section_count = 0
+
+        # Hand freshly decoded objects to their containers instead of
+        # deep copying them. The decoder never reuses an object after
+        # adding it, so copying is only useful to outside callers.
+        self.take_ownership = True
+
+        # Latest decoded rigid body frames for consumers on other threads.
+        # See get_latest() and get_since().
+        self.frame_buffer = FrameBuffer()
         self.new_frame_with_data_listener = None
 
+        # Prints the frame number and rate at most once per
+        # stats_report_period seconds while the print level is above 0
+        self.stats_reporter = FrameStatsReporter(self.config.get('stats_report_period', 1.0)) #type: ignore  # noqa E501
+
+        # perf_counter time the message being decoded was received, frames
+        # in the frame buffer are stamped with it
+        self.receive_time = None
+
+        # Frames received before the server info reply told us the stream
+        # version, they can't be decoded and are dropped
+        self.unversioned_frame_count = 0
+
+        # Ticks per second of the server's high resolution clock, the frame
+        # suffix stamps count them. 0 until the server info reply.
+        self.clock_frequency = 0
+
+        # DataDescriptions of the latest model definition reply
+        self.data_descriptions = None
+
+        # Records every received datagram while set, see start_capture()
+        self.capture_writer = None
+
         # Set Application Name
         self.__application_name = "Not Set"
 
@@ -227,6 +350,43 @@ class NatNetClient:
     def get_print_level(self):
         return self.print_level
 
+    def set_decode_mask(self, decode_mask=DECODE_ALL):
+        """Decode only the frame sections of decode_mask, DECODE_* flags
+        or'ed together"""
+        self.decode_mask = decode_mask & DECODE_ALL
+        return self.decode_mask
+
+    def set_rigid_body_filter(self, rigid_bodies=None):
+        """Keep only these rigid bodies, streaming IDs or names; None keeps
+        all of them. Names are looked up in the model definitions, until
+        they have been received every rigid body is kept."""
+        self.rigid_body_filter = None if rigid_bodies is None else list(rigid_bodies) #type: ignore  # noqa E501
+        self.__resolve_rigid_body_filter()
+        return self.rigid_body_filter_ids
+
+    def __resolve_rigid_body_filter(self):
+        self.rigid_body_filter_ids = None
+        self.rigid_body_filter_table = None
+        if self.rigid_body_filter is None:
+            return
+        # key: rigid body name, value: streaming ID
+        name_ids = {}
+        if self.data_descriptions is not None:
+            for rb_desc in self.data_descriptions.rigid_body_list:
+                name = rb_desc.sz_name
+                if isinstance(name, bytes):
+                    name = name.decode('utf-8')
+                name_ids[name] = rb_desc.id_num
+        ids = []
+        for rigid_body in self.rigid_body_filter:
+            if isinstance(rigid_body, str):
+                if rigid_body not in name_ids:
+                    return
+                rigid_body = name_ids[rigid_body]
+            ids.append(int(rigid_body))
+        self.rigid_body_filter_ids = np.array(ids, dtype=np.int32)
+        self.rigid_body_filter_table = rigid_body_keep_table(ids)
+
     def connected(self):
         ret_value = True
         # check sockets
@@ -285,8 +445,13 @@ class NatNetClient:
                               socket.inet_aton(self.multicast_address) +
                               socket.inet_aton(self.local_ip_address))
             try:
-                # Use bind in data socket due to the nature of UDP
-                result.bind((self.local_ip_address, self.data_port))
+                # Use bind in data socket due to the nature of UDP. Linux
+                # only delivers group traffic to sockets bound to the group
+                # (or any) address, Windows needs the interface address
+                if os.name == 'nt':
+                    result.bind((self.local_ip_address, self.data_port))
+                else:
+                    result.bind((self.multicast_address, self.data_port))
             except socket.error as e:
                 print(f'Multicast Error: {e}')
                 sys.exit(1)
@@ -307,22 +472,16 @@ class NatNetClient:
     def __unpack_rigid_body_3_and_above(self, data, rb_num):
         """Calculates offset for NatNet 3 and above for rigid body
         unpacking"""
-        offset = 0
-
-        # ID (4 bytes)
-        new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
-        offset += 4
-
-        trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
-
-        # Position and orientation
-        pos = Vector3.unpack(data[offset:offset+12])
-        offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        # ID, position, orientation, marker error and params (38 bytes)
+        new_id, px, py, pz, qx, qy, qz, qw, marker_error, param = RigidBodyRecord.unpack_from(data) #type: ignore  # noqa E501
+        offset = RigidBodyRecord.size
+        pos = (px, py, pz)
+        rot = (qx, qy, qz, qw)
 
-        rot = Quaternion.unpack(data[offset:offset+16])
-        offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
 
         rigid_body = MoCapData.RigidBody(new_id, pos, rot)
 
@@ -330,18 +489,16 @@ class NatNetClient:
         if self.rigid_body_listener is not None:
             self.rigid_body_listener(new_id, pos, rot)
 
-        marker_error, = FloatValue.unpack(data[offset:offset+4])
-        offset += 4
-        trace_mf("\tMean Marker Error: %3.2f" % marker_error)
+        if TRACE_MF:
+            trace_mf("\tMean Marker Error: %3.2f" % marker_error)
         rigid_body.error = marker_error
 
-        param, = struct.unpack('h', data[offset:offset+2])
         tracking_valid = (param & 0x01) != 0
-        offset += 2
         is_valid_str = 'False'
         if tracking_valid:
             is_valid_str = 'True'
-        trace_mf("\tTracking Valid: %s" % is_valid_str)
+        if TRACE_MF:
+            trace_mf("\tTracking Valid: %s" % is_valid_str)
         if tracking_valid:
             rigid_body.tracking_valid = True
         else:
@@ -358,16 +515,19 @@ class NatNetClient:
         new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
 
-        trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
+        if TRACE_MF:
+            trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
 
         # Position and orientation
         pos = Vector3.unpack(data[offset:offset+12])
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
         rot = Quaternion.unpack(data[offset:offset+16])
         offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
 
         rigid_body = MoCapData.RigidBody(new_id, pos, rot)
 
@@ -378,7 +538,8 @@ class NatNetClient:
         marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
         marker_count_range = range(0, marker_count)
-        trace_mf("\tMarker Count:", marker_count)
+        if TRACE_MF:
+            trace_mf("\tMarker Count:", marker_count)
 
         rb_marker_list = []
         for i in marker_count_range:
@@ -388,28 +549,32 @@ class NatNetClient:
         for i in marker_count_range:
             pos = Vector3.unpack(data[offset:offset+12])
             offset += 12
-            trace_mf("\tMarker", i, ":", pos[0], ",", pos[1], ",", pos[2])
+            if TRACE_MF:
+                trace_mf("\tMarker", i, ":", pos[0], ",", pos[1], ",", pos[2])
             rb_marker_list[i].pos = pos
 
         for i in marker_count_range:
             new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
             offset += 4
-            trace_mf("\tMarker ID", i, ":", new_id)
-            rb_marker_list[i].id = new_id
+            if TRACE_MF:
+                trace_mf("\tMarker ID", i, ":", new_id)
+            rb_marker_list[i].id_num = new_id
 
         # Marker sizes
         for i in marker_count_range:
             size = FloatValue.unpack(data[offset:offset+4])
             offset += 4
-            trace_mf("\tMarker Size", i, ":", size[0])
+            if TRACE_MF:
+                trace_mf("\tMarker Size", i, ":", size[0])
             rb_marker_list[i].size = size
 
         for i in marker_count_range:
-            rigid_body.add_rigid_body_marker(rb_marker_list[i])
+            rigid_body.add_rigid_body_marker(rb_marker_list[i], take_ownership=self.take_ownership) #type: ignore  # noqa E501
 
         marker_error, = FloatValue.unpack(data[offset:offset+4])
         offset += 4
-        trace_mf("\tMean Marker Error: %3.2f" % marker_error)
+        if TRACE_MF:
+            trace_mf("\tMean Marker Error: %3.2f" % marker_error)
         rigid_body.error = marker_error
 
         param, = struct.unpack('h', data[offset:offset+2])
@@ -418,7 +583,8 @@ class NatNetClient:
         is_valid_str = 'False'
         if tracking_valid:
             is_valid_str = 'True'
-        trace_mf("\tTracking Valid: %s" % is_valid_str)
+        if TRACE_MF:
+            trace_mf("\tTracking Valid: %s" % is_valid_str)
         if tracking_valid:
             rigid_body.tracking_valid = True
         else:
@@ -433,16 +599,19 @@ class NatNetClient:
         new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
 
-        trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
+        if TRACE_MF:
+            trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
 
         # Position and orientation
         pos = Vector3.unpack(data[offset:offset+12])
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
         rot = Quaternion.unpack(data[offset:offset+16])
         offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
 
         rigid_body = MoCapData.RigidBody(new_id, pos, rot)
 
@@ -453,7 +622,8 @@ class NatNetClient:
         marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
         marker_count_range = range(0, marker_count)
-        trace_mf("\tMarker Count:", marker_count)
+        if TRACE_MF:
+            trace_mf("\tMarker Count:", marker_count)
 
         rb_marker_list = []
         for i in marker_count_range:
@@ -463,7 +633,8 @@ class NatNetClient:
         for i in marker_count_range:
             pos = Vector3.unpack(data[offset:offset+12])
             offset += 12
-            trace_mf("\tMarker", i, ":", pos[0], ",", pos[1], ",", pos[2])
+            if TRACE_MF:
+                trace_mf("\tMarker", i, ":", pos[0], ",", pos[1], ",", pos[2])
             rb_marker_list[i].pos = pos
 
         if major >= 2:
@@ -471,23 +642,26 @@ class NatNetClient:
             for i in marker_count_range:
                 new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
                 offset += 4
-                trace_mf("\tMarker ID", i, ":", new_id)
-                rb_marker_list[i].id = new_id
+                if TRACE_MF:
+                    trace_mf("\tMarker ID", i, ":", new_id)
+                rb_marker_list[i].id_num = new_id
 
             # Marker sizes
             for i in marker_count_range:
                 size = FloatValue.unpack(data[offset:offset+4])
                 offset += 4
-                trace_mf("\tMarker Size", i, ":", size[0])
+                if TRACE_MF:
+                    trace_mf("\tMarker Size", i, ":", size[0])
                 rb_marker_list[i].size = size
 
             for i in marker_count_range:
-                rigid_body.add_rigid_body_marker(rb_marker_list[i])
+                rigid_body.add_rigid_body_marker(rb_marker_list[i], take_ownership=self.take_ownership) #type: ignore  # noqa E501
 
             if major >= 2:
                 marker_error, = FloatValue.unpack(data[offset:offset+4])
                 offset += 4
-                trace_mf("\tMean Marker Error: %3.2f" % marker_error)
+                if TRACE_MF:
+                    trace_mf("\tMean Marker Error: %3.2f" % marker_error)
                 rigid_body.error = marker_error
         return offset, rigid_body
 
@@ -499,16 +673,19 @@ class NatNetClient:
         new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
 
-        trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
+        if TRACE_MF:
+            trace_mf("RB: %3.1d ID: %3.1d" % (rb_num, new_id))
 
         # Position and orientation
         pos = Vector3.unpack(data[offset:offset+12])
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
         rot = Quaternion.unpack(data[offset:offset+16])
         offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
 
         rigid_body = MoCapData.RigidBody(new_id, pos, rot)
 
@@ -535,52 +712,58 @@ class NatNetClient:
         offset = 0
         new_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
-        trace_mf("Skeleton %3.1d ID: %3.1d" % (skeleton_num, new_id))
+        if TRACE_MF:
+            trace_mf("Skeleton %3.1d ID: %3.1d" % (skeleton_num, new_id))
         skeleton = MoCapData.Skeleton(new_id)
 
         rigid_body_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
-        trace_mf("Rigid Body Count: %3.1d" % rigid_body_count)
+        if TRACE_MF:
+            trace_mf("Rigid Body Count: %3.1d" % rigid_body_count)
         if (rigid_body_count > 0):
             for rb_num in range(0, rigid_body_count):
                 offset_tmp, rigid_body = self.__unpack_rigid_body(data[offset:], major, minor, rb_num) #type: ignore  # noqa E501
-                skeleton.add_rigid_body(rigid_body)
+                skeleton.add_rigid_body(rigid_body, take_ownership=self.take_ownership) #type: ignore  # noqa E501
                 offset += offset_tmp
 
         return offset, skeleton
 
     def __unpack_asset(self, data, major, minor, asset_num=0):
         offset = 0
-        trace_dd("\tAsset       : %d" % (asset_num))
+        if TRACE_MF:
+            trace_mf("\tAsset       : %d" % (asset_num))
         # Asset ID 4 bytes
         new_id = int.from_bytes(data[offset:offset+4], 'little',  signed=True)
         offset += 4
         asset = MoCapData.Asset()
-        trace_dd("\tAsset ID    : %d" % (new_id))
+        if TRACE_MF:
+            trace_mf("\tAsset ID    : %d" % (new_id))
         asset.set_id(new_id)
         # # of RigidBodies
         numRBs = int.from_bytes(data[offset:offset+4], 'little',  signed=True)
         offset += 4
-        trace_dd("\tRigid Bodies: %d" % (numRBs))
+        if TRACE_MF:
+            trace_mf("\tRigid Bodies: %d" % (numRBs))
         offset1 = 0
         for rb_num in range(numRBs):
             # # of RigidBodies
             offset1, rigid_body = self.__unpack_asset_rigid_body_data(data[offset:], major, minor) #type: ignore  # noqa E501
             offset += offset1
             rigid_body.rb_num = rb_num
-            asset.add_rigid_body(rigid_body)
+            asset.add_rigid_body(rigid_body, take_ownership=self.take_ownership) #type: ignore  # noqa E501
 
         # # of Markers
         numMarkers = int.from_bytes(data[offset:offset+4], 'little', signed=True) #type: ignore  # noqa E501
         offset += 4
-        trace_dd("\tMarkers     : %d" % (numMarkers))
+        if TRACE_MF:
+            trace_mf("\tMarkers     : %d" % (numMarkers))
 
         for marker_num in range(numMarkers):
             # # of Markers
             offset1, marker = self.__unpack_asset_marker_data(data[offset:], major, minor) #type: ignore  # noqa E501
             offset += offset1
             marker.marker_num = marker_num
-            asset.add_marker(marker)
+            asset.add_marker(marker, take_ownership=self.take_ownership)
 
         return offset, asset
 
@@ -591,7 +774,8 @@ class NatNetClient:
         # Frame number (4 bytes)
         frame_number = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
-        trace_mf("Frame #: %3.1d" % frame_number)
+        if TRACE_MF:
+            trace_mf("Frame #: %3.1d" % frame_number)
         frame_prefix_data = MoCapData.FramePrefixData(frame_number)
         return offset, frame_prefix_data
 
@@ -602,7 +786,8 @@ class NatNetClient:
         if (((major == 4) and (minor > 0)) or (major > 4)):
             sizeInBytes = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
             offset += 4
-            trace_mf("Byte Count: %3.1d" % sizeInBytes)
+            if TRACE_MF:
+                trace_mf("Byte Count: %3.1d" % sizeInBytes)
 
         return offset, sizeInBytes
 
@@ -612,7 +797,8 @@ class NatNetClient:
         # Markerset count (4 bytes)
         other_marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
-        trace_mf("Other Marker Count:", other_marker_count)
+        if TRACE_MF:
+            trace_mf("Other Marker Count:", other_marker_count)
 
         # get data size (4 bytes)
         offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
@@ -625,8 +811,9 @@ class NatNetClient:
             for j in range(0, other_marker_count):
                 pos = Vector3.unpack(data[offset:offset+12])
                 offset += 12
-                trace_mf("\tMarker %3.1d: [x=%3.2f,y=%3.2f,z=%3.2f]" % (j, pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
-                other_marker_data.add_pos(pos)
+                if TRACE_MF:
+                    trace_mf("\tMarker %3.1d: [x=%3.2f,y=%3.2f,z=%3.2f]" % (j, pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+                other_marker_data.add_pos(pos, take_ownership=self.take_ownership) #type: ignore  # noqa E501
         return offset, other_marker_data
 
     def __unpack_marker_set_data(self, data, packet_size, major, minor):
@@ -635,7 +822,8 @@ class NatNetClient:
         # Markerset count (4 bytes)
         marker_set_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501s
         offset += 4
-        trace_mf("Markerset Count:", marker_set_count)
+        if TRACE_MF:
+            trace_mf("Markerset Count:", marker_set_count)
 
         # get data size (4 bytes)
         offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
@@ -646,7 +834,8 @@ class NatNetClient:
             # Model name
             model_name, separator, remainder = bytes(data[offset:]).partition(b'\0') #type: ignore  # noqa E501
             offset += len(model_name) + 1
-            trace_mf("Model Name     : ", model_name.decode('utf-8'))
+            if TRACE_MF:
+                trace_mf("Model Name     : ", model_name.decode('utf-8'))
             marker_data.set_model_name(model_name)
             # Marker count (4 bytes)
             marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
@@ -660,7 +849,8 @@ class NatNetClient:
                 offset = len(data)
                 return offset, marker_set_data
 
-            trace_mf("Marker Count   : ", marker_count)
+            if TRACE_MF:
+                trace_mf("Marker Count   : ", marker_count)
             for j in range(0, marker_count):
                 if (len(data) < (offset+12)):
                     print("WARNING: Early return.  Out of data at marker ", j, " of ", marker_count) #type: ignore  # noqa E501
@@ -669,9 +859,10 @@ class NatNetClient:
                     break
                 pos = Vector3.unpack(data[offset:offset+12])
                 offset += 12
-                trace_mf("\tMarker %3.1d: [x=%3.2f,y=%3.2f,z=%3.2f]" % (j, pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
-                marker_data.add_pos(pos)
-            marker_set_data.add_marker_data(marker_data)
+                if TRACE_MF:
+                    trace_mf("\tMarker %3.1d: [x=%3.2f,y=%3.2f,z=%3.2f]" % (j, pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+                marker_data.add_pos(pos, take_ownership=self.take_ownership)
+            marker_set_data.add_marker_data(marker_data, take_ownership=self.take_ownership) #type: ignore  # noqa E501
 
         # Unlabeled markers count (4 bytes)
         # unlabeled_markers_count = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
@@ -691,16 +882,35 @@ class NatNetClient:
         # Rigid body count (4 bytes)
         rigid_body_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
-        trace_mf("Rigid Body Count:", rigid_body_count)
+        if TRACE_MF:
+            trace_mf("Rigid Body Count:", rigid_body_count)
 
         # get data size (4 bytes)
         offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
         offset += offset_tmp
 
+        # Fixed stride records from NatNet 3.0 on, decode them in one pass
+        if self.fast_rigid_body_decode and major >= 3:
+            block_size, rigid_body_arrays = unpack_rigid_body_block(data, rigid_body_count, offset, self.rigid_body_filter_table) #type: ignore  # noqa E501
+            offset += block_size
+            rigid_body_count = rigid_body_arrays.get_rigid_body_count()
+
+            # Send information to any listener.
+            if self.rigid_body_block_listener is not None:
+                self.rigid_body_block_listener(rigid_body_arrays)
+            if self.rigid_body_listener is not None:
+                for i in range(rigid_body_count):
+                    self.rigid_body_listener(int(rigid_body_arrays.ids[i]),
+                                             tuple(rigid_body_arrays.positions[i].tolist()), #type: ignore  # noqa E501
+                                             tuple(rigid_body_arrays.orientations[i].tolist())) #type: ignore  # noqa E501
+            return offset, rigid_body_arrays
+
         for i in range(0, rigid_body_count):
             offset_tmp, rigid_body = self.__unpack_rigid_body(data[offset:], major, minor, i) #type: ignore  # noqa E501
             offset += offset_tmp
-            rigid_body_data.add_rigid_body(rigid_body)
+            if self.rigid_body_filter_ids is not None and rigid_body.id_num not in self.rigid_body_filter_ids: #type: ignore  # noqa E501
+                continue
+            rigid_body_data.add_rigid_body(rigid_body, take_ownership=self.take_ownership) #type: ignore  # noqa E501
 
         return offset, rigid_body_data
 
@@ -713,7 +923,8 @@ class NatNetClient:
         if ((major == 2 and minor > 0) or major > 2):
             skeleton_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501v
             offset += 4
-            trace_mf("Skeleton Count:", skeleton_count)
+            if TRACE_MF:
+                trace_mf("Skeleton Count:", skeleton_count)
             # Get data size (4 bytes)
             offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
             offset += offset_tmp
@@ -721,7 +932,7 @@ class NatNetClient:
                 for skeleton_num in range(0, skeleton_count):
                     rel_offset, skeleton = self.__unpack_skeleton(data[offset:], major, minor, skeleton_num) #type: ignore  # noqa E501
                     offset += rel_offset
-                    skeleton_data.add_skeleton(skeleton)
+                    skeleton_data.add_skeleton(skeleton, take_ownership=self.take_ownership) #type: ignore  # noqa E501
 
         return offset, skeleton_data
 
@@ -740,25 +951,25 @@ class NatNetClient:
         if ((major == 2 and minor > 3) or major > 2):
             labeled_marker_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
             offset += 4
-            trace_mf("Labeled Marker Count:", labeled_marker_count)
+            if TRACE_MF:
+                trace_mf("Labeled Marker Count:", labeled_marker_count)
 
             # get data size (4 bytes)
             offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
             offset += offset_tmp
 
             for lm_num in range(0, labeled_marker_count):
-                model_id = 0
-                marker_id = 0
                 tmp_id = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
                 offset += 4
-                model_id, marker_id = self.__decode_marker_id(tmp_id)
                 pos = Vector3.unpack(data[offset:offset+12])
                 offset += 12
                 size = FloatValue.unpack(data[offset:offset+4])
                 offset += 4
-                trace_mf(" %3.1d ID    : [MarkerID: %3.1d] [ModelID: %3.1d]" % (lm_num, marker_id,model_id)) #type: ignore  # noqa E501
-                trace_mf("    pos : [%3.2f, %3.2f, %3.2f]" % (pos[0],pos[1],pos[2])) #type: ignore  # noqa E501
-                trace_mf("    size: [%3.2f]" % size)
+                if TRACE_MF:
+                    model_id, marker_id = self.__decode_marker_id(tmp_id)
+                    trace_mf(" %3.1d ID    : [MarkerID: %3.1d] [ModelID: %3.1d]" % (lm_num, marker_id,model_id)) #type: ignore  # noqa E501
+                    trace_mf("    pos : [%3.2f, %3.2f, %3.2f]" % (pos[0],pos[1],pos[2])) #type: ignore  # noqa E501
+                    trace_mf("    size: [%3.2f]" % size)
 
                 # Version 2.6 and later
                 param = 0
@@ -775,10 +986,11 @@ class NatNetClient:
                     residual, = FloatValue.unpack(data[offset:offset+4])
                     offset += 4
                     residual = residual * 1000.0
-                    trace_mf("    err : [%3.2f]" % residual)
+                    if TRACE_MF:
+                        trace_mf("    err : [%3.2f]" % residual)
 
                 labeled_marker = MoCapData.LabeledMarker(tmp_id, pos, size, param, residual) #type: ignore  # noqa E501
-                labeled_marker_data.add_labeled_marker(labeled_marker)
+                labeled_marker_data.add_labeled_marker(labeled_marker, take_ownership=self.take_ownership) #type: ignore  # noqa E501
 
         return offset, labeled_marker_data
 
@@ -791,7 +1003,8 @@ class NatNetClient:
         if ((major == 2 and minor >= 9) or major > 2):
             force_plate_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
             offset += 4
-            trace_mf("Force Plate Count:", force_plate_count)
+            if TRACE_MF:
+                trace_mf("Force Plate Count:", force_plate_count)
 
             # get data size (4 bytes)
             offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
@@ -807,29 +1020,33 @@ class NatNetClient:
                 force_plate_channel_count = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
                 offset += 4
 
-                trace_mf("\tForce Plate %3.1d ID: %3.1d Num Channels: %3.1d" % (i, force_plate_id, force_plate_channel_count)) #type: ignore  # noqa E501
+                if TRACE_MF:
+                    trace_mf("\tForce Plate %3.1d ID: %3.1d Num Channels: %3.1d" % (i, force_plate_id, force_plate_channel_count)) #type: ignore  # noqa E501
 
                 # Channel Data
                 for j in range(force_plate_channel_count):
                     fp_channel_data = MoCapData.ForcePlateChannelData()
                     force_plate_channel_frame_count = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
                     offset += 4
-                    out_string = "\tChannel %3.1d: " % (j)
-                    out_string += "  %3.1d Frames - Frame Data: " % (force_plate_channel_frame_count) #type: ignore  # noqa E501
+                    if TRACE_MF:
+                        out_string = "\tChannel %3.1d: " % (j)
+                        out_string += "  %3.1d Frames - Frame Data: " % (force_plate_channel_frame_count) #type: ignore  # noqa E501
 
                     # Force plate frames
                     n_frames_show = min(force_plate_channel_frame_count, n_frames_show_max) #type: ignore  # noqa E501
                     for k in range(force_plate_channel_frame_count):
                         force_plate_channel_val = FloatValue.unpack(data[offset:offset+4]) #type: ignore  # noqa E501
                         offset += 4
-                        fp_channel_data.add_frame_entry(force_plate_channel_val) #type: ignore  # noqa E501
+                        fp_channel_data.add_frame_entry(force_plate_channel_val, take_ownership=self.take_ownership) #type: ignore  # noqa E501
 
-                        if k < n_frames_show:
+                        if TRACE_MF and k < n_frames_show:
                             out_string += " %3.2f " % (force_plate_channel_val)
-                    if n_frames_show < force_plate_channel_frame_count:
-                        out_string += " showing %3.1d of %3.1d frames" % (n_frames_show, force_plate_channel_frame_count) #type: ignore  # noqa E501
-                    force_plate.add_channel_data(fp_channel_data)
-                force_plate_data.add_force_plate(force_plate)
+                    if TRACE_MF:
+                        if n_frames_show < force_plate_channel_frame_count:
+                            out_string += " showing %3.1d of %3.1d frames" % (n_frames_show, force_plate_channel_frame_count) #type: ignore  # noqa E501
+                        trace_mf(" %s" % out_string)
+                    force_plate.add_channel_data(fp_channel_data, take_ownership=self.take_ownership) #type: ignore  # noqa E501
+                force_plate_data.add_force_plate(force_plate, take_ownership=self.take_ownership) #type: ignore  # noqa E501
         return offset, force_plate_data
 
     def __unpack_device_data(self, data, packet_size, major, minor):
@@ -841,7 +1058,8 @@ class NatNetClient:
         if (major == 2 and minor >= 11) or (major > 2):
             device_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
             offset += 4
-            trace_mf("Device Count:", device_count)
+            if TRACE_MF:
+                trace_mf("Device Count:", device_count)
 
             # get data size (4 bytes)
             offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
@@ -857,51 +1075,57 @@ class NatNetClient:
                 device_channel_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
                 offset += 4
 
-                trace_mf("\tDevice %3.1d      ID: %3.1d Num Channels: %3.1d" % (i, device_id, device_channel_count)) #type: ignore  # noqa E501
+                if TRACE_MF:
+                    trace_mf("\tDevice %3.1d      ID: %3.1d Num Channels: %3.1d" % (i, device_id, device_channel_count)) #type: ignore  # noqa E501
 
                 # Channel Data
                 for j in range(0, device_channel_count):
                     device_channel_data = MoCapData.DeviceChannelData()
                     device_channel_frame_count = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
                     offset += 4
-                    out_string = "\tChannel %3.1d " % (j)
-                    out_string += "  %3.1d Frames - Frame Data: " % (device_channel_frame_count) #type: ignore  # noqa E501
+                    if TRACE_MF:
+                        out_string = "\tChannel %3.1d " % (j)
+                        out_string += "  %3.1d Frames - Frame Data: " % (device_channel_frame_count) #type: ignore  # noqa E501
 
                     # Device Frame Data
                     n_frames_show = min(device_channel_frame_count, n_frames_show_max) #type: ignore  # noqa E501
                     for k in range(0, device_channel_frame_count):
-                        device_channel_val = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
                         device_channel_val = FloatValue.unpack(data[offset:offset+4]) #type: ignore  # noqa E501
                         offset += 4
-                        if k < n_frames_show:
+                        if TRACE_MF and k < n_frames_show:
                             out_string += " %3.2f " % (device_channel_val)
 
-                        device_channel_data.add_frame_entry(device_channel_val)
-                    if n_frames_show < device_channel_frame_count:
-                        out_string += " showing %3.1d of %3.1d frames" % (n_frames_show, device_channel_frame_count) #type: ignore  # noqa E501
-                    trace_mf(" %s" % out_string)
-                    device.add_channel_data(device_channel_data)
-                device_data.add_device(device)
+                        device_channel_data.add_frame_entry(device_channel_val, take_ownership=self.take_ownership) #type: ignore  # noqa E501
+                    if TRACE_MF:
+                        if n_frames_show < device_channel_frame_count:
+                            out_string += " showing %3.1d of %3.1d frames" % (n_frames_show, device_channel_frame_count) #type: ignore  # noqa E501
+                        trace_mf(" %s" % out_string)
+                    device.add_channel_data(device_channel_data, take_ownership=self.take_ownership) #type: ignore  # noqa E501
+                device_data.add_device(device, take_ownership=self.take_ownership) #type: ignore  # noqa E501
         return offset, device_data
 
     def __unpack_frame_suffix_data_4_1_to_present(self, data, offset, frame_suffix_data, param): #type: ignore  # noqa E501
         """Unpacks frame suffix data from NatNet 4.1 to present NatNet"""
         timestamp, = DoubleValue.unpack(data[offset:offset+8])
         offset += 8
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
         frame_suffix_data.timestamp = timestamp
-        trace_mf("Mid-exposure timestamp        : %3.1d" % stamp_camera_mid_exposure) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("Mid-exposure timestamp        : %3.1d" % stamp_camera_mid_exposure) #type: ignore  # noqa E501
         offset += 8
         frame_suffix_data.stamp_camera_mid_exposure = stamp_camera_mid_exposure #type: ignore  # noqa E501
 
         stamp_data_received = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
         offset += 8
         frame_suffix_data.stamp_data_received = stamp_data_received
-        trace_mf("Camera data received timestamp: %3.1d" %stamp_data_received) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("Camera data received timestamp: %3.1d" %stamp_data_received) #type: ignore  # noqa E501
 
         stamp_transmit = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
         offset += 8
-        trace_mf("Transmit timestamp            : %3.1d" % stamp_transmit)  #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("Transmit timestamp            : %3.1d" % stamp_transmit)  #type: ignore  # noqa E501
         frame_suffix_data.stamp_transmit = stamp_transmit
 
         prec_timestamp_secs = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
@@ -910,12 +1134,14 @@ class NatNetClient:
         # seconds=prec_timestamp_secs%60
         # out_string= "Precision timestamp (h:m:s) - %4.1d:%2.2d:%2.2d" % (hours, minutes, seconds) #type: ignore  # noqa E501
         # trace_mf(" %s" %out_string)
-        trace_mf("Precision timestamp (sec)     : %3.1d" % prec_timestamp_secs) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("Precision timestamp (sec)     : %3.1d" % prec_timestamp_secs) #type: ignore  # noqa E501
         offset += 4
         frame_suffix_data.prec_timestamp_secs = prec_timestamp_secs
 
         prec_timestamp_frac_secs = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
-        trace_mf("Precision timestamp (frac sec): %3.1d" % prec_timestamp_frac_secs) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("Precision timestamp (frac sec): %3.1d" % prec_timestamp_frac_secs) #type: ignore  # noqa E501
         offset += 4
         frame_suffix_data.prec_timestamp_frac_secs = prec_timestamp_frac_secs #type: ignore  # noqa E501
         param, = struct.unpack('h', data[offset:offset+2])
@@ -927,21 +1153,25 @@ class NatNetClient:
         """Unpacks frame suffix data inclusive from NatNet 3 to NatNet 4"""
         timestamp, = DoubleValue.unpack(data[offset:offset+8])
         offset += 8
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
         frame_suffix_data.timestamp = timestamp
         stamp_camera_mid_exposure = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
-        trace_mf("Mid-exposure timestamp        : %3.1d" % stamp_camera_mid_exposure) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("Mid-exposure timestamp        : %3.1d" % stamp_camera_mid_exposure) #type: ignore  # noqa E501
         offset += 8
         frame_suffix_data.stamp_camera_mid_exposure = stamp_camera_mid_exposure #type: ignore  # noqa E501
 
         stamp_data_received = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
         offset += 8
         frame_suffix_data.stamp_data_received = stamp_data_received
-        trace_mf("Camera data received timestamp: %3.1d" %stamp_data_received) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("Camera data received timestamp: %3.1d" %stamp_data_received) #type: ignore  # noqa E501
 
         stamp_transmit = int.from_bytes(data[offset:offset+8], byteorder='little',  signed=True) #type: ignore  # noqa E501
         offset += 8
-        trace_mf("Transmit timestamp            : %3.1d" % stamp_transmit)  #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("Transmit timestamp            : %3.1d" % stamp_transmit)  #type: ignore  # noqa E501
         frame_suffix_data.stamp_transmit = stamp_transmit
         param, = struct.unpack('h', data[offset:offset+2])
         offset += 2
@@ -951,7 +1181,8 @@ class NatNetClient:
         including NatNet 3"""
         timestamp, = DoubleValue.unpack(data[offset:offset+8])
         offset += 8
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
         frame_suffix_data.timestamp = timestamp
         param, = struct.unpack('h', data[offset:offset+2])
         offset += 2
@@ -963,7 +1194,8 @@ class NatNetClient:
           NatNet 2.7"""
         timestamp, = FloatValue.unpack(data[offset:offset+4])
         offset += 4
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
         frame_suffix_data.timestamp = timestamp
         param, = struct.unpack('h', data[offset:offset+2])
         offset += 2
@@ -974,7 +1206,8 @@ class NatNetClient:
         """Unpacks frame suffix data if the major case is 0 """
         timestamp, = DoubleValue.unpack(data[offset:offset+8])
         offset += 8
-        trace_mf("Timestamp: %3.2f" % timestamp)
+        if TRACE_MF:
+            trace_mf("Timestamp: %3.2f" % timestamp)
         frame_suffix_data.timestamp = timestamp
         param, = struct.unpack('h', data[offset:offset+2])
         offset += 2
@@ -1000,7 +1233,7 @@ class NatNetClient:
             print("\tNo time stamp info available")
         else:
             if (major == 0):
-                data, offset, frame_suffix_data = self.__unpack_frame_suffix_data_0_case(data, offset, frame_suffix_data, param) #type: ignore  # noqa E501
+                data, offset, frame_suffix_data, param = self.__unpack_frame_suffix_data_0_case(data, offset, frame_suffix_data, param) #type: ignore  # noqa E501
             elif (major < 2 or (major <= 2 and minor < 7)):
                 data, offset, frame_suffix_data, param = self.__unpack_frame_suffix_data_pre_2_7(data, offset, frame_suffix_data, param)#type: ignore  # noqa E501
             elif (major == 2 and minor >= 7 and major < 3):
@@ -1018,12 +1251,24 @@ class NatNetClient:
 
         return offset, frame_suffix_data
 
+    def __skip_section(self, data, empty_section):
+        """Jump over a frame section of NatNet 4.1 or later: count (4 bytes),
+        byte count (4 bytes) and the elements"""
+        size_in_bytes = int.from_bytes(data[4:8], byteorder='little', signed=True) #type: ignore  # noqa E501
+        self.skipped_section_count += 1
+        return 8 + size_in_bytes, empty_section
+
     # Unpack data from a motion capture frame message
     def __unpack_mocap_data(self, data: bytes, packet_size, major, minor):
         mocap_data = MoCapData.MoCapData()
         data = memoryview(data)
         offset = 0
         rel_offset = 0
+        # Sections left out of the decode mask, only streams with section
+        # byte counts can jump over them
+        skip_mask = 0
+        if ((major == 4) and (minor > 0)) or (major > 4):
+            skip_mask = ~self.decode_mask & DECODE_ALL
         # Frame Prefix Data
         rel_offset, frame_prefix_data = self.__unpack_frame_prefix_data(data[offset:]) #type: ignore  # noqa E501
         offset += rel_offset
@@ -1031,27 +1276,39 @@ class NatNetClient:
         frame_number = frame_prefix_data.frame_number
 
         # Markerset Data
-        rel_offset, marker_set_data = self.__unpack_marker_set_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
+        if skip_mask & DECODE_MARKER_SETS:
+            rel_offset, marker_set_data = self.__skip_section(data[offset:], MoCapData.MarkerSetData()) #type: ignore  # noqa E501
+        else:
+            rel_offset, marker_set_data = self.__unpack_marker_set_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
         offset += rel_offset
         mocap_data.set_marker_set_data(marker_set_data)
         marker_set_count = marker_set_data.get_marker_set_count()
         unlabeled_markers_count = marker_set_data.get_unlabeled_marker_count()
 
         # Legacy Other Markers
-        rel_offset, legacy_other_markers = self.__unpack_legacy_other_markers(data[offset:], (packet_size - offset),major, minor) #type: ignore  # noqa E501
+        if skip_mask & DECODE_LEGACY_MARKERS:
+            rel_offset, legacy_other_markers = self.__skip_section(data[offset:], MoCapData.LegacyMarkerData()) #type: ignore  # noqa E501
+        else:
+            rel_offset, legacy_other_markers = self.__unpack_legacy_other_markers(data[offset:], (packet_size - offset),major, minor) #type: ignore  # noqa E501
         offset += rel_offset
         mocap_data.set_legacy_other_markers(legacy_other_markers)
         marker_set_count = legacy_other_markers.get_marker_count()
         legacy_other_markers_count = marker_set_data.get_unlabeled_marker_count() #type: ignore  # noqa F401
 
         # Rigid Body Data
-        rel_offset, rigid_body_data = self.__unpack_rigid_body_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
+        if skip_mask & DECODE_RIGID_BODIES:
+            rel_offset, rigid_body_data = self.__skip_section(data[offset:], MoCapData.RigidBodyData()) #type: ignore  # noqa E501
+        else:
+            rel_offset, rigid_body_data = self.__unpack_rigid_body_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
         offset += rel_offset
         mocap_data.set_rigid_body_data(rigid_body_data)
         rigid_body_count = rigid_body_data.get_rigid_body_count()
 
         # Skeleton Data
-        rel_offset, skeleton_data = self.__unpack_skeleton_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
+        if skip_mask & DECODE_SKELETONS:
+            rel_offset, skeleton_data = self.__skip_section(data[offset:], MoCapData.SkeletonData()) #type: ignore  # noqa E501
+        else:
+            rel_offset, skeleton_data = self.__unpack_skeleton_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
         offset += rel_offset
         mocap_data.set_skeleton_data(skeleton_data)
         skeleton_count = skeleton_data.get_skeleton_count()
@@ -1059,24 +1316,36 @@ class NatNetClient:
         # Assets (Motive 3.1/NatNet 4.1 and greater)
         asset_count = 0
         if (((major >= 4) and (minor >= 1)) or (major > 4)):
-            rel_offset, asset_data = self.__unpack_asset_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
+            if skip_mask & DECODE_ASSETS:
+                rel_offset, asset_data = self.__skip_section(data[offset:], MoCapData.AssetData()) #type: ignore  # noqa E501
+            else:
+                rel_offset, asset_data = self.__unpack_asset_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
             offset += rel_offset
             mocap_data.set_asset_data(asset_data)
             asset_count = asset_data.get_asset_count()
 
         # Labeled Marker Data
-        rel_offset, labeled_marker_data = self.__unpack_labeled_marker_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
+        if skip_mask & DECODE_LABELED_MARKERS:
+            rel_offset, labeled_marker_data = self.__skip_section(data[offset:], MoCapData.LabeledMarkerData()) #type: ignore  # noqa E501
+        else:
+            rel_offset, labeled_marker_data = self.__unpack_labeled_marker_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
         offset += rel_offset
         mocap_data.set_labeled_marker_data(labeled_marker_data)
         labeled_marker_count = labeled_marker_data.get_labeled_marker_count()
 
         # Force Plate Data
-        rel_offset, force_plate_data = self.__unpack_force_plate_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
+        if skip_mask & DECODE_FORCE_PLATES:
+            rel_offset, force_plate_data = self.__skip_section(data[offset:], MoCapData.ForcePlateData()) #type: ignore  # noqa E501
+        else:
+            rel_offset, force_plate_data = self.__unpack_force_plate_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
         offset += rel_offset
         mocap_data.set_force_plate_data(force_plate_data)
 
         # Device Data
-        rel_offset, device_data = self.__unpack_device_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
+        if skip_mask & DECODE_DEVICES:
+            rel_offset, device_data = self.__skip_section(data[offset:], MoCapData.DeviceData()) #type: ignore  # noqa E501
+        else:
+            rel_offset, device_data = self.__unpack_device_data(data[offset:], (packet_size - offset), major, minor) #type: ignore  # noqa E501
         offset += rel_offset
         mocap_data.set_device_data(device_data)
 
@@ -1092,6 +1361,18 @@ class NatNetClient:
         is_recording = frame_suffix_data.is_recording
         tracked_models_changed = frame_suffix_data.tracked_models_changed
 
+        # Server side latency (mid-exposure to transmit) and transmit time in
+        # seconds of the server clock, when the server stamps its frames
+        motive_latency = transmit_time = float('nan')
+        if self.clock_frequency > 0 and frame_suffix_data.stamp_transmit > 0:
+            transmit_time = frame_suffix_data.stamp_transmit / self.clock_frequency #type: ignore  # noqa E501
+            if frame_suffix_data.stamp_camera_mid_exposure > 0:
+                motive_latency = (frame_suffix_data.stamp_transmit - frame_suffix_data.stamp_camera_mid_exposure) / self.clock_frequency #type: ignore  # noqa E501
+
+        # Publish the rigid bodies to the frame buffer
+        self.frame_buffer.push_rigid_body_data(frame_number, timestamp, rigid_body_data, self.receive_time, #type: ignore  # noqa E501
+                                               timecode, timecode_sub, motive_latency, transmit_time) #type: ignore  # noqa E501
+
         # Send information to any listener.
         if self.new_frame_listener is not None:
             data_dict = {}
@@ -1212,7 +1493,7 @@ class NatNetClient:
             offset3 += len(marker_name) + 1
 
             rb_marker = DataDescriptions.RBMarker(marker_name, active_label, marker_offset) #type: ignore  # noqa E501
-            rb_desc.add_rb_marker(rb_marker)
+            rb_desc.add_rb_marker(rb_marker, take_ownership=self.take_ownership) #type: ignore  # noqa E501
             trace_dd("\t%3.1d Marker Label: %s Position: [ %3.2f %3.2f %3.2f] %s" % (marker, active_label, #type: ignore  # noqa E501
                                                                                         marker_offset[0], #type: ignore  # noqa E501
                                                                                         marker_offset[1], #type: ignore  # noqa E501
@@ -1279,7 +1560,7 @@ class NatNetClient:
             offset3 += len(marker_name) + 1
 
             rb_marker = DataDescriptions.RBMarker(marker_name, active_label, marker_offset) #type: ignore  # noqa E501
-            rb_desc.add_rb_marker(rb_marker)
+            rb_desc.add_rb_marker(rb_marker, take_ownership=self.take_ownership) #type: ignore  # noqa E501
             trace_dd("\t%3.1d Marker Label: %s Position: [ %3.2f %3.2f %3.2f] %s" % (marker, active_label, #type: ignore  # noqa E501
                                                                                         marker_offset[0], #type: ignore  # noqa E501
                                                                                         marker_offset[1], #type: ignore  # noqa E501
@@ -1342,7 +1623,7 @@ class NatNetClient:
             offset2 += 4
 
             rb_marker = DataDescriptions.RBMarker(marker_name, active_label, marker_offset) #type: ignore  # noqa E501
-            rb_desc.add_rb_marker(rb_marker)
+            rb_desc.add_rb_marker(rb_marker, take_ownership=self.take_ownership) #type: ignore  # noqa E501
             trace_dd("\t%3.1d Marker Label: %s Position: [ %3.2f %3.2f %3.2f] %s" % (marker, active_label, #type: ignore  # noqa E501
                                                                                         marker_offset[0], #type: ignore  # noqa E501
                                                                                         marker_offset[1], #type: ignore  # noqa E501
@@ -1472,7 +1753,7 @@ class NatNetClient:
             offset3 += len(marker_name) + 1
 
             rb_marker = DataDescriptions.RBMarker(marker_name, active_label, marker_offset) #type: ignore  # noqa E501
-            rb_desc.add_rb_marker(rb_marker)
+            rb_desc.add_rb_marker(rb_marker, take_ownership=self.take_ownership) #type: ignore  # noqa E501
             trace_dd("\t%3.1d Marker Label: %s Position: [ %3.2f %3.2f %3.2f] %s" % (marker, active_label, #type: ignore  # noqa E501
                                                                                         marker_offset[0], #type: ignore  # noqa E501
                                                                                         marker_offset[1], #type: ignore  # noqa E501
@@ -1525,7 +1806,7 @@ class NatNetClient:
             trace_dd("Rigid Body (Bone) %d:" % (i))
             offset_tmp, rb_desc_tmp = self.__unpack_rigid_body_description(data[offset:], major, minor) #type: ignore  # noqa E501
             offset += offset_tmp
-            skeleton_desc.add_rigid_body_description(rb_desc_tmp)
+            skeleton_desc.add_rigid_body_description(rb_desc_tmp, take_ownership=self.take_ownership) #type: ignore  # noqa E501
         return offset, skeleton_desc
 
     def __unpack_force_plate_description(self, data, major, minor):
@@ -1609,7 +1890,7 @@ class NatNetClient:
                 channel_name, separator, remainder = bytes(data[offset:]).partition(b'\0') #type: ignore  # noqa E501
                 offset += len(channel_name) + 1
                 trace_dd("\tChannel Name %3.1d: %s" % (i, channel_name.decode('utf-8'))) #type: ignore  # noqa E501
-                fp_desc.add_channel_name(channel_name)
+                fp_desc.add_channel_name(channel_name, take_ownership=self.take_ownership) #type: ignore  # noqa E501
 
         trace_dd("unpackForcePlate processed ", offset, " bytes")
         return offset, fp_desc
@@ -1654,7 +1935,7 @@ class NatNetClient:
             for i in range(0, num_channels):
                 channel_name, separator, remainder = bytes(data[offset:]).partition(b'\0') #type: ignore  # noqa E501
                 offset += len(channel_name) + 1
-                device_desc.add_channel_name(channel_name)
+                device_desc.add_channel_name(channel_name, take_ownership=self.take_ownership) #type: ignore  # noqa E501
                 trace_dd("\tChannel ", i, " Name: ", channel_name.decode('utf-8')) #type: ignore  # noqa E501
 
         trace_dd("unpack_device_description processed ", offset, " bytes")
@@ -1701,12 +1982,14 @@ class NatNetClient:
         # Size
         marker_size = FloatValue.unpack(data[offset:offset+4])
         offset += 4
-        trace_mf("\tMarker Size:", marker_size)
+        if TRACE_MF:
+            trace_mf("\tMarker Size:", marker_size)
 
         # Params
         marker_params, = struct.unpack('h', data[offset:offset+2])
         offset += 2
-        trace_mf("\tParams    :", marker_params)
+        if TRACE_MF:
+            trace_mf("\tParams    :", marker_params)
 
         trace_dd("\tunpack_marker_description processed %3.1d bytes" % offset)
 
@@ -1719,29 +2002,35 @@ class NatNetClient:
         # ID
         rbID = int.from_bytes(data[offset:offset+4], 'little',  signed=True)
         offset += 4
-        trace_dd("\tID        : %d" % (rbID))
+        if TRACE_MF:
+            trace_mf("\tID        : %d" % (rbID))
 
         # Position: x,y,z
         pos = Vector3.unpack(data[offset:offset+12])
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
         # Orientation: qx, qy, qz, qw
         rot = Quaternion.unpack(data[offset:offset+16])
         offset += 16
-        trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tOrientation: [%3.2f, %3.2f, %3.2f, %3.2f]" % (rot[0], rot[1], rot[2], rot[3])) #type: ignore  # noqa E501
 
         # Mean error
         mean_error, = FloatValue.unpack(data[offset:offset+4])
         offset += 4
-        trace_mf("\tMean Error : %3.2f" % mean_error)
+        if TRACE_MF:
+            trace_mf("\tMean Error : %3.2f" % mean_error)
 
         # Params
         marker_params, = struct.unpack('h', data[offset:offset+2])
         offset += 2
-        trace_mf("\tParams     :", marker_params)
+        if TRACE_MF:
+            trace_mf("\tParams     :", marker_params)
 
-        trace_dd("unpack_marker_description processed %3.1d bytes" % offset)
+        if TRACE_MF:
+            trace_mf("unpack_marker_description processed %3.1d bytes" % offset)
         # Package for return object
         rigid_body_data = MoCapData.AssetRigidBodyData(rbID, pos, rot, mean_error, marker_params) #type: ignore  # noqa E501
 
@@ -1752,27 +2041,32 @@ class NatNetClient:
         # ID
         marker_id = int.from_bytes(data[offset:offset+4], 'little', signed=True) #type: ignore  # noqa E501
         offset += 4
-        trace_dd("\tID         : %d" % (marker_id))
+        if TRACE_MF:
+            trace_mf("\tID         : %d" % (marker_id))
 
         # Position: x,y,z
         pos = Vector3.unpack(data[offset:offset+12])
         offset += 12
-        trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
+        if TRACE_MF:
+            trace_mf("\tPosition   : [%3.2f, %3.2f, %3.2f]" % (pos[0], pos[1], pos[2])) #type: ignore  # noqa E501
 
         # Size
         marker_size, = FloatValue.unpack(data[offset:offset+4])
         offset += 4
-        trace_mf("\tMarker Size: %3.2f" % marker_size)
+        if TRACE_MF:
+            trace_mf("\tMarker Size: %3.2f" % marker_size)
 
         # Params
         marker_params, = struct.unpack('h', data[offset:offset+2])
         offset += 2
-        trace_mf("\tParams     :", marker_params)
+        if TRACE_MF:
+            trace_mf("\tParams     :", marker_params)
 
         # Residual
         residual, = FloatValue.unpack(data[offset:offset+4])
         offset += 4
-        trace_mf("\tResidual   : %3.2f" % residual)
+        if TRACE_MF:
+            trace_mf("\tResidual   : %3.2f" % residual)
 
         marker_data = MoCapData.AssetMarkerData(marker_id, pos, marker_size, marker_params, residual) #type: ignore  # noqa E501
         return offset, marker_data
@@ -1785,7 +2079,8 @@ class NatNetClient:
         # Asset Count
         asset_count = int.from_bytes(data[offset:offset+4], byteorder='little', signed=True) #type: ignore  # noqa E501
         offset += 4
-        trace_mf("Asset Count:", asset_count)
+        if TRACE_MF:
+            trace_mf("Asset Count:", asset_count)
 
         # Get data size (4 bytes)
         offset_tmp, unpackedDataSize = self.__unpack_data_size(data[offset:], major, minor) #type: ignore  # noqa E501
@@ -1795,7 +2090,7 @@ class NatNetClient:
         for asset_num in range(0, asset_count):
             rel_offset, asset = self.__unpack_asset(data[offset:], major, minor, asset_num) #type: ignore  # noqa E501
             offset += rel_offset
-            asset_data.add_asset(asset)
+            asset_data.add_asset(asset, take_ownership=self.take_ownership)
 
         return offset, asset_data
 
@@ -1892,7 +2187,7 @@ class NatNetClient:
                 print("\tPACKET DECODE STOPPED")
                 return offset
             offset += offset_tmp
-            data_descs.add_data(data_tmp)
+            data_descs.add_data(data_tmp, take_ownership=self.take_ownership)
             trace_dd("\t" + str(i+1) + " datasets processed of " + str(dataset_count)) #type: ignore  # noqa E501
             trace_dd("\t " + str(offset) + " bytes processed of " + str(packet_size)) #type: ignore  # noqa E501
 
@@ -1923,6 +2218,11 @@ class NatNetClient:
         self.__nat_net_stream_version_server[1] = nnsvs[1]
         self.__nat_net_stream_version_server[2] = nnsvs[2]
         self.__nat_net_stream_version_server[3] = nnsvs[3]
+
+        # Connection info (4.0+), starts with the high resolution clock
+        # frequency
+        if packet_size - offset >= 8:
+            self.clock_frequency = int.from_bytes(data[offset:offset+8], byteorder='little', signed=False) #type: ignore  # noqa E501
         if (self.__nat_net_requested_version[0] == 0) and\
            (self.__nat_net_requested_version[1] == 0):
             print("resetting requested version to %d %d %d %d from %d %d %d %d" % ( #type: ignore  # noqa E501
@@ -1961,7 +2261,8 @@ class NatNetClient:
 
     def __unpack_bitstream_info(self, data, packet_size, major, minor):
         nn_version = []
-        inString = data.decode('utf-8')
+        # The response is null terminated
+        inString = bytes(data).partition(b'\0')[0].decode('utf-8')
         messageList = inString.split(',')
         if (len(messageList) > 1):
             if (messageList[0] == 'Bitstream'):
@@ -1972,19 +2273,14 @@ class NatNetClient:
         message_id_dict = {}
         if not self.use_multicast:
             in_socket.settimeout(2.0)
-        data = bytearray(0) #type: ignore  # noqa F841
-        # 64k buffer size
-        recv_buffer_size = 128*1024
-        buffer_list_size = 4
-        buffer_list = [bytearray(recv_buffer_size) for _ in range(buffer_list_size)] #type: ignore  # noqa E501
-        buffer_list_recv_index = 0
-        buffer_list_in_use_index = 0
+        # Unicast frames arrive on the command socket
+        receiver = PacketReceiver(in_socket)
+        self.command_receiver = receiver
         while not stop():
+            packets = []
             # Block for input
             try:
-                buffer_list[buffer_list_recv_index], addr = in_socket.recvfrom(recv_buffer_size) #type: ignore  # noqa E501
-                buffer_list_in_use_index = buffer_list_recv_index
-                buffer_list_recv_index = (buffer_list_recv_index + 1) % buffer_list_size #type: ignore  # noqa E501
+                packets = receiver.receive()
             except socket.error as msg: #type: ignore  # noqa F841
                 if stop():
                     # print("ERROR: command socket access error occurred:\n  %s" %msg) #type: ignore  # noqa E501
@@ -2001,22 +2297,24 @@ class NatNetClient:
                     print("ERROR: command socket access timeout occurred. Server not responding") #type: ignore  # noqa E501
                     # return 4
 
-            if len(buffer_list[buffer_list_in_use_index]) > 0:
+            capture_writer = self.capture_writer
+            for data, receive_time in packets:
+                if len(data) == 0:
+                    continue
+                if capture_writer is not None:
+                    capture_writer.write(data, receive_time)
+                self.receive_time = receive_time
                 # peek ahead at message_id
-                message_id = get_message_id(buffer_list[buffer_list_in_use_index]) #type: ignore  # noqa E501
-                tmp_str = "mi_%1.1d" % message_id
-                if tmp_str not in message_id_dict:
-                    message_id_dict[tmp_str] = 0
-                message_id_dict[tmp_str] += 1
+                message_id = get_message_id(data)
+                message_id_dict[message_id] = message_id_dict.get(message_id, 0) + 1 #type: ignore  # noqa E501
                 print_level = gprint_level()
                 if message_id == self.NAT_FRAMEOFDATA:
                     if print_level > 0:
-                        if (message_id_dict[tmp_str] % print_level) == 0:
+                        if (message_id_dict[message_id] % print_level) == 0:
                             print_level = 1
                         else:
                             print_level = 0
-                message_id = self.__process_message(buffer_list[buffer_list_in_use_index], print_level) #type: ignore  # noqa E501
-                buffer_list[buffer_list_in_use_index] = bytearray(0)
+                message_id = self.__process_message(data, print_level)
 
             if not self.use_multicast:
                 if not stop():
@@ -2028,13 +2326,13 @@ class NatNetClient:
 
     def __data_thread_function(self, in_socket, stop, gprint_level):
         message_id_dict = {}
-        data = bytearray(0)
-        # 64k buffer size
-        recv_buffer_size = 128*1024
+        receiver = PacketReceiver(in_socket)
+        self.data_receiver = receiver
         while not stop():
+            packets = []
             # Block for input
             try:
-                data, addr = in_socket.recvfrom(recv_buffer_size)
+                packets = receiver.receive()
             except socket.error as msg:
                 if not stop():
                     print("ERROR: data socket access error occurred:\n  %s" % msg) #type: ignore  # noqa E501
@@ -2049,31 +2347,48 @@ class NatNetClient:
                 # if self.use_multicast:
                 print("ERROR: data socket access timeout occurred. Server not responding") #type: ignore  # noqa E501
                 # return 4
-            if len(data) > 0:
+            capture_writer = self.capture_writer
+            for data, receive_time in packets:
+                if len(data) == 0:
+                    continue
+                if capture_writer is not None:
+                    capture_writer.write(data, receive_time)
+                self.receive_time = receive_time
                 # peek ahead at message_id
                 message_id = get_message_id(data)
-                tmp_str = "mi_%1.1d" % message_id
-                if tmp_str not in message_id_dict:
-                    message_id_dict[tmp_str] = 0
-                message_id_dict[tmp_str] += 1
+                message_id_dict[message_id] = message_id_dict.get(message_id, 0) + 1 #type: ignore  # noqa E501
                 print_level = gprint_level()
                 if message_id == self.NAT_FRAMEOFDATA:
                     if print_level > 0:
-                        if (message_id_dict[tmp_str] % print_level) == 0:
+                        if (message_id_dict[message_id] % print_level) == 0:
                             print_level = 1
                         else:
                             print_level = 0
                 message_id = self.__process_message(data, print_level)
-                data = bytearray(0)
 
         return 0
 
+    def get_receive_stats(self):
+        """Receive counters of the data and command sockets combined,
+        unicast frames arrive on the command socket"""
+        receivers = [receiver for receiver in (self.data_receiver, self.command_receiver) if receiver is not None] #type: ignore  # noqa E501
+        stats = [receiver.get_stats() for receiver in receivers]
+        return {
+            "packet_count": sum(s["packet_count"] for s in stats),
+            "batch_count": sum(s["batch_count"] for s in stats),
+            "max_batch": max((s["max_batch"] for s in stats), default=0),
+            "kernel_drop_count": sum(s["kernel_drop_count"] for s in stats),
+            "truncated_count": sum(s["truncated_count"] for s in stats),
+            "receive_buffer_size": min((s["receive_buffer_size"] for s in stats), default=0), #type: ignore  # noqa E501
+        }
+
     def __process_message(self, data: bytes, print_level=0):
         # return message ID
         major = self.get_major()
         minor = self.get_minor()
 
-        trace("Begin Packet\n-----------------")
+        if TRACE:
+            trace("Begin Packet\n-----------------")
         show_nat_net_version = False
         if show_nat_net_version:
             trace("NatNetVersion ", str(self.__nat_net_requested_version[0]), " " #type: ignore  # noqa E501
@@ -2087,23 +2402,32 @@ class NatNetClient:
 
         # skip the 4 bytes for message ID and packet_size
         offset = 4
-        if message_id == self.NAT_FRAMEOFDATA:
-            trace("Message ID : %3.1d NAT_FRAMEOFDATA" % message_id)
-            trace("Packet Size: ", packet_size)
+        if message_id == self.NAT_FRAMEOFDATA and major == 0 and minor == 0:
+            # Multicast frames can arrive before the server info reply
+            self.unversioned_frame_count += 1
+        elif message_id == self.NAT_FRAMEOFDATA:
+            if TRACE:
+                trace("Message ID : %3.1d NAT_FRAMEOFDATA" % message_id)
+                trace("Packet Size: ", packet_size)
 
             offset_tmp, mocap_data = self.__unpack_mocap_data(data[offset:], packet_size, major, minor) #type: ignore  # noqa E501
             offset += offset_tmp
-            print("MoCap Frame: %d\n" % (mocap_data.prefix_data.frame_number))
+            if self.print_level > 0:
+                self.stats_reporter.frame(mocap_data.prefix_data.frame_number, self.receive_time, #type: ignore  # noqa E501
+                                          self.frame_buffer.dropped_frame_count) #type: ignore  # noqa E501
             # get a string version of the data for output
             if print_level >= 1:
                 mocap_data_str = mocap_data.get_as_string()
                 print(" %s\n" % mocap_data_str)
 
         elif message_id == self.NAT_MODELDEF:
-            trace("Message ID : %3.1d NAT_MODELDEF" % message_id)
-            trace("Packet Size: %d" % packet_size)
+            if TRACE:
+                trace("Message ID : %3.1d NAT_MODELDEF" % message_id)
+                trace("Packet Size: %d" % packet_size)
             offset_tmp, data_descs = self.__unpack_data_descriptions(data[offset:], packet_size, major, minor) #type: ignore  # noqa E501
             offset += offset_tmp
+            self.data_descriptions = data_descs
+            self.__resolve_rigid_body_filter()
             print("Data Descriptions:\n")
             # get a string version of the data for output
             data_descs_str = data_descs.get_as_string()
@@ -2111,13 +2435,15 @@ class NatNetClient:
                 print(" %s\n" % (data_descs_str))
 
         elif message_id == self.NAT_SERVERINFO:
-            trace("Message ID : %3.1d NAT_SERVERINFO" % message_id)
-            trace("Packet Size: ", packet_size)
+            if TRACE:
+                trace("Message ID : %3.1d NAT_SERVERINFO" % message_id)
+                trace("Packet Size: ", packet_size)
             offset += self.__unpack_server_info(data[offset:], packet_size, major, minor) #type: ignore  # noqa E501
 
         elif message_id == self.NAT_RESPONSE:
-            trace("Message ID : %3.1d NAT_RESPONSE" % message_id)
-            trace("Packet Size: ", packet_size)
+            if TRACE:
+                trace("Message ID : %3.1d NAT_RESPONSE" % message_id)
+                trace("Packet Size: ", packet_size)
             if packet_size == 4:
                 command_response = int.from_bytes(data[offset:offset+4], byteorder='little',  signed=True) #type: ignore  # noqa E501
                 trace("Command response: %d - %d %d %d %d" % (command_response,
@@ -2146,26 +2472,45 @@ class NatNetClient:
                 if (show_remainder):
                     trace("Command response:", message.decode('utf-8'),
                           " separator:", separator, " remainder:", remainder)
-                else:
+                elif TRACE:
                     trace("Command response:", message.decode('utf-8'))
         elif message_id == self.NAT_UNRECOGNIZED_REQUEST:
-            trace("Message ID : %3.1d NAT_UNRECOGNIZED_REQUEST: " % message_id)
-            trace("Packet Size: ", packet_size)
-            trace("Received 'Unrecognized request' from server")
+            if TRACE:
+                trace("Message ID : %3.1d NAT_UNRECOGNIZED_REQUEST: " % message_id) #type: ignore  # noqa E501
+                trace("Packet Size: ", packet_size)
+                trace("Received 'Unrecognized request' from server")
         elif message_id == self.NAT_MESSAGESTRING:
-            trace("Message ID : %3.1d NAT_MESSAGESTRING" % message_id)
-            trace("Packet Size: ", packet_size)
+            if TRACE:
+                trace("Message ID : %3.1d NAT_MESSAGESTRING" % message_id)
+                trace("Packet Size: ", packet_size)
             message, separator, remainder = bytes(data[offset:]).partition(b'\0') #type: ignore  # noqa E501
             offset += len(message) + 1
-            trace("Received message from server:", message.decode('utf-8'))
+            if TRACE:
+                trace("Received message from server:", message.decode('utf-8'))
         else:
-            trace("Message ID : %3.1d UNKNOWN" % message_id)
-            trace("Packet Size: ", packet_size)
-            trace("ERROR: Unrecognized packet type")
+            if TRACE:
+                trace("Message ID : %3.1d UNKNOWN" % message_id)
+                trace("Packet Size: ", packet_size)
+                trace("ERROR: Unrecognized packet type")
 
-        trace("End Packet\n-----------------")
+        if TRACE:
+            trace("End Packet\n-----------------")
         return message_id
 
+    def process_message(self, data, print_level=0, receive_time=None):
+        """Decode one NatNet message as if it had just been received, or
+        at the given perf_counter time. Returns the message ID."""
+        self.receive_time = time.perf_counter() if receive_time is None else receive_time #type: ignore  # noqa E501
+        return self.__process_message(data, print_level)
+
+    def set_decode_version(self, major, minor):
+        """Set the NatNet version used to decode messages without asking
+        a server, e.g. when decoding recorded packets"""
+        self.__nat_net_requested_version[0] = major
+        self.__nat_net_requested_version[1] = minor
+        self.__nat_net_requested_version[2] = 0
+        self.__nat_net_requested_version[3] = 0
+
     def send_request(self, in_socket, command, command_str, address):
         # Compose the message in our known message format
         packet_size = 0
@@ -2236,6 +2581,35 @@ class NatNetClient:
     def send_keep_alive(self, in_socket, server_ip_address, server_port):
         return self.send_request(in_socket, self.NAT_KEEPALIVE, "", (server_ip_address, server_port)) #type: ignore  # noqa E501
 
+    def get_latest(self, max_age=None):
+        """Newest decoded rigid body frame, or None if no frame arrived
+        within max_age seconds. Does not block or copy."""
+        return self.frame_buffer.get_latest(max_age)
+
+    def get_since(self, frame_number):
+        """Decoded rigid body frames newer than frame_number, oldest first"""
+        return self.frame_buffer.get_since(frame_number)
+
+    def start_capture(self, path):
+        """Append every datagram received from now on to a capture file,
+        see packet_capture. Start before run() to capture the server info
+        a replay needs to know the stream version."""
+        self.stop_capture()
+        self.capture_writer = PacketCaptureWriter(path)
+        return self.capture_writer
+
+    def stop_capture(self):
+        """Finish writing the capture, returns its stats or None"""
+        capture_writer = self.capture_writer
+        if capture_writer is None:
+            return None
+        self.capture_writer = None
+        capture_writer.close()
+        return capture_writer.get_stats()
+
+    def get_frame_buffer_stats(self):
+        return self.frame_buffer.get_stats()
+
     def get_command_port(self):
         return self.command_port
 
@@ -2272,6 +2646,13 @@ class NatNetClient:
             return False
         self.__is_locked = True
 
+        # Frames arrive on the data socket (multicast) or the command
+        # socket (unicast)
+        for name, sock in (("Data", self.data_socket), ("Command", self.command_socket)): #type: ignore  # noqa E501
+            requested, granted = size_receive_buffer(sock, self.frame_rate, self.max_packet_size, self.receive_buffer_seconds) #type: ignore  # noqa E501
+            if granted < requested:
+                print("%s socket receive buffer limited to %d of %d bytes, raise net.core.rmem_max" % (name, granted, requested)) #type: ignore  # noqa E501
+
         self.stop_threads = False
 
         # Create a separate thread for receiving data packets
@@ -2301,12 +2682,18 @@ class NatNetClient:
     def shutdown(self):
         print("shutdown called")
         self.stop_threads = True
-        # closing sockets causes blocking recvfrom to throw
-        # an exception and break the loop
-        self.command_socket.close()
-        self.data_socket.close()
+        # closing a socket does not wake a thread blocked in recvfrom on
+        # Linux, shutdown does (recvfrom returns no data, or throws) and the
+        # thread sees stop_threads
+        for sock in (self.command_socket, self.data_socket):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
         # attempt to join the threads back.
         if self.command_thread.is_alive():
             self.command_thread.join()
         if self.data_thread.is_alive():
             self.data_thread.join()
+        self.stop_capture()
@@ -0,0 +1,150 @@
+# Encodes NatNet messages in the layout NatNetClient decodes.
+#
+# Used to build packet corpora for benchmarks and to stand in for a
+# Motive server. Only the NatNet 3.0+ frame layout is supported.
+
+import socket
+import struct
+import numpy as np
+from natnet_client import NatNetClient, RigidBodyRecord, RigidBodyRecordDtype, Vector3, Quaternion #type: ignore  # noqa E501
+
+IntValue = struct.Struct('<i')
+MessageHeader = struct.Struct('<hH')
+LabeledMarkerRecord = struct.Struct('<i3ffhf')
+FrameSuffix = struct.Struct('<iidqqqh')
+# High resolution clock frequency, data port, multicast flag and address
+ConnectionInfo = struct.Struct('<QHB4s')
+
+
+def has_data_size(major, minor):
+    """NatNet 4.1 and later prefix every frame section with its byte count"""
+    return ((major == 4) and (minor > 0)) or (major > 4)
+
+
+def pack_message(message_id, payload):
+    """Prefix a payload with the message ID and packet size"""
+    if len(payload) > 0xFFFF:
+        raise ValueError("NatNet packet payload of %d bytes is too large" % len(payload)) #type: ignore  # noqa E501
+    return MessageHeader.pack(message_id, len(payload)) + payload
+
+
+def pack_section(count, payload, major, minor):
+    """Frame section: element count, byte count (4.1+) and the elements"""
+    section = IntValue.pack(count)
+    if has_data_size(major, minor):
+        section += IntValue.pack(len(payload))
+    return section + payload
+
+
+def pack_marker_sets(marker_sets, major, minor):
+    """marker_sets: list of (model_name, [(x, y, z), ...])"""
+    payload = b''
+    for model_name, positions in marker_sets:
+        payload += model_name.encode('utf-8') + b'\0'
+        payload += IntValue.pack(len(positions))
+        for pos in positions:
+            payload += Vector3.pack(*pos)
+    return pack_section(len(marker_sets), payload, major, minor)
+
+
+def rigid_body_records(count):
+    """Zeroed record array for pack_rigid_bodies, fill its id, pos, rot,
+    error and param fields (param bit 0 is tracking valid)"""
+    return np.zeros(count, dtype=RigidBodyRecordDtype)
+
+
+def pack_rigid_bodies(rigid_bodies, major, minor):
+    """rigid_bodies: list of (id, (x, y, z), (qx, qy, qz, qw), error, tracking_valid)
+    or a record array from rigid_body_records()""" #type: ignore  # noqa E501
+    if isinstance(rigid_bodies, np.ndarray):
+        return pack_section(len(rigid_bodies), rigid_bodies.tobytes(), major, minor) #type: ignore  # noqa E501
+    payload = b''.join(RigidBodyRecord.pack(new_id, *pos, *rot, error, 1 if valid else 0) #type: ignore  # noqa E501
+                       for new_id, pos, rot, error, valid in rigid_bodies)
+    return pack_section(len(rigid_bodies), payload, major, minor)
+
+
+def pack_labeled_markers(labeled_markers, major, minor):
+    """labeled_markers: list of (id, (x, y, z), size, param, residual)"""
+    payload = b''.join(LabeledMarkerRecord.pack(new_id, *pos, size, param, residual) #type: ignore  # noqa E501
+                       for new_id, pos, size, param, residual in labeled_markers)
+    return pack_section(len(labeled_markers), payload, major, minor)
+
+
+def pack_frame_of_data(frame_number, rigid_bodies=(), labeled_markers=(),
+                       marker_sets=(), timestamp=0.0, timecode=0,
+                       timecode_sub=0, stamp_camera_mid_exposure=0,
+                       stamp_data_received=0, stamp_transmit=0, param=0,
+                       major=4, minor=1):
+    """Encode a complete NAT_FRAMEOFDATA message"""
+    if major < 3:
+        raise ValueError("Only NatNet 3.0 and later frames can be packed")
+
+    payload = IntValue.pack(frame_number)
+    payload += pack_marker_sets(marker_sets, major, minor)
+    # Legacy other markers
+    payload += pack_section(0, b'', major, minor)
+    payload += pack_rigid_bodies(rigid_bodies, major, minor)
+    # Skeletons
+    payload += pack_section(0, b'', major, minor)
+    # Assets (NatNet 4.1 and later)
+    if has_data_size(major, minor):
+        payload += pack_section(0, b'', major, minor)
+    payload += pack_labeled_markers(labeled_markers, major, minor)
+    # Force plates and devices
+    payload += pack_section(0, b'', major, minor)
+    payload += pack_section(0, b'', major, minor)
+    payload += FrameSuffix.pack(timecode, timecode_sub, timestamp,
+                                stamp_camera_mid_exposure, stamp_data_received,
+                                stamp_transmit, param)
+    return pack_message(NatNetClient.NAT_FRAMEOFDATA, payload)
+
+
+def pack_rigid_body_description(name, new_id, parent_id=-1, pos=(0.0, 0.0, 0.0),
+                                rot=(0.0, 0.0, 0.0, 1.0), major=4, minor=1):
+    """Rigid body description without markers"""
+    payload = name.encode('utf-8') + b'\0'
+    payload += IntValue.pack(new_id) + IntValue.pack(parent_id)
+    payload += Vector3.pack(*pos)
+    # Orientation offset (NatNet 4.2 and later)
+    if (major == 4 and minor >= 2) or major > 4:
+        payload += Quaternion.pack(*rot)
+    # Marker count
+    payload += IntValue.pack(0)
+    return payload
+
+
+def pack_model_def(rigid_bodies, major=4, minor=1):
+    """Encode a NAT_MODELDEF message describing rigid bodies.
+    rigid_bodies: list of (name, id)"""
+    payload = IntValue.pack(len(rigid_bodies))
+    for name, new_id in rigid_bodies:
+        description = pack_rigid_body_description(name, new_id, major=major, minor=minor) #type: ignore  # noqa E501
+        # Data type 1 is a rigid body, 4.1+ adds the description size
+        payload += IntValue.pack(1)
+        if has_data_size(major, minor):
+            payload += IntValue.pack(len(description))
+        payload += description
+    return pack_message(NatNetClient.NAT_MODELDEF, payload)
+
+
+def pack_server_info(application_name, server_version, nat_net_version,
+                     clock_frequency, data_port, multicast,
+                     multicast_address):
+    """Encode the NAT_SERVERINFO reply to NAT_CONNECT"""
+    payload = application_name.encode('utf-8')[:255].ljust(256, b'\0')
+    payload += bytes(server_version) + bytes(nat_net_version)
+    payload += ConnectionInfo.pack(clock_frequency, data_port,
+                                   1 if multicast else 0,
+                                   socket.inet_aton(multicast_address))
+    return pack_message(NatNetClient.NAT_SERVERINFO, payload)
+
+
+def pack_response(value=0):
+    """Encode a NAT_RESPONSE carrying a return code"""
+    return pack_message(NatNetClient.NAT_RESPONSE, IntValue.pack(value))
+
+
+def pack_response_string(message):
+    """Encode a NAT_RESPONSE carrying a string"""
+    return pack_message(NatNetClient.NAT_RESPONSE,
+                        message.encode('utf-8') + b'\0')
@@ -0,0 +1,401 @@
+# Stand-in for a Motive NatNet server.
+#
+# Replays recorded takes (formatted Motive CSVs) as NatNet 4.x
+# NAT_FRAMEOFDATA packets over UDP and answers the command channel
+# (NAT_CONNECT, NAT_KEEPALIVE, NAT_REQUEST "Bitstream", NAT_REQUEST_MODELDEF,
+# NAT_REQUEST_FRAMEOFDATA), so NatNetClient and the online teleop mode run
+# without cameras. Frame rate, send jitter, packet loss and reordering are
+# configurable for load tests.
+#
+# Unicast frames go to every client that connected or sent a keep alive on
+# the command port; multicast frames go to multicast_address:data_port.
+# Frame stamps are perf_counter_ns ticks (clock frequency 1e9), the same
+# clock the client stamps received packets with.
+#
+#   python3 teleop/NatNet/natnet_server_sim.py --address 127.0.0.1 --rate 240
+#   python3 teleop/NatNet/natnet_server_sim.py --rate 360 --jitter_ms 0.5 --loss 0.01 --reorder 0.01 --extra_bodies 50 #type: ignore  # noqa E501
+
+import os
+import sys
+import glob
+import socket
+import random
+import argparse
+import threading
+import time
+import numpy as np
+import pandas as pd
+import natnet_packer
+from natnet_client import NatNetClient
+from natnet_parser import NatNetParser
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../training/dataset/FormattedData") #type: ignore  # noqa E501
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../config/natnet_config.yaml") #type: ignore  # noqa E501
+
+# Takes store positions in millimeters, Motive streams meters
+TAKE_POSITION_SCALE = 0.001
+
+# Spacing of the copies made by extra_bodies, in meters along x
+EXTRA_BODY_SPACING = 1.0
+
+# Highest NAT_REQUEST string that is answered, longer packets are ignored
+MAX_REQUEST_SIZE = 1024
+
+
+class Take:
+    """A recorded take resampled to the streaming rate.
+
+    positions (frames, bodies, 3) in meters, orientations (frames, bodies,
+    4) [qx, qy, qz, qw]. Frames where a body was not tracked (NaN in the
+    take) have tracking_valid False."""
+    def __init__(self, path, rate):
+        self.path = path
+        df = pd.read_csv(path)
+        self.names = [col.split(':')[0] for col in df.columns
+                      if col.endswith(":Rotation:X")]
+
+        times = df["Time (Seconds)"].to_numpy(dtype=np.float64)
+        self.times = np.arange(times[0], times[-1], 1.0 / rate)
+
+        positions = np.stack([df[[f"{name}:Position:{axis}" for axis in "XYZ"]].to_numpy(dtype=np.float64) #type: ignore  # noqa E501
+                              for name in self.names], axis=1)
+        orientations = np.stack([df[[f"{name}:Rotation:{axis}" for axis in "XYZW"]].to_numpy(dtype=np.float64) #type: ignore  # noqa E501
+                                 for name in self.names], axis=1)
+
+        # Linear interpolation of positions, normalized linear
+        # interpolation of the quaternions along the shorter arc
+        upper = np.clip(np.searchsorted(times, self.times, side='right'), 1, len(times) - 1) #type: ignore  # noqa E501
+        lower = upper - 1
+        alpha = ((self.times - times[lower]) / (times[upper] - times[lower]))[:, None, None] #type: ignore  # noqa E501
+
+        self.positions = (positions[lower] * (1 - alpha) + positions[upper] * alpha) * TAKE_POSITION_SCALE #type: ignore  # noqa E501
+        q0 = orientations[lower]
+        q1 = orientations[upper]
+        q1 = np.where((q0 * q1).sum(axis=2, keepdims=True) < 0, -q1, q1)
+        q = q0 * (1 - alpha) + q1 * alpha
+        self.orientations = q / np.linalg.norm(q, axis=2, keepdims=True)
+
+        self.tracking_valid = ~(np.isnan(self.positions).any(axis=2) |
+                                np.isnan(self.orientations).any(axis=2))
+        self.positions[~self.tracking_valid] = 0.0
+        self.orientations[~self.tracking_valid] = (0.0, 0.0, 0.0, 1.0)
+
+    def __len__(self):
+        return len(self.times)
+
+
+class NatNetServerSim:
+    def __init__(self, takes, rate=120.0, address="127.0.0.1",
+                 command_port=1510, data_port=1511, multicast=False,
+                 multicast_address="239.255.42.99", jitter=0.0, loss=0.0,
+                 reorder=0.0, extra_bodies=0, loop=False, version=(4, 1),
+                 rigid_body_ids=None, seed=None):
+        self.takes = takes
+        self.rate = rate
+        self.address = address
+        self.command_port = command_port
+        self.data_port = data_port
+        self.multicast = multicast
+        self.multicast_address = multicast_address
+        # Std dev of the half normal delay added to each send, in seconds
+        self.jitter = jitter
+        # Probability a frame is never sent
+        self.loss = loss
+        # Probability a frame is held back and sent after the next one
+        self.reorder = reorder
+        self.loop = loop
+        self.version = list(version)
+        self.random = random.Random(seed)
+
+        # Streaming ID of every body of the takes, key: name
+        self.rigid_body_ids = dict(rigid_body_ids or {})
+        next_id = max(self.rigid_body_ids.values(), default=0) + 1
+        for take in takes:
+            for name in take.names:
+                if name not in self.rigid_body_ids:
+                    self.rigid_body_ids[name] = next_id
+                    next_id += 1
+        self.extra_bodies = extra_bodies
+        self.first_extra_id = next_id
+
+        # Unicast destinations, filled by NAT_CONNECT and NAT_KEEPALIVE
+        self.clients = set()
+        self.clients_lock = threading.Lock()
+        self.latest_packet = None
+
+        self.command_socket = None
+        self.data_socket = None
+        self.command_thread = None
+        self.stream_thread = None
+        self.stop_event = threading.Event()
+        self.finished_event = threading.Event()
+
+        self.sent_count = 0
+        self.lost_count = 0
+        self.reordered_count = 0
+        self.request_count = 0
+        self.max_send_delay = 0.0
+        self.start_time = None
+        self.end_time = None
+
+    def get_rigid_bodies(self):
+        """(name, id) of every streamed rigid body"""
+        rigid_bodies = list(self.rigid_body_ids.items())
+        names = [name for name, _ in rigid_bodies]
+        for i in range(self.extra_bodies):
+            rigid_bodies.append((f"{names[i % len(names)]}_{i // len(names) + 1}", #type: ignore  # noqa E501
+                                 self.first_extra_id + i))
+        return rigid_bodies
+
+    def start(self):
+        self.command_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) #type: ignore  # noqa E501
+        self.command_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #type: ignore  # noqa E501
+        self.command_socket.bind((self.address, self.command_port))
+        self.command_socket.settimeout(0.2)
+
+        if self.multicast:
+            self.data_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP) #type: ignore  # noqa E501
+            self.data_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1) #type: ignore  # noqa E501
+            self.data_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1) #type: ignore  # noqa E501
+            self.data_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.address)) #type: ignore  # noqa E501
+
+        self.stop_event.clear()
+        self.finished_event.clear()
+        self.command_thread = threading.Thread(target=self.__command_thread_function, name="NatNetSimCommand", daemon=True) #type: ignore  # noqa E501
+        self.stream_thread = threading.Thread(target=self.__stream_thread_function, name="NatNetSimStream", daemon=True) #type: ignore  # noqa E501
+        self.command_thread.start()
+        self.stream_thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in (self.stream_thread, self.command_thread):
+            if thread is not None:
+                thread.join()
+        for sock in (self.command_socket, self.data_socket):
+            if sock is not None:
+                sock.close()
+
+    def wait(self, timeout=None):
+        """Block until every take was streamed (never returns with loop)"""
+        return self.finished_event.wait(timeout)
+
+    def __add_client(self, address):
+        with self.clients_lock:
+            self.clients.add(address)
+
+    def __command_thread_function(self):
+        while not self.stop_event.is_set():
+            try:
+                data, address = self.command_socket.recvfrom(MAX_REQUEST_SIZE) #type: ignore  # noqa E501
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if len(data) < 4:
+                continue
+
+            self.request_count += 1
+            message_id = int.from_bytes(data[0:2], byteorder='little', signed=True) #type: ignore  # noqa E501
+            reply = None
+            if message_id == NatNetClient.NAT_CONNECT:
+                self.__add_client(address)
+                reply = natnet_packer.pack_server_info(
+                    "NatNet Server Sim", (3, 1, 0, 0), self.version + [0, 0],
+                    10**9, self.data_port, self.multicast,
+                    self.multicast_address)
+            elif message_id == NatNetClient.NAT_KEEPALIVE:
+                self.__add_client(address)
+            elif message_id == NatNetClient.NAT_REQUEST:
+                reply = self.__handle_request(bytes(data[4:]).partition(b'\0')[0].decode('utf-8')) #type: ignore  # noqa E501
+            elif message_id == NatNetClient.NAT_REQUEST_MODELDEF:
+                reply = natnet_packer.pack_model_def(self.get_rigid_bodies(), *self.version) #type: ignore  # noqa E501
+            elif message_id == NatNetClient.NAT_REQUEST_FRAMEOFDATA:
+                reply = self.latest_packet
+            else:
+                reply = natnet_packer.pack_message(NatNetClient.NAT_UNRECOGNIZED_REQUEST, b'') #type: ignore  # noqa E501
+
+            if reply is not None:
+                try:
+                    self.command_socket.sendto(reply, address)
+                except OSError:
+                    pass
+
+    def __handle_request(self, command):
+        """Reply to a NAT_REQUEST command string"""
+        parts = command.split(',')
+        if parts[0] == "Bitstream":
+            if len(parts) == 1:
+                return natnet_packer.pack_response_string("Bitstream,%d.%d.0.0" % tuple(self.version)) #type: ignore  # noqa E501
+            try:
+                major, minor = (int(x) for x in parts[1].split('.')[:2])
+            except ValueError:
+                return natnet_packer.pack_response(1)
+            if major < 3:
+                return natnet_packer.pack_response(1)
+            self.version = [major, minor]
+            return natnet_packer.pack_response(0)
+        # Timeline and other Motive commands are accepted and ignored
+        return natnet_packer.pack_response(0)
+
+    def __send(self, packet):
+        if self.multicast:
+            self.data_socket.sendto(packet, (self.multicast_address, self.data_port)) #type: ignore  # noqa E501
+            return
+        with self.clients_lock:
+            clients = list(self.clients)
+        for address in clients:
+            try:
+                self.command_socket.sendto(packet, address)
+            except OSError:
+                pass
+
+    def __stream_thread_function(self):
+        period = 1.0 / self.rate
+        period_ns = int(1e9 / self.rate)
+        records = natnet_packer.rigid_body_records(len(self.get_rigid_bodies()))
+        records['id'] = [new_id for _, new_id in self.get_rigid_bodies()]
+        records['error'] = 0.0005
+        n_take_bodies = len(self.rigid_body_ids)
+        # Extra bodies copy the take bodies with an offset
+        extra_source = np.arange(self.extra_bodies) % n_take_bodies
+        extra_offset = np.zeros((self.extra_bodies, 3), dtype=np.float32)
+        extra_offset[:, 0] = (np.arange(self.extra_bodies) // n_take_bodies + 1) * EXTRA_BODY_SPACING #type: ignore  # noqa E501
+
+        held_packet = None
+        frame_number = 0
+        self.start_time = time.perf_counter()
+        start_ns = time.perf_counter_ns()
+
+        while not self.stop_event.is_set():
+            for take in self.takes:
+                # Column of each take body in the record array
+                columns = [list(self.rigid_body_ids).index(name) for name in take.names] #type: ignore  # noqa E501
+                # Bodies missing from this take are untracked
+                records['param'][:n_take_bodies] = 0
+                for k in range(len(take)):
+                    if self.stop_event.is_set():
+                        break
+
+                    records['pos'][columns] = take.positions[k]
+                    records['rot'][columns] = take.orientations[k]
+                    records['param'][columns] = take.tracking_valid[k]
+                    if self.extra_bodies:
+                        records['pos'][n_take_bodies:] = records['pos'][extra_source] + extra_offset #type: ignore  # noqa E501
+                        records['rot'][n_take_bodies:] = records['rot'][extra_source] #type: ignore  # noqa E501
+                        records['param'][n_take_bodies:] = records['param'][extra_source] #type: ignore  # noqa E501
+
+                    # Wait for the frame's send time
+                    send_time = self.start_time + frame_number * period
+                    if self.jitter > 0:
+                        send_time += abs(self.random.gauss(0.0, self.jitter))
+                    delay = send_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self.max_send_delay = max(self.max_send_delay, -delay)
+
+                    exposure_ns = start_ns + frame_number * period_ns
+                    packet = natnet_packer.pack_frame_of_data(
+                        frame_number, records,
+                        timestamp=frame_number * period,
+                        stamp_camera_mid_exposure=exposure_ns,
+                        stamp_data_received=exposure_ns,
+                        stamp_transmit=time.perf_counter_ns(),
+                        major=self.version[0], minor=self.version[1])
+                    self.latest_packet = packet
+                    frame_number += 1
+
+                    if self.random.random() < self.loss:
+                        self.lost_count += 1
+                        continue
+                    if held_packet is None and self.random.random() < self.reorder: #type: ignore  # noqa E501
+                        held_packet = packet
+                        self.reordered_count += 1
+                        continue
+
+                    self.__send(packet)
+                    self.sent_count += 1
+                    if held_packet is not None:
+                        self.__send(held_packet)
+                        self.sent_count += 1
+                        held_packet = None
+
+            if not self.loop:
+                break
+
+        if held_packet is not None:
+            self.__send(held_packet)
+            self.sent_count += 1
+        self.end_time = time.perf_counter()
+        self.finished_event.set()
+
+    def get_stats(self):
+        elapsed = (self.end_time or time.perf_counter()) - (self.start_time or time.perf_counter()) #type: ignore  # noqa E501
+        frames = self.sent_count + self.lost_count
+        return {
+            "sent_count": self.sent_count,
+            "lost_count": self.lost_count,
+            "reordered_count": self.reordered_count,
+            "request_count": self.request_count,
+            "client_count": len(self.clients),
+            "rate": frames / elapsed if elapsed > 0 else 0.0,
+            "max_send_delay": self.max_send_delay,
+        }
+
+    def print_summary(self):
+        stats = self.get_stats()
+        print("\n-----------------NatNet server sim-----------------")
+        print("Frames sent: %d, lost: %d, reordered: %d" % (stats["sent_count"], stats["lost_count"], stats["reordered_count"])) #type: ignore  # noqa E501
+        print("Rate: %.1f Hz (target %.1f), max late send: %.3f ms" % (stats["rate"], self.rate, stats["max_send_delay"] * 1e3)) #type: ignore  # noqa E501
+        print("Requests: %d, unicast clients: %d" % (stats["request_count"], stats["client_count"])) #type: ignore  # noqa E501
+
+
+def main():
+    config = NatNetParser().parse_config_file(DEFAULT_CONFIG_PATH)['natnet_config'] #type: ignore  # noqa E501
+
+    parser = argparse.ArgumentParser("Replay recorded takes as a NatNet server")
+    parser.add_argument('--data_dir', type=str, default=DEFAULT_DATA_DIR, help="Directory of formatted takes") #type: ignore  # noqa E501
+    parser.add_argument('--takes', type=str, default="*.csv", help="Glob of the takes to stream, in file name order") #type: ignore  # noqa E501
+    parser.add_argument('--rate', type=float, default=120.0, help="Frames per second") #type: ignore  # noqa E501
+    parser.add_argument('--address', type=str, default=config['server_address'], help="Address to serve on") #type: ignore  # noqa E501
+    parser.add_argument('--command_port', type=int, default=config['command_port']) #type: ignore  # noqa E501
+    parser.add_argument('--data_port', type=int, default=config['data_port']) #type: ignore  # noqa E501
+    parser.add_argument('--multicast', action='store_true', help="Stream to the multicast address instead of unicast clients") #type: ignore  # noqa E501
+    parser.add_argument('--multicast_address', type=str, default=config['multicast_address']) #type: ignore  # noqa E501
+    parser.add_argument('--jitter_ms', type=float, default=0.0, help="Std dev of the random send delay") #type: ignore  # noqa E501
+    parser.add_argument('--loss', type=float, default=0.0, help="Fraction of frames dropped") #type: ignore  # noqa E501
+    parser.add_argument('--reorder', type=float, default=0.0, help="Fraction of frames sent after their successor") #type: ignore  # noqa E501
+    parser.add_argument('--extra_bodies', type=int, default=0, help="Additional copies of the take bodies to stream") #type: ignore  # noqa E501
+    parser.add_argument('--version', type=str, default="4.1", help="NatNet bitstream version") #type: ignore  # noqa E501
+    parser.add_argument('--loop', action='store_true', help="Stream the takes forever") #type: ignore  # noqa E501
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.data_dir, args.takes)))
+    if not paths:
+        print("No takes match %s" % os.path.join(args.data_dir, args.takes))
+        sys.exit(1)
+    takes = [Take(path, args.rate) for path in paths]
+
+    server = NatNetServerSim(
+        takes, rate=args.rate, address=args.address,
+        command_port=args.command_port, data_port=args.data_port,
+        multicast=args.multicast, multicast_address=args.multicast_address,
+        jitter=args.jitter_ms * 1e-3, loss=args.loss, reorder=args.reorder,
+        extra_bodies=args.extra_bodies, loop=args.loop,
+        version=[int(x) for x in args.version.split('.')[:2]],
+        rigid_body_ids=config.get('rigid_bodies'), seed=args.seed)
+
+    print("Streaming %d takes (%d frames) at %.0f Hz on %s" % (
+        len(takes), sum(len(take) for take in takes), args.rate, args.address)) #type: ignore  # noqa E501
+    server.start()
+    try:
+        while not server.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    server.print_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# Capture and replay of the datagrams a NatNet client receives
+#
+# A capture file is an 8 byte header (magic and format version) followed
+# by one record per datagram: receive time (perf_counter seconds, float64),
+# length (uint32) and the datagram as received. Command replies are
+# captured along with the frames, so a capture started before connecting
+# holds the server info that tells the decoder the stream version.
+#
+# The writer runs on its own thread, the receive thread only copies the
+# packet into a queue. Replay feeds the packets to a NatNetClient through
+# process_message at the recorded pace, scaled, or as fast as possible, so
+# online mode and decode profiling run byte for byte on a recorded session.
+#
+#   python3 teleop/NatNet/packet_capture.py session.natcap --speed 0
+
+import sys
+import queue
+import struct
+import argparse
+import threading
+import time
+
+CAPTURE_MAGIC = b'NATCAP'
+CAPTURE_FORMAT_VERSION = 1
+CaptureHeader = struct.Struct('<6sH')
+RecordHeader = struct.Struct('<dI')
+
+
+class PacketCaptureWriter:
+    """Appends datagrams to a capture file from a background thread.
+
+    write() never blocks: packets arriving while queue_size are waiting
+    for the disk are dropped and counted."""
+    def __init__(self, path, queue_size=4096):
+        self.path = path
+        self.file = open(path, 'wb', buffering=1 << 20)
+        self.file.write(CaptureHeader.pack(CAPTURE_MAGIC, CAPTURE_FORMAT_VERSION)) #type: ignore  # noqa E501
+        self.queue = queue.Queue(queue_size)
+
+        self.packet_count = 0
+        self.byte_count = 0
+        self.dropped_count = 0
+        self.closed = False
+
+        self.thread = threading.Thread(target=self.__writer_thread_function,
+                                       daemon=True)
+        self.thread.start()
+
+    def write(self, data, receive_time):
+        """Queue a datagram, data may be a view of a reused buffer"""
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait((receive_time, bytes(data)))
+        except queue.Full:
+            self.dropped_count += 1
+
+    def __writer_thread_function(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            receive_time, data = item
+            self.file.write(RecordHeader.pack(receive_time, len(data)))
+            self.file.write(data)
+            self.packet_count += 1
+            self.byte_count += len(data)
+            # Keep what was received on disk once the queue is drained
+            if self.queue.empty():
+                self.file.flush()
+        self.file.close()
+
+    def close(self):
+        """Write the queued packets and close the file"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "packet_count": self.packet_count,
+            "byte_count": self.byte_count,
+            "dropped_count": self.dropped_count,
+        }
+
+
+def read_capture(path):
+    """(receive time, datagram) of each record of a capture file. A record
+    cut off at the end of the file (the capture didn't close) is ignored."""
+    with open(path, 'rb') as f:
+        header = f.read(CaptureHeader.size)
+        if len(header) < CaptureHeader.size:
+            raise ValueError("%s is not a NatNet capture" % path)
+        magic, version = CaptureHeader.unpack(header)
+        if magic != CAPTURE_MAGIC:
+            raise ValueError("%s is not a NatNet capture" % path)
+        if version != CAPTURE_FORMAT_VERSION:
+            raise ValueError("%s has capture format %d, expected %d" % (path, version, CAPTURE_FORMAT_VERSION)) #type: ignore  # noqa E501
+        while True:
+            record = f.read(RecordHeader.size)
+            if len(record) < RecordHeader.size:
+                return
+            receive_time, size = RecordHeader.unpack(record)
+            data = f.read(size)
+            if len(data) < size:
+                return
+            yield receive_time, data
+
+
+class PacketReplay:
+    """Feeds a capture to a NatNetClient through process_message.
+
+    speed 1.0 keeps the recorded timing, 2.0 plays twice as fast and 0 as
+    fast as possible. Packets are stamped with the time they are fed, so
+    frame ages and latency traces stay meaningful. The client needs no
+    sockets; frames land in its frame buffer and listeners as if
+    received."""
+    def __init__(self, client, path, speed=1.0):
+        self.client = client
+        self.path = path
+        self.speed = speed
+
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.finished_event = threading.Event()
+
+        self.packet_count = 0
+        # Largest delay behind the scaled recorded time, in seconds
+        self.max_lag = 0.0
+        self.start_time = None
+        self.end_time = None
+
+    def run(self):
+        """Replay on the calling thread until the capture ends or stop()"""
+        self.start_time = time.perf_counter()
+        first_time = None
+        try:
+            for receive_time, data in read_capture(self.path):
+                if self.stop_event.is_set():
+                    break
+                if self.speed > 0:
+                    if first_time is None:
+                        first_time = receive_time
+                    delay = self.start_time + (receive_time - first_time) / self.speed - time.perf_counter() #type: ignore  # noqa E501
+                    if delay > 0:
+                        time.sleep(delay)
+                    self.max_lag = max(self.max_lag, -delay)
+                self.client.process_message(data)
+                self.packet_count += 1
+        finally:
+            self.end_time = time.perf_counter()
+            self.finished_event.set()
+
+    def start(self):
+        """Replay on a background thread"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def wait(self, timeout=None):
+        """Wait for the end of the capture, True if it was reached"""
+        return self.finished_event.wait(timeout)
+
+    def get_stats(self):
+        elapsed = (self.end_time or time.perf_counter()) - (self.start_time or time.perf_counter()) #type: ignore  # noqa E501
+        return {
+            "packet_count": self.packet_count,
+            "elapsed": elapsed,
+            "max_lag": self.max_lag,
+        }
+
+
+def main():
+    # natnet_client imports this module
+    from natnet_client import NatNetClient
+
+    parser = argparse.ArgumentParser("Replay a NatNet capture through the client's decoder") #type: ignore  # noqa E501
+    parser.add_argument('path', type=str, help="Capture file")
+    parser.add_argument('--speed', type=float, default=0.0, help="Replay speed, 1 is the recorded timing, 0 as fast as possible") #type: ignore  # noqa E501
+    parser.add_argument('--print_level', type=int, default=0, help="Client print level") #type: ignore  # noqa E501
+    args = parser.parse_args()
+
+    client = NatNetClient()
+    client.set_print_level(args.print_level)
+    replay = PacketReplay(client, args.path, args.speed)
+    try:
+        replay.run()
+    except KeyboardInterrupt:
+        pass
+
+    stats = replay.get_stats()
+    frame_stats = client.frame_buffer.get_stats()
+    elapsed = max(stats["elapsed"], 1e-9)
+    print("Replayed %d packets in %.3f s, %d frames decoded (%.0f frames/s), max lag %.1f ms" % ( #type: ignore  # noqa E501
+        stats["packet_count"], elapsed, frame_stats["frame_count"],
+        frame_stats["frame_count"] / elapsed, stats["max_lag"] * 1e3))
+    if client.unversioned_frame_count > 0:
+        print("%d frames dropped: the capture holds no server info reply, start capturing before connecting" % client.unversioned_frame_count) #type: ignore  # noqa E501
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
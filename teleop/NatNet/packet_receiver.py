@@ -0,0 +1,134 @@
+# Batched receive for the NatNet UDP sockets
+#
+# Packets are read into a ring of preallocated buffers. After blocking for
+# the first packet, everything already queued in the kernel is drained
+# without blocking, so a burst costs one thread wake-up and no allocations.
+# On Linux the kernel reports how many packets it dropped because the
+# socket's receive buffer was full (SO_RXQ_OVFL); without it such losses
+# only show up as gaps in the frame numbers.
+
+import select
+import socket
+import sys
+import time
+import struct
+
+# From <asm-generic/socket.h>, Python doesn't export it
+SO_RXQ_OVFL = getattr(socket, 'SO_RXQ_OVFL', 40)
+DropCount = struct.Struct('=I')
+# Largest UDP payload, NatNet packets are never larger
+MAX_PACKET_SIZE = 65507
+
+
+def size_receive_buffer(sock, frame_rate, packet_size, seconds):
+    """Ask the kernel for a receive buffer holding seconds of packets at
+    frame_rate. Returns (requested, granted) bytes, Linux caps the buffer at
+    net.core.rmem_max and reports twice the size it was asked for."""
+    requested = int(frame_rate * packet_size * seconds)
+    if sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) < requested:
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, requested)
+        except OSError as e:
+            print(f"Could not set the receive buffer size: {e}")
+    return requested, sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+
+class PacketReceiver:
+    """Reads a socket in batches into preallocated buffers.
+
+    receive() returns (packet, receive time) pairs. Packets are memoryviews
+    of the ring, they stay valid until the next receive() call returns;
+    copy them to keep them longer."""
+    def __init__(self, sock, buffer_count=16, buffer_size=MAX_PACKET_SIZE):
+        self.sock = sock
+        self.buffers = [bytearray(buffer_size) for _ in range(buffer_count)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+        self.next_buffer = 0
+        # Half the ring, so a batch never overwrites the previous one
+        self.max_batch_size = max(buffer_count // 2, 1)
+
+        # recvmsg_into reports truncation and drop counts, Windows only
+        # has recvfrom_into
+        self.use_recvmsg = hasattr(sock, 'recvmsg_into')
+        self.track_drops = False
+        if self.use_recvmsg and sys.platform.startswith('linux'):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+                self.track_drops = True
+            except OSError:
+                pass
+        self.ancillary_size = socket.CMSG_SPACE(DropCount.size) if self.track_drops else 0 #type: ignore  # noqa E501
+
+        self.receive_buffer_size = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) #type: ignore  # noqa E501
+        self.packet_count = 0
+        self.batch_count = 0
+        self.max_batch = 0
+        # Packets the kernel dropped on this socket, from SO_RXQ_OVFL
+        self.kernel_drop_count = 0
+        # Packets larger than buffer_size, cut off
+        self.truncated_count = 0
+
+    def __read(self, view, flags=0):
+        if not self.use_recvmsg:
+            nbytes, address = self.sock.recvfrom_into(view)
+            return nbytes
+
+        nbytes, ancdata, msg_flags, address = self.sock.recvmsg_into([view], self.ancillary_size, flags) #type: ignore  # noqa E501
+        # The count is the socket's running total, attached to packets
+        # queued after a drop
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                self.kernel_drop_count = DropCount.unpack(data[:DropCount.size])[0] #type: ignore  # noqa E501
+        if msg_flags & socket.MSG_TRUNC:
+            self.truncated_count += 1
+        return nbytes
+
+    def __read_queued(self, view):
+        """Read a packet if one is queued, None otherwise"""
+        # MSG_DONTWAIT only skips the wait on sockets without a timeout
+        if self.use_recvmsg and self.sock.gettimeout() is None:
+            try:
+                return self.__read(view, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return None
+        readable, _, _ = select.select([self.sock], [], [], 0)
+        if not readable:
+            return None
+        return self.__read(view)
+
+    def __next_view(self):
+        view = self.views[self.next_buffer]
+        self.next_buffer = (self.next_buffer + 1) % len(self.views)
+        return view
+
+    def receive(self):
+        """Block for the next packet (honouring the socket timeout) and take
+        the packets queued behind it, oldest first. The packets are views of
+        the ring buffers, valid until the ring wraps around: decode them
+        before the next receive() calls fill it, copy what outlives that."""
+        view = self.__next_view()
+        nbytes = self.__read(view)
+        packets = [(view[:nbytes], time.perf_counter())]
+
+        while len(packets) < self.max_batch_size:
+            view = self.views[self.next_buffer]
+            nbytes = self.__read_queued(view)
+            if nbytes is None:
+                break
+            self.__next_view()
+            packets.append((view[:nbytes], time.perf_counter()))
+
+        self.packet_count += len(packets)
+        self.batch_count += 1
+        self.max_batch = max(self.max_batch, len(packets))
+        return packets
+
+    def get_stats(self):
+        return {
+            "packet_count": self.packet_count,
+            "batch_count": self.batch_count,
+            "max_batch": self.max_batch,
+            "kernel_drop_count": self.kernel_drop_count,
+            "truncated_count": self.truncated_count,
+            "receive_buffer_size": self.receive_buffer_size,
+        }
@@ -0,0 +1,94 @@
+"""
+Decode time and allocations per NatNet frame, with the containers deep
+copying every appended object (before) and taking ownership (after), then
+decoding only the rigid body section (the rest is jumped over by byte count)
+and only the first --keep rigid bodies of it, like online mode does.
+
+    python3 teleop/benchmarks/bench_natnet_decode.py --labeled_markers 300
+    python3 teleop/benchmarks/bench_natnet_decode.py --rigid_bodies 50 --keep 3
+"""
+import os
+import sys
+import argparse
+import contextlib
+import random
+import tracemalloc
+from time import perf_counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../NatNet"))
+from natnet_client import NatNetClient, DECODE_ALL, DECODE_RIGID_BODIES
+from natnet_packer import pack_frame_of_data
+
+def generate_packets(frame_count, rigid_body_count, labeled_marker_count, marker_count):
+    """Synthetic NatNet 4.1 frames with random poses and markers"""
+    rng = random.Random(0)
+    packets = []
+    for frame_number in range(frame_count):
+        rigid_bodies = [(rb_id, (rng.random(), rng.random(), rng.random()), (0.0, 0.0, 0.0, 1.0), 0.001, True)
+                        for rb_id in range(rigid_body_count)]
+        labeled_markers = [(marker_id, (rng.random(), rng.random(), rng.random()), 0.014, 0x04, 0.0002)
+                           for marker_id in range(labeled_marker_count)]
+        marker_sets = [("all", [(rng.random(), rng.random(), rng.random()) for _ in range(marker_count)])]
+        packets.append(pack_frame_of_data(frame_number, rigid_bodies, labeled_markers, marker_sets,
+                                          timestamp=frame_number / 240.0))
+    return packets
+
+def make_client(take_ownership, decode_mask=DECODE_ALL, rigid_body_filter=None):
+    client = NatNetClient()
+    client.set_decode_version(4, 1)
+    client.take_ownership = take_ownership
+    client.set_decode_mask(decode_mask)
+    client.set_rigid_body_filter(rigid_body_filter)
+    return client
+
+def decode_time(client, packets):
+    """Mean decode time per frame in seconds"""
+    start_time = perf_counter()
+    for packet in packets:
+        client.process_message(packet)
+    return (perf_counter() - start_time) / len(packets)
+
+def allocation_per_frame(client, packets):
+    """Mean peak traced memory allocated while decoding one frame, in bytes"""
+    total = 0
+    tracemalloc.start()
+    for packet in packets:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        client.process_message(packet)
+        total += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return total / len(packets)
+
+def main():
+    parser = argparse.ArgumentParser("Benchmark NatNet frame decoding")
+    parser.add_argument('--frames', type=int, default=2000, help="Number of frames to decode")
+    parser.add_argument('--rigid_bodies', type=int, default=3, help="Rigid bodies per frame")
+    parser.add_argument('--labeled_markers', type=int, default=300, help="Labeled markers per frame")
+    parser.add_argument('--markers', type=int, default=50, help="Markerset markers per frame")
+    parser.add_argument('--keep', type=int, default=3, help="Rigid bodies kept by the filter")
+    args = parser.parse_args()
+
+    packets = generate_packets(args.frames, args.rigid_bodies, args.labeled_markers, args.markers)
+    print(f"{args.frames} frames, {args.rigid_bodies} rigid bodies, {args.labeled_markers} labeled markers, "
+          f"{args.markers} markers, {sum(map(len, packets)) / len(packets):.0f} bytes/frame")
+
+    modes = (("deepcopy", False, DECODE_ALL, None),
+             ("take_ownership", True, DECODE_ALL, None),
+             ("rigid_bodies", True, DECODE_RIGID_BODIES, None),
+             ("filtered", True, DECODE_RIGID_BODIES, range(args.keep)))
+    results = {}
+    for label, take_ownership, decode_mask, rigid_body_filter in modes:
+        client = make_client(take_ownership, decode_mask, rigid_body_filter)
+        # Keep the client's frame stats lines out of the output
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            decode_time(client, packets[:100])
+            results[label] = (decode_time(client, packets), allocation_per_frame(client, packets[:200]))
+
+    baseline = results["deepcopy"][0]
+    print(f"{'mode':<16}{'decode (us/frame)':>20}{'alloc (KiB/frame)':>20}{'speedup':>10}")
+    for label, (seconds, allocated) in results.items():
+        print(f"{label:<16}{seconds * 1e6:>20.1f}{allocated / 1024:>20.1f}{baseline / seconds:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
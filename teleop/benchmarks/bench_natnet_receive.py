@@ -0,0 +1,122 @@
+"""
+Load test of the NatNet receive path against the local server simulator
+
+Streams a recorded take over loopback at each rate and rigid body count and reports how many
+frames the client decoded and the send-to-decoded latency (the simulator stamps frames with
+perf_counter_ns, the same clock the client stamps received packets with). --stall blocks the
+receive thread once a second, like a busy consumer would; frames then queue in the kernel receive
+buffer and what doesn't fit is counted as kernel drops. --async_client receives on an asyncio
+event loop (natnet_async_client) instead of the client's threads, it has no kernel drop counter.
+
+    python3 teleop/benchmarks/bench_natnet_receive.py
+    python3 teleop/benchmarks/bench_natnet_receive.py --rates 120 360 --bodies 3 100 --multicast
+    python3 teleop/benchmarks/bench_natnet_receive.py --rates 1000 --bodies 200 --stall 0.1 --receive_buffer_seconds 0
+    python3 teleop/benchmarks/bench_natnet_receive.py --async_client
+"""
+import os
+import sys
+import io
+import glob
+import argparse
+import contextlib
+import time
+import asyncio
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../NatNet"))
+from natnet_client import NatNetClient
+from natnet_async_client import AsyncNatNetClient
+from natnet_server_sim import NatNetServerSim, Take, DEFAULT_DATA_DIR
+
+ADDRESS = "127.0.0.1"
+MULTICAST_ADDRESS = "239.255.42.99"
+
+async def receive_async(decoder, server, duration, stall):
+    """Receive with the asyncio client for duration seconds, frames are consumed like a pipeline would"""
+    async def consume(client):
+        async for _ in client.frames():
+            pass
+
+    async with AsyncNatNetClient(decoder) as client:
+        consumer = asyncio.create_task(consume(client))
+        await client.connect()
+        await asyncio.sleep(duration)
+        server.stop()
+        await asyncio.sleep(0.1 + stall)
+    await consumer
+
+def run(take_path, rate, bodies, duration, multicast, command_port, data_port, stall, receive_buffer_seconds,
+        async_client):
+    take = Take(take_path, rate)
+    server = NatNetServerSim([take], rate=rate, address=ADDRESS, command_port=command_port, data_port=data_port,
+                             multicast=multicast, multicast_address=MULTICAST_ADDRESS,
+                             extra_bodies=max(bodies - len(take.names), 0), loop=True)
+
+    client = NatNetClient()
+    client.server_ip_address = ADDRESS
+    client.local_ip_address = ADDRESS
+    client.multicast_address = MULTICAST_ADDRESS
+    client.command_port = command_port
+    client.data_port = data_port
+    client.use_multicast = multicast
+    client.frame_rate = rate
+    client.receive_buffer_seconds = receive_buffer_seconds
+    client.set_print_level(0)
+
+    latencies = []
+    next_stall = [time.perf_counter() + 1.0]
+    def receive_frame(data_dict):
+        stamp_transmit = data_dict["mocap_data"].suffix_data.stamp_transmit
+        latencies.append(client.receive_time - stamp_transmit * 1e-9)
+        if stall > 0 and time.perf_counter() > next_stall[0]:
+            time.sleep(stall)
+            next_stall[0] += 1.0
+    client.new_frame_with_data_listener = receive_frame
+
+    # Keep the client's connection messages out of the table
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.start()
+        if async_client:
+            asyncio.run(receive_async(client, server, duration, stall))
+        else:
+            client.run('d')
+            time.sleep(duration)
+            server.stop()
+            time.sleep(0.1 + stall)
+            client.shutdown()
+
+    stats = server.get_stats()
+    receive_stats = {'kernel_drop_count': '-', 'max_batch': '-'} if async_client else client.get_receive_stats()
+    latencies = np.array(latencies) * 1e6
+    p50, p99 = np.percentile(latencies, (50, 99)) if len(latencies) else (0.0, 0.0)
+    max_latency = latencies.max() if len(latencies) else 0.0
+    print(f"{rate:>6.0f}{bodies:>8}{stats['sent_count']:>8}{len(latencies):>10}"
+          f"{stats['sent_count'] - len(latencies):>8}{receive_stats['kernel_drop_count']:>8}{receive_stats['max_batch']:>7}"
+          f"{p50:>10.1f}{p99:>10.1f}{max_latency:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser("Benchmark NatNet receive against the server simulator")
+    parser.add_argument('--data_dir', type=str, default=DEFAULT_DATA_DIR, help="Directory of formatted takes")
+    parser.add_argument('--rates', type=float, nargs='+', default=[120, 240, 360], help="Frame rates to test")
+    parser.add_argument('--bodies', type=int, nargs='+', default=[3, 50, 200], help="Rigid body counts to test")
+    parser.add_argument('--duration', type=float, default=3.0, help="Seconds per run")
+    parser.add_argument('--multicast', action='store_true', help="Stream multicast instead of unicast")
+    parser.add_argument('--port', type=int, default=15510, help="Command port, the data port is the next one")
+    parser.add_argument('--stall', type=float, default=0.0, help="Seconds the receive thread blocks once a second")
+    parser.add_argument('--receive_buffer_seconds', type=float, default=0.5,
+                        help="Frames the kernel receive buffer is sized for, 0 keeps the system default")
+    parser.add_argument('--async_client', action='store_true', help="Receive with the asyncio client")
+    args = parser.parse_args()
+
+    take_path = sorted(glob.glob(os.path.join(args.data_dir, "*.csv")))[0]
+    print(f"Take: {os.path.basename(take_path)}, {'multicast' if args.multicast else 'unicast'}, "
+          f"{'asyncio' if args.async_client else 'threaded'} client, {args.duration:.0f} s per run")
+    print(f"{'rate':>6}{'bodies':>8}{'sent':>8}{'decoded':>10}{'missed':>8}{'kernel':>8}{'batch':>7}"
+          f"{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+    for rate in args.rates:
+        for bodies in args.bodies:
+            run(take_path, rate, bodies, args.duration, args.multicast, args.port, args.port + 1, args.stall,
+                args.receive_buffer_seconds, args.async_client)
+
+if __name__ == "__main__":
+    main()
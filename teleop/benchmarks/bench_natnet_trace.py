@@ -0,0 +1,115 @@
+"""
+Frames per second the NatNet client decodes with its logging in each configuration
+
+The packet corpus is a recorded take packed into NatNet 4.1 frames the way the server simulator
+streams it, with labeled markers added around each rigid body. Every packet goes through
+NatNetClient.process_message, the client's prints go to os.devnull (a terminal is slower still).
+
+    print every frame   the frame line printed for every frame, as the client used to
+    rate-limited        the stats reporter, one line per stats_report_period (default)
+    silent              print level 0
+    tracing on          TRACE and TRACE_MF enabled, what the guarded trace calls cost when on
+
+--natnet_dir benchmarks the client of another checkout, e.g. the commit before the trace guards
+(git worktree add /tmp/before <commit>); modes it doesn't support are skipped.
+
+    python3 teleop/benchmarks/bench_natnet_trace.py
+    python3 teleop/benchmarks/bench_natnet_trace.py --labeled_markers 300 --object_decode
+    python3 teleop/benchmarks/bench_natnet_trace.py --natnet_dir /tmp/before/teleop/NatNet
+"""
+import os
+import sys
+import glob
+import argparse
+import contextlib
+import importlib
+import numpy as np
+from time import perf_counter
+
+DEFAULT_NATNET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../NatNet")
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../training/dataset/FormattedData")
+
+def load_corpus(take_path, rate, labeled_markers):
+    """Packets of a recorded take, labeled_markers markers spread over its rigid bodies"""
+    natnet_packer = importlib.import_module("natnet_packer")
+    take = importlib.import_module("natnet_server_sim").Take(take_path, rate)
+    rng = np.random.default_rng(0)
+    records = natnet_packer.rigid_body_records(len(take.names))
+    records['id'] = np.arange(1, len(take.names) + 1)
+    records['error'] = 0.0005
+    body_of_marker = np.arange(labeled_markers) % len(take.names)
+    marker_offsets = rng.normal(0.0, 0.05, (labeled_markers, 3))
+
+    packets = []
+    for k in range(len(take)):
+        records['pos'] = take.positions[k]
+        records['rot'] = take.orientations[k]
+        records['param'] = take.tracking_valid[k]
+        marker_positions = take.positions[k][body_of_marker] + marker_offsets
+        markers = [(((body + 1) << 16) | i, tuple(pos), 0.014, 0x04, 0.0002)
+                   for i, (body, pos) in enumerate(zip(body_of_marker, marker_positions.tolist()))]
+        packets.append(natnet_packer.pack_frame_of_data(k, records, markers, timestamp=k / rate))
+    return packets
+
+def frames_per_second(packets, repeat, report_period, print_level, tracing, object_decode):
+    """Decoded frames per second of the fastest pass over the corpus, None if the client doesn't support the mode"""
+    natnet_client = importlib.import_module("natnet_client")
+    client = natnet_client.NatNetClient()
+    if not hasattr(client, 'stats_reporter'):
+        # Before the reporter and the trace flags, frames were always printed
+        if report_period != 0.0 or print_level == 0 or tracing:
+            return None
+    else:
+        client.stats_reporter.period = report_period
+    client.set_decode_version(4, 1)
+    client.set_print_level(print_level)
+    client.fast_rigid_body_decode = not object_decode
+    natnet_client.TRACE = natnet_client.TRACE_MF = tracing
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            elapsed = float('inf')
+            for _ in range(repeat):
+                start_time = perf_counter()
+                for packet in packets:
+                    client.process_message(packet)
+                elapsed = min(elapsed, perf_counter() - start_time)
+    finally:
+        natnet_client.TRACE = natnet_client.TRACE_MF = False
+    return len(packets) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser("Benchmark NatNet decoding with each logging configuration")
+    parser.add_argument('--data_dir', type=str, default=DEFAULT_DATA_DIR, help="Directory of formatted takes")
+    parser.add_argument('--natnet_dir', type=str, default=DEFAULT_NATNET_DIR, help="Directory of the NatNet client to benchmark")
+    parser.add_argument('--rate', type=float, default=240, help="Frame rate the take is resampled to")
+    parser.add_argument('--labeled_markers', type=int, default=30, help="Labeled markers per frame")
+    parser.add_argument('--repeat', type=int, default=5, help="Passes over the corpus, the fastest one counts")
+    parser.add_argument('--object_decode', action='store_true',
+                        help="Decode rigid bodies into RigidBody objects instead of arrays")
+    args = parser.parse_args()
+    sys.path.append(args.natnet_dir)
+
+    take_path = sorted(glob.glob(os.path.join(args.data_dir, "*.csv")))[0]
+    packets = load_corpus(take_path, args.rate, args.labeled_markers)
+    print(f"Client: {os.path.abspath(args.natnet_dir)}")
+    print(f"Take: {os.path.basename(take_path)}, {len(packets)} frames, {args.labeled_markers} labeled markers, "
+          f"{sum(map(len, packets)) / len(packets):.0f} bytes/frame, "
+          f"{'object' if args.object_decode else 'array'} rigid body decode")
+
+    modes = (("print every frame", 0.0, 20, False),
+             ("rate-limited", 1.0, 20, False),
+             ("silent", 1.0, 0, False),
+             ("tracing on", 0.0, 20, True))
+    results = {label: frames_per_second(packets, args.repeat, report_period, print_level, tracing, args.object_decode)
+               for label, report_period, print_level, tracing in modes}
+
+    baseline = results["print every frame"]
+    print(f"{'mode':<20}{'frames/s':>12}{'us/frame':>12}{'speedup':>10}")
+    for label, rate in results.items():
+        if rate is None:
+            print(f"{label:<20}{'n/a':>12}")
+            continue
+        print(f"{label:<20}{rate:>12.0f}{1e6 / rate:>12.1f}{rate / baseline:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
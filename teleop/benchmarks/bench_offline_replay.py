@@ -0,0 +1,64 @@
+"""
+Replay every formatted take through run_offline_mode as fast as possible, against the in-process
+fake controller, and report frames/sec, per-stage latency and peak RSS.
+
+Takes are loaded through the transformed-trajectory cache, so the parse stage of a second run
+measures cache hits.
+
+    python3 teleop/benchmarks/bench_offline_replay.py
+    python3 teleop/benchmarks/bench_offline_replay.py --limit 20
+"""
+import os
+import sys
+import argparse
+import contextlib
+import resource
+import tempfile
+from time import perf_counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src"))
+from ct_io.io_parser import IOParser
+from ctrl_interface.ctrl_interface import CtrlInterface
+from mode.offline_mode import run_offline_mode
+from mode.pipeline import new_latency_trace
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../training/dataset/FormattedData")
+
+def main():
+    parser = argparse.ArgumentParser("Benchmark the offline teleop loop")
+    parser.add_argument('--data_dir', type=str, default=DEFAULT_DATA_DIR, help="Directory of formatted takes")
+    parser.add_argument('--limit', type=int, default=None, help="Only replay the first N takes")
+    parser.add_argument('--log_format', choices=['csv', 'binary'], default='csv', help="Metrics log format")
+    args = parser.parse_args()
+
+    # Absolute, the working directory changes to the log directory below
+    data_dir = os.path.abspath(args.data_dir)
+    input_files = sorted(os.path.join(data_dir, file_name) for file_name in os.listdir(data_dir)
+                         if file_name.endswith(".csv"))[:args.limit]
+
+    CtrlInterface.set_backend("fake")
+    trace = new_latency_trace(capacity=1 << 20)
+
+    # Metrics logs go to a scratch directory, PerformanceMetrics writes to ./teleop/log
+    log_root = tempfile.mkdtemp(prefix="bench_offline_replay_")
+    os.chdir(log_root)
+
+    start_time = perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for input_file in input_files:
+            run_args = IOParser.get_cmd_parser().parse_args([
+                "--input_mode", "offline", "--io_mode", "mujoco", "--input_file", input_file,
+                "--ctrl_backend", "fake", "--no_sleep", "--metrics_display", "off",
+                "--log_format", args.log_format])
+            run_offline_mode(run_args, trace)
+    elapsed_time = perf_counter() - start_time
+
+    trace.print_summary()
+    print(f"\nTakes: {len(input_files)}, frames: {trace.tick_count}, elapsed: {elapsed_time:.2f} s")
+    print(f"Throughput: {trace.tick_count / elapsed_time:.0f} frames/s")
+    # ru_maxrss is in KiB on Linux
+    print(f"Peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+    print(f"Metrics logs: {log_root}")
+
+if __name__ == "__main__":
+    main()
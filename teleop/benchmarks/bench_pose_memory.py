@@ -0,0 +1,109 @@
+"""
+Memory held by a motion capture recording kept as Python objects, with
+dict-backed classes (before) and the slotted / array-backed ones (after).
+
+The default is a 10 minute capture at 240 Hz with 3 rigid bodies.
+
+    python3 teleop/benchmarks/bench_pose_memory.py --minutes 10
+"""
+import os
+import sys
+import argparse
+import gc
+import tracemalloc
+from time import perf_counter
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../src"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../NatNet"))
+from pose.pose import Pose
+import MoCapData
+
+class DictPose():
+    """Pose as it was before __slots__, kept here as the reference"""
+    def __init__(self, timestep = None, orientationX = None, orientationY = None, orientationZ = None,
+                 orientationW = None, positionX = None, positionY = None, positionZ = None):
+        self.timestep = timestep
+        self.orientationX = orientationX
+        self.orientationY = orientationY
+        self.orientationZ = orientationZ
+        self.orientationW = orientationW
+        self.positionX = positionX
+        self.positionY = positionY
+        self.positionZ = positionZ
+
+class DictRigidBody(MoCapData.RigidBody):
+    """Subclass without __slots__, gets a __dict__ like the original class"""
+
+def measure(build):
+    """Bytes still allocated after build() returns, and the build time"""
+    gc.collect()
+    tracemalloc.start()
+    start_time = perf_counter()
+    held = build()
+    elapsed_time = perf_counter() - start_time
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return allocated, elapsed_time
+
+def scalar_access_time(poses):
+    """Seconds per pose to read every position and orientation attribute"""
+    start_time = perf_counter()
+    total = 0.0
+    for pose in poses:
+        total += pose.positionX + pose.positionY + pose.positionZ
+        total += pose.orientationX + pose.orientationY + pose.orientationZ + pose.orientationW
+    return (perf_counter() - start_time) / len(poses)
+
+def vector_access_time(poses):
+    """Seconds per pose to get the position as a numpy vector"""
+    start_time = perf_counter()
+    if isinstance(poses[0], Pose):
+        for pose in poses:
+            pose.position
+    else:
+        for pose in poses:
+            np.array([pose.positionX, pose.positionY, pose.positionZ])
+    return (perf_counter() - start_time) / len(poses)
+
+def main():
+    parser = argparse.ArgumentParser("Benchmark memory of an in-memory capture")
+    parser.add_argument('--minutes', type=float, default=10.0, help="Capture length in minutes")
+    parser.add_argument('--rate', type=int, default=240, help="Capture rate in Hz")
+    parser.add_argument('--rigid_bodies', type=int, default=3, help="Rigid bodies per frame")
+    args = parser.parse_args()
+
+    n_frames = int(args.minutes * 60 * args.rate)
+    timesteps = np.arange(n_frames) / args.rate
+    poses = np.random.default_rng(0).random((n_frames, args.rigid_bodies, 7))
+    # Python floats, as a decoder or csv reader would hand them over
+    rows = poses.tolist()
+    n_objects = n_frames * args.rigid_bodies
+    print(f"{args.minutes:g} min at {args.rate} Hz, {args.rigid_bodies} rigid bodies, {n_objects} poses")
+
+    # Before: one object per pose holding numpy scalars, as built from DataFrame rows
+    # After: the capture stays one (frames, bodies, 7) array, Poses are views into it
+    builds = {
+        "Pose (dict)": lambda: [DictPose(t, *body) for t, frame in zip(timesteps, poses) for body in frame],
+        "Pose (views)": lambda: [Pose.from_array(t, body) for t, frame in zip(timesteps, poses) for body in frame],
+        "RigidBody (dict)": lambda: [DictRigidBody(i, body[4:7], body[0:4]) for frame in rows for i, body in enumerate(frame)],
+        "RigidBody (slots)": lambda: [MoCapData.RigidBody(i, body[4:7], body[0:4]) for frame in rows for i, body in enumerate(frame)],
+    }
+
+    print(f"{'layout':<20}{'held (MiB)':>12}{'bytes/pose':>12}{'build (s)':>11}{'scalar (ns)':>13}{'vector (ns)':>13}")
+    for label, build in builds.items():
+        allocated, elapsed_time = measure(build)
+        scalar, vector = "", ""
+        if label.startswith("Pose"):
+            held = build()
+            scalar = f"{scalar_access_time(held) * 1e9:.0f}"
+            vector = f"{vector_access_time(held) * 1e9:.0f}"
+            del held
+        print(f"{label:<20}{allocated / 2**20:>12.1f}{allocated / n_objects:>12.0f}{elapsed_time:>11.2f}{scalar:>13}{vector:>13}")
+
+    # Views are only needed for the frame being processed, the capture itself is the array
+    print(f"{'Pose array':<20}{poses.nbytes / 2**20:>12.1f}{poses.nbytes / n_objects:>12.0f}")
+
+if __name__ == "__main__":
+    main()
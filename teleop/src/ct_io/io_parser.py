@@ -2,6 +2,11 @@ import csv
 import os
 import numpy as np
 import argparse as arg
+import yaml
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../config")
+CONTROLLER_CONFIG_PATH = os.path.join(CONFIG_DIR, "controller_config.yaml")
+NATNET_CONFIG_PATH = os.path.join(CONFIG_DIR, "natnet_config.yaml")
 
 class IOParser():
     def __init__(self):
@@ -15,12 +20,28 @@ class IOParser():
         input_mode_group.add_argument('--training', action='store_true', help=" Run in training mode")
 
         cmd_parser.add_argument('--io_mode', choices=['mujoco', 'hardware'], help="Run the teleop controller in simulation or on hardware")
-        cmd_parser.add_argument('--input_file', type=str, help="Input CSV file (required for offline mode)")
+        cmd_parser.add_argument('--input_file', type=str, help="Input CSV or .npy trajectory file (required for offline mode)")
+        cmd_parser.add_argument('--overrun_policy', choices=['skip', 'catch_up', 'degrade'], default='skip', help="What the control loop does when a tick overruns its deadline")
+        cmd_parser.add_argument('--busy_wait_us', type=int, default=0, help="Busy-wait for the last microseconds before each tick instead of sleeping")
+        cmd_parser.add_argument('--log_format', choices=['csv', 'binary'], default='csv', help="File format of the per-timestep metrics log")
+        cmd_parser.add_argument('--metrics_display', choices=['dashboard', 'summary', 'off'], default='dashboard', help="Live metrics: one status line refreshed at 10 Hz, the full per-frame summary, or nothing")
+        cmd_parser.add_argument('--ctrl_backend', choices=['mpac', 'fake'], default='mpac', help="Drive the mpac_go2 controller or an in-process simulated robot")
+        cmd_parser.add_argument('--controller_config', type=str, default=CONTROLLER_CONFIG_PATH, help="Controller config yaml (command limits)")
+        cmd_parser.add_argument('--no_shaping', action='store_true', help="Send the transformed human velocities without velocity and acceleration limits")
+        cmd_parser.add_argument('--command_dispatch', choices=['async', 'sync'], default='async', help="Send walk commands from a dispatcher thread (latest wins) or inline in the control loop")
+        cmd_parser.add_argument('--no_sleep', action='store_true', help="Replay as fast as possible instead of in real time (benchmarking)")
+        cmd_parser.add_argument('--natnet_capture', type=str, help="Online mode: record every received NatNet packet to this capture file")
+        cmd_parser.add_argument('--natnet_replay', type=str, help="Online mode: decode a NatNet capture file instead of the live stream")
+        cmd_parser.add_argument('--replay_speed', type=float, default=1.0, help="Speed of --natnet_replay, 1 is the recorded timing, 0 as fast as possible")
 
         return cmd_parser
 
-    def parse_controller_config():
-        pass
+    def parse_controller_config(config_path=CONTROLLER_CONFIG_PATH):
+        """Controller config as a dict, see config/controller_config.yaml"""
+        with open(config_path, 'r') as file:
+            return yaml.safe_load(file)
 
-    def parse_natnet_config():
-        pass
+    def parse_natnet_config(config_path=NATNET_CONFIG_PATH):
+        """NatNet connection and rigid body config as a dict, see config/natnet_config.yaml"""
+        with open(config_path, 'r') as file:
+            return yaml.safe_load(file)['natnet_config']
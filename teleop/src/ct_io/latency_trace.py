@@ -0,0 +1,145 @@
+from time import perf_counter
+import numpy as np
+
+class LatencyTrace():
+    """
+    Per-stage timing of a control loop
+
+    begin() starts a tick and mark(stage) charges the time since the previous mark to that stage,
+    so a tick costs one perf_counter call per stage. A tick can start in the past, e.g. at the
+    time its input was received, then the first stage includes the wait before the loop picked it
+    up; a mark can also be placed at a known earlier time. Stages that finish after the loop moved
+    on (e.g. the robot acknowledging a command) are charged to their tick with add(). The total of
+    a tick is the sum of its stages, spans are named sums of consecutive stages.
+
+    extras are per tick measurements that are not part of the total (e.g. latency upstream of
+    this process), NaN until set() for the tick.
+
+    The latest capacity ticks are kept in preallocated rings for percentiles, totals and maxima
+    cover every tick. One-off work outside the loop (loading, precomputation) is recorded with
+    record().
+    """
+    def __init__(self, stages, capacity=1 << 16, extras=(), spans=None):
+        self.stages = list(stages)
+        self.stage_index = {stage: i for i, stage in enumerate(self.stages)}
+        self.extras = list(extras)
+        self.extra_index = {extra: i for i, extra in enumerate(self.extras)}
+        # key: span name, value: (first stage, last stage)
+        self.spans = dict(spans) if spans is not None else {}
+        self.capacity = capacity
+
+        self.samples = np.zeros((capacity, len(self.stages)), dtype=np.float64)
+        self.extra_samples = np.full((capacity, len(self.extras)), np.nan)
+        self.totals = np.zeros(len(self.stages), dtype=np.float64)
+        self.maxima = np.zeros(len(self.stages), dtype=np.float64)
+        self.max_total = 0.0
+        self.tick_count = 0
+        self.closed_count = 0
+        self.slot = -1
+        self.last_time = 0.0
+
+        # key: stage, value: total seconds
+        self.setup_times = {}
+
+    def begin(self, start_time=None):
+        """Start timing a new tick now, or at an earlier perf_counter time, returns the tick number"""
+        if self.slot >= 0:
+            self._close_tick()
+        self.slot = self.tick_count % self.capacity
+        self.tick_count += 1
+        self.samples[self.slot] = 0.0
+        self.extra_samples[self.slot] = np.nan
+        self.last_time = perf_counter() if start_time is None else start_time
+        return self.tick_count - 1
+
+    def mark(self, stage, now=None):
+        """Charge the time since the previous mark (or begin) to stage, up to now or a given perf_counter time"""
+        if now is None:
+            now = perf_counter()
+        self.samples[self.slot, self.stage_index[stage]] += now - self.last_time
+        self.last_time = now
+
+    def add(self, stage, seconds, tick=None):
+        """Charge seconds to stage of the current tick, or of an earlier tick still in the ring"""
+        if tick is None:
+            tick = self.tick_count - 1
+        if tick == self.tick_count - 1 and self.slot >= 0:
+            self.samples[self.slot, self.stage_index[stage]] += seconds
+            return
+        if tick < max(self.tick_count - self.capacity, 0):
+            return
+
+        # The tick is closed, keep its totals and maxima up to date
+        slot = tick % self.capacity
+        i = self.stage_index[stage]
+        self.samples[slot, i] += seconds
+        self.totals[i] += seconds
+        self.maxima[i] = max(self.maxima[i], self.samples[slot, i])
+        self.max_total = max(self.max_total, float(self.samples[slot].sum()))
+
+    def set(self, extra, seconds):
+        """Set an extra measurement of the current tick"""
+        self.extra_samples[self.slot, self.extra_index[extra]] = seconds
+
+    def _close_tick(self):
+        row = self.samples[self.slot]
+        self.totals += row
+        np.maximum(self.maxima, row, out=self.maxima)
+        self.max_total = max(self.max_total, float(row.sum()))
+        self.closed_count += 1
+
+    def end(self):
+        """Close the last tick, call once after the loop"""
+        if self.slot >= 0:
+            self._close_tick()
+            self.slot = -1
+
+    def record(self, stage, seconds):
+        """Add time spent in a one-off stage"""
+        self.setup_times[stage] = self.setup_times.get(stage, 0.0) + seconds
+
+    def get_stats(self):
+        """
+        key: stage, 'total', span or extra, value: dict of mean, p50, p99 and max in seconds
+
+        Stage means and maxima cover every tick, percentiles, spans and extras the ticks still in
+        the ring. Extras only count the ticks they were set for.
+        """
+        count = min(self.tick_count, self.capacity)
+        window = self.samples[:count]
+        columns = [(stage, window[:, i], self.totals[i] / max(self.closed_count, 1), self.maxima[i])
+                   for stage, i in self.stage_index.items()]
+        columns.append(('total', window.sum(axis=1), self.totals.sum() / max(self.closed_count, 1), self.max_total))
+        for span, (first, last) in self.spans.items():
+            samples = window[:, self.stage_index[first]:self.stage_index[last] + 1].sum(axis=1)
+            columns.append((span, samples, None, None))
+        for extra, i in self.extra_index.items():
+            samples = self.extra_samples[:count, i]
+            columns.append((extra, samples[~np.isnan(samples)], None, None))
+
+        stats = {}
+        for name, samples, mean, maximum in columns:
+            if len(samples) == 0:
+                stats[name] = {'mean': 0.0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+                continue
+            p50, p99 = np.percentile(samples, (50, 99))
+            stats[name] = {
+                'mean': float(samples.mean() if mean is None else mean),
+                'p50': float(p50),
+                'p99': float(p99),
+                'max': float(samples.max() if maximum is None else maximum),
+            }
+        return stats
+
+    def print_summary(self):
+        self.end()
+        print("\n--------------------Latency--------------------")
+        for stage, seconds in self.setup_times.items():
+            print(f"{stage:<12}{seconds * 1e3:>12.1f} ms (setup)")
+        print(f"{'stage':<12}{'mean (us)':>12}{'p50 (us)':>12}{'p99 (us)':>12}{'max (us)':>12}")
+        for name, stage_stats in self.get_stats().items():
+            if name in self.extra_index and name == self.extras[0]:
+                print("not in total:")
+            print(f"{name:<12}{stage_stats['mean'] * 1e6:>12.1f}{stage_stats['p50'] * 1e6:>12.1f}"
+                  f"{stage_stats['p99'] * 1e6:>12.1f}{stage_stats['max'] * 1e6:>12.1f}")
+        print(f"Ticks: {self.tick_count}")
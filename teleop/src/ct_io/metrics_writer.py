@@ -0,0 +1,119 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import numpy as np
+
+METRICS_FORMAT_VERSION = 1
+LOG_FORMATS = ("csv", "binary")
+BINARY_EXTENSION = ".bin"
+HEADER_EXTENSION = ".json"
+
+class MetricsWriter():
+    """
+    Columnar metrics log written from a background thread
+
+    append() copies one row into a preallocated block and never touches the file. Full blocks are
+    queued to the writer thread, which formats and writes them and hands the block back for reuse.
+    close() (also run at interpreter exit) flushes the partial block and joins the thread.
+
+    csv     one header line and one text row per tick, values formatted with formats
+    binary  raw little endian float64 rows, described by a JSON header next to the file
+    """
+    def __init__(self, path, columns, file_format="csv", block_size=1024, formats=None):
+        if file_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format '{file_format}', expected one of {LOG_FORMATS}")
+
+        self.columns = list(columns)
+        self.file_format = file_format
+        self.block_size = block_size
+        self.formats = formats if formats is not None else ["%.4f"] * len(self.columns)
+        self.path = path if file_format == "csv" else os.path.splitext(path)[0] + BINARY_EXTENSION
+
+        # Blocks owned by the control thread (current), the writer queue and the free pool
+        self.block = np.empty((block_size, len(self.columns)), dtype='<f8')
+        self.row = 0
+        self.free_blocks = queue.SimpleQueue()
+        self.full_blocks = queue.SimpleQueue()
+
+        self.row_count = 0
+        self.block_count = 0
+        self.closed = False
+
+        # Header is written here, before the control loop starts
+        if file_format == "csv":
+            with open(self.path, 'w', newline='') as f:
+                f.write(",".join(self.columns) + "\n")
+        else:
+            open(self.path, 'wb').close()
+
+        self.thread = threading.Thread(target=self._write_blocks, name="MetricsWriter", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def append(self, values):
+        """Add one row, values in column order. Called by the control thread."""
+        self.block[self.row] = values
+        self.row += 1
+        if self.row == self.block_size:
+            self._submit()
+
+    def _submit(self):
+        self.full_blocks.put((self.block, self.row))
+        self.row_count += self.row
+        self.block_count += 1
+        try:
+            self.block = self.free_blocks.get_nowait()
+        except queue.Empty:
+            self.block = np.empty((self.block_size, len(self.columns)), dtype='<f8')
+        self.row = 0
+
+    def _write_blocks(self):
+        mode = 'a' if self.file_format == "csv" else 'ab'
+        with open(self.path, mode) as f:
+            while True:
+                block, rows = self.full_blocks.get()
+                if block is None:
+                    break
+                if self.file_format == "csv":
+                    np.savetxt(f, block[:rows], fmt=self.formats, delimiter=",")
+                else:
+                    block[:rows].tofile(f)
+                f.flush()
+                self.free_blocks.put(block)
+
+    def close(self):
+        """Flush the remaining rows and wait for the writer thread"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.row > 0:
+            self._submit()
+        self.full_blocks.put((None, 0))
+        self.thread.join()
+        atexit.unregister(self.close)
+
+        if self.file_format == "binary":
+            header = {
+                "version": METRICS_FORMAT_VERSION,
+                "dtype": "<f8",
+                "columns": self.columns,
+                "rows": self.row_count,
+            }
+            with open(os.path.splitext(self.path)[0] + HEADER_EXTENSION, 'w') as f:
+                json.dump(header, f, indent=2)
+
+def load_metrics(path):
+    """Metrics log as (array, columns), from either format"""
+    base = os.path.splitext(path)[0]
+    if path.endswith(".csv"):
+        with open(path) as f:
+            columns = f.readline().strip().split(",")
+        data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        return data, columns
+
+    with open(base + HEADER_EXTENSION) as f:
+        header = json.load(f)
+    data = np.fromfile(base + BINARY_EXTENSION, dtype=header["dtype"])
+    return data.reshape(-1, len(header["columns"])), header["columns"]
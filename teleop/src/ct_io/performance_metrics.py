@@ -1,16 +1,24 @@
 from pose.pose import Pose
 from typing import Dict, Tuple, Optional
-import scipy.spatial.transform as st
 import numpy as np
-import csv
+import math
 import yaml
 import os
 from datetime import datetime
 import time
+from ct_io.metrics_writer import MetricsWriter
+from ct_math.streaming_stats import ErrorStats
 
 class PerformanceMetrics():
+    # Column order of the metrics log
+    METRIC_COLUMNS = ['timestep',
+                      'position_error', 'x_error', 'y_error', 'z_error',
+                      'linear_velocity_error', 'x_vel_error', 'y_vel_error', 'z_vel_error',
+                      'angular_velocity_error', 'rx_vel_error', 'ry_vel_error', 'rz_vel_error']
+
     def __init__(self, source_starting_pose=None, target_starting_pose=None, 
-                 source_pose = None, target_pose = None, source_twist = None, target_twist = None):
+                 source_pose = None, target_pose = None, source_twist = None, target_twist = None,
+                 log_format = "csv", latency_trace = None):
         self.log_dir = "./teleop/log"
         self.name = "log"
         self.dt = 0.004
@@ -24,72 +32,58 @@ class PerformanceMetrics():
         self.base_filename = f"{self.name}_{timestamp}"
         self.csv_path = os.path.join(self.log_dir, f"{self.base_filename}.csv")
         self.yaml_path = os.path.join(self.log_dir, f"{self.base_filename}_metadata.yaml")
+        self.summary_path = os.path.join(self.log_dir, f"{self.base_filename}_summary.yaml")
 
-        # Initialize CSV file with headers
-        self._init_csv_file()
+        # Rows are buffered in memory and written by a background thread
+        self.metrics_writer = MetricsWriter(self.csv_path, self.METRIC_COLUMNS, file_format=log_format,
+                                            formats=["%.6f"] + ["%.4f"] * (len(self.METRIC_COLUMNS) - 1))
         
         # Store metadata
         self.metadata = {
             'experiment_name': self.name,
             'start_time': datetime.now().isoformat(),
             'log_directory': self.log_dir,
-            'csv_filename': os.path.basename(self.csv_path),
+            'csv_filename': os.path.basename(self.metrics_writer.path),
             'system_info': {
                 'platform': os.uname().sysname if hasattr(os, 'uname') else 'Unknown',
                 'python_version': os.sys.version
             }
         }
 
-        self.source_starting_position = np.array([source_starting_pose["Root"].positionX / self.unit_scale, 
-                                                    source_starting_pose["Root"].positionY / self.unit_scale,
-                                                    source_starting_pose["Root"].positionZ / self.unit_scale])
+        self.source_starting_position = source_starting_pose["Root"].position / self.unit_scale
         
-        self.target_starting_position = np.array([target_starting_pose["Robot"].positionX, 
-                                                  target_starting_pose["Robot"].positionY, 
-                                                  target_starting_pose["Robot"].positionZ])
+        self.target_starting_position = target_starting_pose["Robot"].position.copy()
 
         self.source_pose = source_pose
         self.target_pose = target_pose
         self.source_twist = source_twist
         self.target_twist = target_twist
 
-        # Key: timestep, value: metrics
-        self.total_position_metrics = {}
-        self.total_orientation_metrics = {}
-        self.total_linear_velocity_metrics = {}
+        # LatencyTrace of the control loop, source of the timing metrics
+        self.latency_trace = latency_trace
 
-    def _init_csv_file(self):
-        """Initialize CSV file with headers"""
-        # Define all possible metric fields
-        headers = ['timestep']
-        
-        # Position metrics
-        position_fields = ['position_error', 'x_error', 'y_error', 'z_error']
-        
-        # Linear Velocity metrics  
-        linear_velocity_fields = ['linear_velocity_error', 'x_vel_error', 'y_vel_error', 'z_vel_error']
+        # Running statistics of each error over the whole run, constant memory
+        self.error_stats = {
+            'position_error': ErrorStats(),
+            'angular_error_deg': ErrorStats(),
+            'linear_velocity_error': ErrorStats(),
+            'angular_velocity_error': ErrorStats()
+        }
 
-        # Angular Velocity metrics  
-        angular_velocity_fields = ['angular_velocity_error', 'rx_vel_error', 'ry_vel_error', 'rz_vel_error']
-        
-        # Add all fields to headers
-        headers.extend(position_fields)
-        headers.extend(linear_velocity_fields)
-        headers.extend(angular_velocity_fields)
-        
-        # Write headers to CSV
-        with open(self.csv_path, 'w', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=headers)
-            writer.writeheader()
+        # Metrics computed by the latest log_metrics call, reused by the displays
+        self.position_metrics_cache = None
+        self.linear_velocity_metrics_cache = None
+        self.angular_velocity_metrics_cache = None
+
+        # Dashboard refresh period in seconds
+        self.dashboard_period = 0.1
+        self.last_dashboard_time = 0.0
+        self.dashboard_active = False
 
     def position_metrics(self) -> Dict:
-        curr_source_position = np.array([self.source_pose["Root"].positionX / self.unit_scale, 
-                                         self.source_pose["Root"].positionY / self.unit_scale, 
-                                         self.source_pose["Root"].positionZ / self.unit_scale])
+        curr_source_position = self.source_pose["Root"].position / self.unit_scale
         
-        curr_target_position = np.array([self.target_pose["Robot"].positionX, 
-                                         self.target_pose["Robot"].positionY, 
-                                         self.target_pose["Robot"].positionZ])
+        curr_target_position = self.target_pose["Robot"].position
 
         source_displacement = curr_source_position - self.source_starting_position
         target_displacement = curr_target_position - self.target_starting_position
@@ -107,44 +101,30 @@ class PerformanceMetrics():
             'target_displacement': target_displacement
         }
 
-        self.total_position_metrics[self.source_pose["Root"].timestep] = metrics
-
         return metrics
     
     def orientation_metrics(self) -> Dict:
-        # Source orientation as a quaturion
-        source_q = st.Rotation.from_quat([
-            self.source_pose["Root"].orientationX,
-            self.source_pose["Root"].orientationY,
-            self.source_pose["Root"].orientationZ,
-            self.source_pose["Root"].orientationW
-        ])
-        
-        # target orientation as a quaturion
-        target_q = st.Rotation.from_quat([
-            self.target_pose["Robot"].orientationX, 
-            self.target_pose["Robot"].orientationY,
-            self.target_pose["Robot"].orientationZ,
-            self.target_pose["Robot"].orientationW
-        ])
-
-        # Calculate relative rotation
-        q_diff = target_q.inv() * source_q
-        
-        # Get angle of rotation (in radians)
-        angle_error_rad = q_diff.magnitude()
+        # Source and target orientation as quaturions [x, y, z, w]
+        sx, sy, sz, sw = self.source_pose["Root"].orientation.tolist()
+        tx, ty, tz, tw = self.target_pose["Robot"].orientation.tolist()
 
-        # Convert to degrees
-        angle_error_deg = np.degrees(angle_error_rad)
+        # Relative rotation target^-1 * source, written out to avoid building scipy Rotations every tick
+        w = tw * sw + tx * sx + ty * sy + tz * sz
+        vx = tw * sx - sw * tx - (ty * sz - tz * sy)
+        vy = tw * sy - sw * ty - (tz * sx - tx * sz)
+        vz = tw * sz - sw * tz - (tx * sy - ty * sx)
 
+        # Get angle of rotation (in radians), independent of the quaternions' norms
+        angle_error_rad = 2.0 * math.atan2(math.sqrt(vx * vx + vy * vy + vz * vz), abs(w))
+
+        # Convert to degrees
+        angle_error_deg = math.degrees(angle_error_rad)
 
         metrics = {
             'angular_error_rad': angle_error_rad,
             'angular_error_deg': angle_error_deg
         }
 
-        self.total_orientation_metrics[self.source_pose["Root"].timestep] = metrics
-
         return metrics
     
     def linear_velocity_metrics(self):
@@ -175,14 +155,23 @@ class PerformanceMetrics():
         
         return metrics
 
+    def _latency_stats(self, names):
+        if self.latency_trace is None:
+            return None
+        stats = self.latency_trace.get_stats()
+        return {key: stats.get(name) for key, name in names.items()}
+
     def temporal_accuracy(self):
-        pass
+        """Frame arrival against the Motive timestamps (positive: late), seconds"""
+        return self._latency_stats({'arrival_jitter': 'jitter'})
 
     def response_time(self):
-        pass
+        """Frame received to the command reaching the controller and to the robot acknowledging it, seconds"""
+        return self._latency_stats({'receive_to_send': 'to_send', 'receive_to_ack': 'total'})
 
     def network_latency(self):
-        pass
+        """Motive's mid-exposure to transmit latency and the network delay above the fastest frame, seconds"""
+        return self._latency_stats({'motive': 'motive', 'network': 'network'})
 
     def log_metrics(self):
         """Log metrics for a single timestep"""
@@ -190,39 +179,102 @@ class PerformanceMetrics():
         position_metrics = self.position_metrics()
         linear_velocity_metrics = self.linear_velocity_metrics()
         angular_velocity_metrics = self.angular_velocity_metrics()
+        orientation_metrics = self.orientation_metrics()
+
+        self.error_stats['position_error'].update(position_metrics['position_error'])
+        self.error_stats['angular_error_deg'].update(orientation_metrics['angular_error_deg'])
+        self.error_stats['linear_velocity_error'].update(linear_velocity_metrics['linear_velocity_error'])
+        self.error_stats['angular_velocity_error'].update(angular_velocity_metrics['angular_velocity_error'])
+
+        self.position_metrics_cache = position_metrics
+        self.linear_velocity_metrics_cache = linear_velocity_metrics
+        self.angular_velocity_metrics_cache = angular_velocity_metrics
 
         self.timestep_count += self.dt
         
-        # Prepare data row
-        row_data = {
-            'timestep': position_metrics.get('timestep'),
-            'position_error': round(position_metrics.get('position_error'), 4),
-            'x_error': round(position_metrics.get('x_error'), 4),
-            'y_error': round(position_metrics.get('y_error'), 4),
-            'z_error': round(position_metrics.get('z_error'), 4),
-            'linear_velocity_error': round(linear_velocity_metrics.get('linear_velocity_error'), 4),
-            'x_vel_error': round(linear_velocity_metrics.get('x_vel_error'), 4),
-            'y_vel_error': round(linear_velocity_metrics.get('y_vel_error'), 4),
-            'z_vel_error': round(linear_velocity_metrics.get('z_vel_error'), 4),
-            'angular_velocity_error': round(angular_velocity_metrics.get('angular_velocity_error'), 4),
-            'rx_vel_error': round(angular_velocity_metrics.get('rx_vel_error'), 4),
-            'ry_vel_error': round(angular_velocity_metrics.get('ry_vel_error'), 4),
-            'rz_vel_error': round(angular_velocity_metrics.get('rz_vel_error'), 4)
+        # Rounding and file I/O happen on the writer thread
+        self.metrics_writer.append((
+            position_metrics['timestep'],
+            position_metrics['position_error'],
+            position_metrics['x_error'],
+            position_metrics['y_error'],
+            position_metrics['z_error'],
+            linear_velocity_metrics['linear_velocity_error'],
+            linear_velocity_metrics['x_vel_error'],
+            linear_velocity_metrics['y_vel_error'],
+            linear_velocity_metrics['z_vel_error'],
+            angular_velocity_metrics['angular_velocity_error'],
+            angular_velocity_metrics['rx_vel_error'],
+            angular_velocity_metrics['ry_vel_error'],
+            angular_velocity_metrics['rz_vel_error']
+        ))
+
+    def get_summary(self) -> Dict:
+        """Aggregate error statistics of the run so far"""
+        return {name: stats.summary() for name, stats in self.error_stats.items()}
+
+    def write_summary(self):
+        """Write the run summary yaml next to the metrics log"""
+        summary = {
+            'experiment_name': self.name,
+            'start_time': self.metadata['start_time'],
+            'end_time': datetime.now().isoformat(),
+            'metrics_filename': os.path.basename(self.metrics_writer.path),
+            'metrics': self.get_summary()
         }
-        
-        # Write to CSV
-        with open(self.csv_path, 'a', newline='') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=row_data.keys())
-            writer.writerow(row_data)
+        if self.latency_trace is not None:
+            summary['latency'] = {
+                'temporal_accuracy': self.temporal_accuracy(),
+                'response_time': self.response_time(),
+                'network_latency': self.network_latency()
+            }
+        with open(self.summary_path, 'w') as f:
+            yaml.safe_dump(summary, f, sort_keys=False)
+
+    def close(self):
+        """Flush the metrics log and write the run summary"""
+        self.metrics_writer.close()
+        self.write_summary()
+
+        # Move off the dashboard line
+        if self.dashboard_active:
+            print()
+            self.dashboard_active = False
+
+    def _current_metrics(self):
+        """Metrics of the latest log_metrics call, computed here if nothing was logged yet"""
+        if self.position_metrics_cache is None:
+            return self.position_metrics(), self.linear_velocity_metrics(), self.angular_velocity_metrics()
+        return self.position_metrics_cache, self.linear_velocity_metrics_cache, self.angular_velocity_metrics_cache
+
+    def print_dashboard(self):
+        """Redraw a single status line, at most once per dashboard_period"""
+        now = time.perf_counter()
+        if now - self.last_dashboard_time < self.dashboard_period:
+            return
+        self.last_dashboard_time = now
+
+        position_metrics, linear_velocity_metrics, angular_velocity_metrics = self._current_metrics()
+        line = (f"t {position_metrics['timestep']:8.3f} s | "
+                f"pos {position_metrics['position_error']:.4f} m "
+                f"({position_metrics['x_error']:+.4f}, {position_metrics['y_error']:+.4f}, {position_metrics['z_error']:+.4f}) | "
+                f"lin vel {linear_velocity_metrics['linear_velocity_error']:.4f} m/s | "
+                f"ang vel {angular_velocity_metrics['angular_velocity_error']:.4f} rad/s")
+
+        # Carriage return and erase line, so the status stays on one terminal line
+        print(f"\r\x1b[2K{line}", end="", flush=True)
+        self.dashboard_active = True
 
     def print_metric_summary(self):
         """Print all metrics """
         
+        position_metrics, linear_velocity_metrics, angular_velocity_metrics = self._current_metrics()
+
         # Define all metric categories with their display names and formats
         metric_categories = [
             {
                 'name': 'POSITION',
-                'data': self.position_metrics(),
+                'data': position_metrics,
                 'fields': [
                     ('position_error', 'Total Error', '{:.4f} m'),
                     ('x_error', 'X Error', '{:.4f} m'),
@@ -232,7 +284,7 @@ class PerformanceMetrics():
             },
             {
                 'name': 'LINEAR VELOCITY',
-                'data': self.linear_velocity_metrics(),
+                'data': linear_velocity_metrics,
                 'fields': [
                     ('linear_velocity_error', 'Total Error', '{:.4f} m/s'),
                     ('x_vel_error', 'X Error', '{:.4f} m/s'),
@@ -242,7 +294,7 @@ class PerformanceMetrics():
             },
             {
                 'name': 'ANGULAR VELOCITY',
-                'data': self.angular_velocity_metrics(),
+                'data': angular_velocity_metrics,
                 'fields': [
                     ('angular_velocity_error', 'Total Error', '{:.4f} m/s'),
                     ('rx_vel_error', 'X Error', '{:.4f} m/s'),
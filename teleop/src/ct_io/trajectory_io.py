@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+import ct_math.ct_math as ctm
+
+# Bump when the binary layout or header fields change
+TRAJECTORY_FORMAT_VERSION = 1
+
+CSV_EXTENSION = ".csv"
+BINARY_EXTENSION = ".npy"
+HEADER_EXTENSION = ".json"
+TRAJECTORY_EXTENSIONS = (CSV_EXTENSION, BINARY_EXTENSION)
+
+# Transformed trajectories, keyed by source file hash and transform version
+TRANSFORM_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../cache/transformed")
+
+def header_path(binary_file):
+    """Path of the JSON header that sits next to a binary trajectory"""
+    return os.path.splitext(binary_file)[0] + HEADER_EXTENSION
+
+def is_binary_trajectory(path):
+    return path.endswith(BINARY_EXTENSION)
+
+def rigid_body_names(columns):
+    """Rigid body names in column order from RigidBodyName:Type:Axis columns"""
+    names = []
+    for col in columns:
+        parts = col.split(':')
+        if len(parts) >= 2 and parts[0] not in names:
+            names.append(parts[0])
+    return names
+
+def save_trajectory(df, output_file, dtype=np.float32):
+    """
+    Save a formatted Motive DataFrame as a .npy file (float32 by default) plus a JSON header
+
+    Args:
+        df: DataFrame with Frame, Time (Seconds) and RigidBodyName:Type:Axis columns
+        output_file: Path of the .npy file, the header is written next to it
+        dtype: Element type of the saved array
+    """
+    data = np.ascontiguousarray(df.to_numpy(dtype=dtype))
+    np.save(output_file, data)
+
+    header = {
+        'version': TRAJECTORY_FORMAT_VERSION,
+        'dtype': str(data.dtype),
+        'shape': list(data.shape),
+        'columns': [str(col) for col in df.columns],
+        'rigid_bodies': rigid_body_names(df.columns),
+    }
+    with open(header_path(output_file), 'w') as header_file:
+        json.dump(header, header_file, indent=2)
+
+def load_header(binary_file):
+    with open(header_path(binary_file), 'r') as header_file:
+        header = json.load(header_file)
+
+    if header.get('version') != TRAJECTORY_FORMAT_VERSION:
+        raise ValueError(f"Unsupported trajectory format version {header.get('version')} in {header_path(binary_file)}")
+
+    return header
+
+def load_trajectory_array(input_file, dtype=np.float32):
+    """
+    Load a trajectory as a 2D array and its header
+
+    Binary trajectories are memory-mapped read-only, so opening a take does not read it.
+    CSV trajectories are parsed and converted to the same layout.
+
+    Args:
+        input_file: Formatted CSV or binary trajectory
+        dtype: Element type CSV trajectories are parsed to, binary trajectories keep their stored type
+
+    Returns:
+        (data, header) where data is an (N, columns) array
+    """
+    if is_binary_trajectory(input_file):
+        header = load_header(input_file)
+        data = np.load(input_file, mmap_mode='r')
+        if list(data.shape) != header['shape']:
+            raise ValueError(f"Trajectory {input_file} has shape {data.shape}, header expects {header['shape']}")
+        return data, header
+
+    df = pd.read_csv(input_file)
+    data = df.to_numpy(dtype=dtype)
+    header = {
+        'version': TRAJECTORY_FORMAT_VERSION,
+        'dtype': str(data.dtype),
+        'shape': list(data.shape),
+        'columns': list(df.columns),
+        'rigid_bodies': rigid_body_names(df.columns),
+    }
+    return data, header
+
+def load_trajectory(input_file):
+    """Load a formatted CSV or binary trajectory as a DataFrame"""
+    if not is_binary_trajectory(input_file):
+        return pd.read_csv(input_file)
+
+    data, header = load_trajectory_array(input_file)
+    return pd.DataFrame(data, columns=header['columns'], copy=False)
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def transform_cache_path(input_file, cache_dir=TRANSFORM_CACHE_DIR):
+    """Cache file of the transformed trajectory, changes with the file contents or either version"""
+    key = hashlib.sha1(f"{file_hash(input_file)}:{ctm.COORDINATE_TRANSFORM_VERSION}:{TRAJECTORY_FORMAT_VERSION}".encode()).hexdigest()
+    name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(cache_dir, f"{name}_{key[:16]}{BINARY_EXTENSION}")
+
+def load_transformed_trajectory(input_file, cache_dir=TRANSFORM_CACHE_DIR):
+    """
+    Load a trajectory with the coordinate transformation applied, using the on-disk cache
+
+    A cache hit memory-maps the stored result. On a miss the take is loaded, transformed in place
+    and stored with the source's precision (float64 for CSV, float32 for binary trajectories).
+    """
+    cache_file = transform_cache_path(input_file, cache_dir)
+    if os.path.exists(cache_file) and os.path.exists(header_path(cache_file)):
+        return load_trajectory(cache_file)
+
+    if is_binary_trajectory(input_file):
+        data, header = load_trajectory_array(input_file)
+        # Writable copy of the memory-mapped take
+        data = np.array(data)
+        columns = header['columns']
+    else:
+        df = pd.read_csv(input_file)
+        data = df.to_numpy(dtype=np.float64, copy=True)
+        columns = list(df.columns)
+
+    ctm.apply_coordinate_transformation_array(data, columns)
+    df = pd.DataFrame(data, columns=columns, copy=False)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    save_trajectory(df, cache_file, dtype=data.dtype)
+    return df
@@ -0,0 +1,111 @@
+import math
+
+AXES = ("vx", "vy", "vrz")
+
+class CommandShaper():
+    """
+    Keeps walk commands [vx, vy, vrz] inside the controller's velocity and acceleration limits
+    without losing distance
+
+    The residual is the displacement the robot still owes from earlier ticks. Each tick the target
+    velocity is the command plus a catch-up velocity paying the residual back, no faster than the
+    robot can brake from (sqrt(2 * a * |residual|)) so it settles instead of oscillating. The target
+    is clamped to +-max_acceleration * dt around the previous command and to +-max_velocity, and
+    whatever was not executed is added to the residual, so a human moving faster than the robot
+    can is followed over more ticks. The residual is capped at max_lag seconds of travel at
+    max_velocity, the rest is discarded (and counted) so the robot never runs seconds behind.
+
+    Residuals are kept in the body frame; while turning this is an approximation. Constant time
+    per tick, three axes of plain float math.
+    """
+    def __init__(self, max_velocity, max_acceleration, max_lag=1.0, scale=1.0):
+        self.max_velocity = [float(v) for v in max_velocity]
+        self.max_acceleration = [float(a) for a in max_acceleration]
+        self.max_residual = [max_lag * v for v in self.max_velocity]
+        self.scale = scale
+
+        self.command = [0.0, 0.0, 0.0]
+        self.residual = [0.0, 0.0, 0.0]
+
+        self.tick_count = 0
+        # Per axis: ticks clamped by the velocity / acceleration limit
+        self.velocity_saturated_count = [0, 0, 0]
+        self.acceleration_limited_count = [0, 0, 0]
+        # Per axis: largest and summed |target - shaped| velocity, displacement dropped at the lag cap
+        self.max_excess = [0.0, 0.0, 0.0]
+        self.total_excess = [0.0, 0.0, 0.0]
+        self.discarded = [0.0, 0.0, 0.0]
+
+    @classmethod
+    def from_config(cls, limits):
+        """Build from the limits section of controller_config.yaml"""
+        return cls([limits['max_velocity'][axis] for axis in AXES],
+                   [limits['max_acceleration'][axis] for axis in AXES],
+                   max_lag=limits.get('max_lag', 1.0), scale=limits.get('scale', 1.0))
+
+    def reset(self):
+        """Forget the previous command and the owed displacement (e.g. after a stop)"""
+        self.command = [0.0, 0.0, 0.0]
+        self.residual = [0.0, 0.0, 0.0]
+
+    def shape(self, vx, vy, vrz, dt):
+        """Shaped (vx, vy, vrz) to hold for the next dt seconds"""
+        self.tick_count += 1
+        if dt <= 0:
+            return tuple(self.command)
+
+        for i, wanted in enumerate((vx, vy, vrz)):
+            wanted = self.scale * float(wanted)
+            residual = self.residual[i]
+            catch_up = min(abs(residual) / dt, math.sqrt(2.0 * self.max_acceleration[i] * abs(residual)))
+            target = wanted + (catch_up if residual > 0 else -catch_up)
+
+            max_step = self.max_acceleration[i] * dt
+            previous = self.command[i]
+            velocity = min(max(target, previous - max_step), previous + max_step)
+            if velocity != target:
+                self.acceleration_limited_count[i] += 1
+
+            max_velocity = self.max_velocity[i]
+            if velocity > max_velocity or velocity < -max_velocity:
+                velocity = max_velocity if velocity > 0 else -max_velocity
+                self.velocity_saturated_count[i] += 1
+
+            excess = abs(target - velocity)
+            self.total_excess[i] += excess
+            if excess > self.max_excess[i]:
+                self.max_excess[i] = excess
+
+            residual += (wanted - velocity) * dt
+            max_residual = self.max_residual[i]
+            if residual > max_residual or residual < -max_residual:
+                clamped = max_residual if residual > 0 else -max_residual
+                self.discarded[i] += abs(residual - clamped)
+                residual = clamped
+
+            self.residual[i] = residual
+            self.command[i] = velocity
+
+        return tuple(self.command)
+
+    def get_stats(self):
+        """key: axis, value: dict of saturation counters"""
+        ticks = max(self.tick_count, 1)
+        return {axis: {
+            'velocity_saturated': self.velocity_saturated_count[i],
+            'velocity_saturated_rate': self.velocity_saturated_count[i] / ticks,
+            'acceleration_limited': self.acceleration_limited_count[i],
+            'acceleration_limited_rate': self.acceleration_limited_count[i] / ticks,
+            'max_excess': self.max_excess[i],
+            'mean_excess': self.total_excess[i] / ticks,
+            'residual': self.residual[i],
+            'discarded': self.discarded[i],
+        } for i, axis in enumerate(AXES)}
+
+    def print_summary(self):
+        print("\n----------------Command shaping----------------")
+        print(f"{'axis':<6}{'vel sat %':>11}{'acc lim %':>11}{'max excess':>12}{'residual':>11}{'discarded':>11}")
+        for axis, axis_stats in self.get_stats().items():
+            print(f"{axis:<6}{axis_stats['velocity_saturated_rate'] * 100:>11.2f}{axis_stats['acceleration_limited_rate'] * 100:>11.2f}"
+                  f"{axis_stats['max_excess']:>12.3f}{axis_stats['residual']:>11.3f}{axis_stats['discarded']:>11.3f}")
+        print(f"Ticks: {self.tick_count}")
@@ -1,34 +1,25 @@
 import numpy as np
+import pandas as pd
 import scipy.spatial.transform as st
 
+# Per rigid body column order of the formatted Motive CSVs
+POSE_COLUMNS = [("Rotation", "X"), ("Rotation", "Y"), ("Rotation", "Z"), ("Rotation", "W"),
+                ("Position", "X"), ("Position", "Y"), ("Position", "Z")]
+
 def linear_velocity(current_pose, previous_pose, dt):
     """Calculate linear velocity from position change"""
 
     unitScale = 1000.0
 
-    dx = (current_pose.positionX - previous_pose.positionX) / unitScale
-    dy = (current_pose.positionY - previous_pose.positionY) / unitScale  
-    dz = (current_pose.positionZ - previous_pose.positionZ) / unitScale
-    
-    linear_vel = np.array([dx/dt, dy/dt, dz/dt])
+    linear_vel = (current_pose.position - previous_pose.position) / unitScale / dt
     return linear_vel
 
 def angular_velocity(current_pose, previous_pose, dt):
     # Current rotation
-    rot_current = st.Rotation.from_quat([
-        current_pose.orientationX,
-        current_pose.orientationY,
-        current_pose.orientationZ,
-        current_pose.orientationW
-    ])
+    rot_current = st.Rotation.from_quat(current_pose.orientation)
     
     # Previous rotation
-    rot_previous = st.Rotation.from_quat([
-        previous_pose.orientationX,
-        previous_pose.orientationY,
-        previous_pose.orientationZ,
-        previous_pose.orientationW
-    ])
+    rot_previous = st.Rotation.from_quat(previous_pose.orientation)
     
     # Relative rotation
     rot_rel = rot_current * rot_previous.inv()
@@ -39,6 +30,48 @@ def angular_velocity(current_pose, previous_pose, dt):
     
     return angular_vel
 
+def pose_array(df, rigid_body_names):
+    """
+    Stack rigid body poses from a formatted DataFrame into one array
+
+    Args:
+        df: DataFrame with RigidBodyName:Type:Axis columns
+        rigid_body_names: Rigid bodies to stack, in output order
+
+    Returns:
+        (N, bodies, 7) array of [qx, qy, qz, qw, px, py, pz] per frame and rigid body
+    """
+    columns = [f"{rb_name}:{pose_type}:{axis}" for rb_name in rigid_body_names
+               for pose_type, axis in POSE_COLUMNS]
+
+    return df[columns].to_numpy(dtype=np.float64).reshape(len(df), len(rigid_body_names), 7)
+
+def batch_velocities(poses, timesteps):
+    """
+    Calculate linear and angular velocities for a whole trajectory in one vectorized pass
+
+    Args:
+        poses: (N, bodies, 7) array of [qx, qy, qz, qw, px, py, pz] (see pose_array)
+        timesteps: (N,) array of frame times in seconds
+
+    Returns:
+        linear and angular velocity arrays of shape (N-1, bodies, 3), where row i is the
+        velocity between frame i and frame i+1
+    """
+    unitScale = 1000.0
+
+    n_frames, n_bodies = poses.shape[:2]
+    dt = np.diff(timesteps)[:, None, None]
+
+    linear_vel = np.diff(poses[:, :, 4:7], axis=0) / unitScale / dt
+
+    # One Rotation over every quaternion, frame-major so frame i+1 is n_bodies entries after frame i
+    rot = st.Rotation.from_quat(poses[:, :, 0:4].reshape(-1, 4))
+    rot_rel = rot[n_bodies:] * rot[:-n_bodies].inv()
+    angular_vel = rot_rel.as_rotvec().reshape(n_frames - 1, n_bodies, 3) / dt
+
+    return linear_vel, angular_vel
+
 def eular_to_quat(roll, pitch, yaw):
     return st.Rotation.from_euler("xyz", [roll, pitch, yaw]).as_quat()
 
@@ -58,63 +91,61 @@ def transform_cordinate_frame(source_linear_vel, source_angular_vel, target_orie
     
     return target_linear_vel, target_angular_vel
 
+# Bump when the transformation changes, invalidates cached transformed trajectories
+COORDINATE_TRANSFORM_VERSION = 1
+
+# Motive to robot frame: [x, y, z] -> [-y, -x, z] for positions and the quaternion vector part,
+# qw unchanged. key: axis, value: (source axis, sign)
+COORDINATE_TRANSFORM = {"X": ("Y", -1.0), "Y": ("X", -1.0), "Z": ("Z", 1.0), "W": ("W", 1.0)}
+
+def coordinate_transform_indices(columns):
+    """
+    Express the coordinate transformation as a column permutation and sign vector
+
+    Args:
+        columns: column names, RigidBodyName:Type:Axis for rigid body data
+
+    Returns:
+        (permutation, signs) with transformed[:, i] = data[:, permutation[i]] * signs[i]
+    """
+    index = {col: i for i, col in enumerate(columns)}
+    permutation = np.arange(len(columns))
+    signs = np.ones(len(columns))
+
+    for i, col in enumerate(columns):
+        parts = col.split(':')
+        if len(parts) != 3 or parts[1] not in ("Position", "Rotation"):
+            continue
+
+        # Only transform complete position or quaternion groups
+        axes = "XYZ" if parts[1] == "Position" else "XYZW"
+        if not all(f"{parts[0]}:{parts[1]}:{axis}" in index for axis in axes):
+            continue
+
+        source_axis, sign = COORDINATE_TRANSFORM[parts[2]]
+        permutation[i] = index[f"{parts[0]}:{parts[1]}:{source_axis}"]
+        signs[i] = sign
+
+    return permutation, signs
+
+def apply_coordinate_transformation_array(data, columns):
+    """Apply the coordinate transformation to a (N, columns) float array in place"""
+    permutation, signs = coordinate_transform_indices(columns)
+    changed = np.flatnonzero((permutation != np.arange(len(columns))) | (signs != 1.0))
+    # The right hand side is gathered before anything is written, so swapped columns are safe
+    data[:, changed] = data[:, permutation[changed]] * signs[changed]
+    return data
+
 def apply_coordinate_transformation(df):
     """
     Apply coordinate system transformation to a motion capture DataFrame
     
     Args:
         df: DataFrame with motion capture data (formatted with RigidBodyName:Type:Axis columns)
-        transform_coords: Whether to apply the coordinate transformation
     
     Returns:
-        DataFrame with transformed coordinates (if transform_coords=True)
+        DataFrame with transformed coordinates
     """
-    df_transformed = df.copy()
-    
-    # Find all unique rigid body names
-    rigid_body_names = set()
-    for col in df.columns:
-        if ':' in col:
-            parts = col.split(':')
-            if len(parts) >= 2:
-                rigid_body_names.add(parts[0])
-    
-    print(f"Applying coordinate transformation to {len(rigid_body_names)} rigid bodies...")
-    
-    for rb_name in rigid_body_names:
-        # Transform Position data
-        pos_x_col = f"{rb_name}:Position:X"
-        pos_y_col = f"{rb_name}:Position:Y"
-        pos_z_col = f"{rb_name}:Position:Z"
-        
-        if all(col in df.columns for col in [pos_x_col, pos_y_col, pos_z_col]):
-            # Store original values
-            orig_x = df[pos_x_col].values.copy()
-            orig_y = df[pos_y_col].values.copy()
-            orig_z = df[pos_z_col].values.copy()
-            
-            # Apply transformation: [x, y, z] -> [-y, -x, z]
-            df_transformed[pos_x_col] = -orig_y  # New X = -original Y
-            df_transformed[pos_y_col] = -orig_x  # New Y = -original X
-            df_transformed[pos_z_col] = orig_z   # New Z = original Z
-        
-        # Transform Rotation data (quaternions)
-        rot_x_col = f"{rb_name}:Rotation:X"
-        rot_y_col = f"{rb_name}:Rotation:Y"
-        rot_z_col = f"{rb_name}:Rotation:Z"
-        rot_w_col = f"{rb_name}:Rotation:W"
-        
-        if all(col in df.columns for col in [rot_x_col, rot_y_col, rot_z_col, rot_w_col]):
-            # Store original quaternion components
-            orig_qx = df[rot_x_col].values.copy()
-            orig_qy = df[rot_y_col].values.copy()
-            orig_qz = df[rot_z_col].values.copy()
-            orig_qw = df[rot_w_col].values.copy()
-            
-            # Apply same transformation to quaternion components
-            df_transformed[rot_x_col] = -orig_qy  # New qx = -original qy
-            df_transformed[rot_y_col] = -orig_qx  # New qy = -original qx
-            df_transformed[rot_z_col] = orig_qz   # New qz = original qz
-            df_transformed[rot_w_col] = orig_qw   # qw unchanged
-    
-    return df_transformed
+    data = df.to_numpy(dtype=np.float64, copy=True)
+    apply_coordinate_transformation_array(data, list(df.columns))
+    return pd.DataFrame(data, columns=df.columns, copy=False)
@@ -0,0 +1,127 @@
+import math
+from bisect import bisect_right
+
+class P2Quantile():
+    """
+    Streaming quantile estimate in constant memory (P-square algorithm, Jain & Chlamtac 1985)
+
+    Five markers track the minimum, p/2, p, (1+p)/2 quantiles and the maximum; the middle marker is
+    the estimate. Exact until five samples have been seen.
+    """
+    __slots__ = ("p", "heights", "positions", "desired", "increments")
+
+    def __init__(self, p):
+        if not 0.0 < p < 1.0:
+            raise ValueError(f"Quantile must be in (0, 1), got {p}")
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1.0, 1.0 + 2.0 * p, 1.0 + 4.0 * p, 3.0 + 2.0 * p, 5.0]
+        self.increments = [0.0, p / 2.0, p, (1.0 + p) / 2.0, 1.0]
+
+    def update(self, x):
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        positions = self.positions
+        desired = self.desired
+        increments = self.increments
+
+        # Cell the sample falls in, stretching the extreme markers if needed
+        if x < heights[0]:
+            heights[0] = x
+            k = 1
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 4
+        else:
+            k = bisect_right(heights, x)
+
+        for i in range(k, 5):
+            positions[i] += 1
+        desired[1] += increments[1]
+        desired[2] += increments[2]
+        desired[3] += increments[3]
+        desired[4] += 1.0
+
+        # Move the middle markers towards their desired positions
+        for i in range(1, 4):
+            d = desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, d)
+                heights[i] = height
+                positions[i] += d
+
+    def _parabolic(self, i, d):
+        h, n = self.heights, self.positions
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1]))
+
+    def _linear(self, i, d):
+        h, n = self.heights, self.positions
+        return h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+
+    def value(self):
+        heights = self.heights
+        if not heights:
+            return math.nan
+        if len(heights) < 5:
+            # Nearest rank on the samples seen so far
+            return heights[min(len(heights) - 1, int(round(self.p * (len(heights) - 1))))]
+        return heights[2]
+
+class ErrorStats():
+    """
+    Running summary of an error signal in constant memory
+
+    Welford's update for mean and variance, the mean square for the RMSE, the maximum, and P-square
+    estimates of the median, p95 and p99.
+    """
+    __slots__ = ("count", "mean", "m2", "abs_sum", "max", "median", "p95", "p99")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.abs_sum = 0.0
+        self.max = -math.inf
+        self.median = P2Quantile(0.5)
+        self.p95 = P2Quantile(0.95)
+        self.p99 = P2Quantile(0.99)
+
+    def update(self, x):
+        x = float(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.abs_sum += abs(x)
+        if x > self.max:
+            self.max = x
+        self.median.update(x)
+        self.p95.update(x)
+        self.p99.update(x)
+
+    def summary(self):
+        """Summary metrics as plain floats, ready for yaml"""
+        if self.count == 0:
+            return {'count': 0}
+
+        variance = self.m2 / self.count
+        return {
+            'count': self.count,
+            'rmse': math.sqrt(variance + self.mean ** 2),       # Root mean square error
+            'mae': self.abs_sum / self.count,                   # Mean absolute error
+            'max_error': self.max,                              # Max error
+            'std_error': math.sqrt(variance),                   # Standard deviation of the error
+            'median_error': self.median.value(),                # Median error (estimate)
+            'p95_error': self.p95.value(),                      # 95th percentile (estimate)
+            'p99_error': self.p99.value(),                      # 99th percentile (estimate)
+        }
@@ -0,0 +1,155 @@
+import threading
+from time import perf_counter
+import numpy as np
+
+class CommandDispatcher():
+    """
+    Sends commands on a background thread through a single-slot mailbox
+
+    post() stores the command and returns immediately. The dispatcher thread sends the newest
+    command; one posted while another was still waiting is replaced and counted as dropped, so
+    a slow controller gets the latest intent instead of a backlog. Send latency (time inside
+    send) and queue latency (post to send start) of the latest capacity sends are kept for
+    percentiles. post() returns a sequence number, get_send_time() tells when that command was
+    sent.
+    """
+    def __init__(self, send, capacity=1 << 16):
+        self.send = send
+        self.capacity = capacity
+
+        self.condition = threading.Condition()
+        # (command args, post time, sequence) waiting to be sent
+        self.pending = None
+        self.busy = False
+        self.running = False
+        self.thread = None
+        self.error = None
+
+        self.posted_count = 0
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.send_latencies = np.zeros(capacity, dtype=np.float64)
+        self.queue_latencies = np.zeros(capacity, dtype=np.float64)
+        self.max_send_latency = 0.0
+        # perf_counter time each command's send returned by sequence, NaN until sent
+        self.send_times = np.full(capacity, np.nan)
+        self.last_sent_sequence = -1
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="CommandDispatcher", daemon=True)
+        self.thread.start()
+
+    def post(self, *command):
+        """Queue a command, replacing any command not sent yet, returns its sequence number"""
+        if self.error is not None:
+            raise RuntimeError("Command dispatch failed") from self.error
+
+        with self.condition:
+            if self.pending is not None:
+                self.dropped_count += 1
+            sequence = self.posted_count
+            self.send_times[sequence % self.capacity] = np.nan
+            self.pending = (command, perf_counter(), sequence)
+            self.posted_count += 1
+            self.condition.notify_all()
+        return sequence
+
+    def get_send_time(self, sequence):
+        """perf_counter time the send of a posted command returned, None if it hasn't been sent (yet)"""
+        if sequence < self.posted_count - self.capacity:
+            return None
+        send_time = self.send_times[sequence % self.capacity]
+        return None if np.isnan(send_time) else float(send_time)
+
+    def was_dropped(self, sequence):
+        """Whether a posted command was replaced by a newer one before it was sent"""
+        return self.get_send_time(sequence) is None and self.last_sent_sequence > sequence
+
+    def discard(self):
+        """Drop the pending command and wait for the one being sent"""
+        with self.condition:
+            if self.pending is not None:
+                self.pending = None
+                self.dropped_count += 1
+            while self.busy:
+                self.condition.wait()
+
+    def flush(self):
+        """Wait until the pending command has been sent"""
+        with self.condition:
+            while self.running and (self.pending is not None or self.busy):
+                self.condition.wait()
+
+    def stop(self):
+        """Send the pending command and end the thread"""
+        self.flush()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                command, post_time, sequence = self.pending
+                self.pending = None
+                self.busy = True
+
+            start_time = perf_counter()
+            try:
+                self.send(*command)
+            except Exception as e:
+                self.error = e
+            end_time = perf_counter()
+
+            slot = self.sent_count % self.capacity
+            self.send_latencies[slot] = end_time - start_time
+            self.queue_latencies[slot] = start_time - post_time
+            self.max_send_latency = max(self.max_send_latency, end_time - start_time)
+            self.send_times[sequence % self.capacity] = end_time
+            self.last_sent_sequence = sequence
+
+            with self.condition:
+                self.sent_count += 1
+                self.busy = False
+                self.condition.notify_all()
+                if self.error is not None:
+                    self.running = False
+                    return
+
+    def get_stats(self):
+        sent = min(self.sent_count, self.capacity)
+        stats = {
+            'posted': self.posted_count,
+            'sent': self.sent_count,
+            'dropped': self.dropped_count,
+            'drop_rate': self.dropped_count / max(self.posted_count, 1),
+            'max_send_latency': self.max_send_latency,
+        }
+        for name, latencies in (('send_latency', self.send_latencies[:sent]), ('queue_latency', self.queue_latencies[:sent])):
+            if sent == 0:
+                stats[f'{name}_mean'] = stats[f'{name}_p50'] = stats[f'{name}_p99'] = 0.0
+                continue
+            p50, p99 = np.percentile(latencies, (50, 99))
+            stats[f'{name}_mean'] = float(latencies.mean())
+            stats[f'{name}_p50'] = float(p50)
+            stats[f'{name}_p99'] = float(p99)
+        return stats
+
+    def print_summary(self):
+        stats = self.get_stats()
+        print("\n---------------Command dispatch----------------")
+        print(f"Posted: {stats['posted']}, sent: {stats['sent']}, dropped: {stats['dropped']} ({stats['drop_rate'] * 100:.2f}%)")
+        print(f"Send latency  mean {stats['send_latency_mean'] * 1e6:.1f} us, p50 {stats['send_latency_p50'] * 1e6:.1f} us, "
+              f"p99 {stats['send_latency_p99'] * 1e6:.1f} us, max {stats['max_send_latency'] * 1e6:.1f} us")
+        print(f"Queue latency mean {stats['queue_latency_mean'] * 1e6:.1f} us, p50 {stats['queue_latency_p50'] * 1e6:.1f} us, "
+              f"p99 {stats['queue_latency_p99'] * 1e6:.1f} us")
@@ -1,60 +1,155 @@
 import os
 import sys
+import threading
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
 from pose.pose import Pose
-import ct_math.ct_math as ctm
+from ctrl_interface.telemetry import Telemetry
+from ctrl_interface.command_dispatcher import CommandDispatcher
 
 # Import the mpac_go2 python controller interface
 mpac_go2_atnmy = "../mpac/mpac_go2/atnmy/"
 print(os.path.exists(mpac_go2_atnmy))
 sys.path.append(mpac_go2_atnmy)
 
-import mpac_cmd
+# The controller is optional at import time, set_backend picks the real one or the in-process fake
+try:
+    import mpac_cmd
+except ImportError:
+    mpac_cmd = None
+
+CTRL_BACKENDS = ("mpac", "fake")
+
+# Snapshot age the orientation and position getters accept, about one tick of the 240 Hz control
+# loop, so the two readings of a tick come from the same controller state
+TELEMETRY_MAX_AGE = 1 / 240
 
 class CtrlInterface():
+    # Latest telemetry snapshot, pending prefetch and the thread that runs it
+    _telemetry = None
+    _prefetch = None
+    _executor = None
+    telemetry_fetch_count = 0
+    # Walk commands go through the dispatcher thread while it runs
+    dispatcher = None
+    # mpac_cmd is called from the loop, the dispatcher and the prefetch thread, one call at a time
+    _mpac_lock = threading.Lock()
+
     def __init__(self):
         pass
 
+    def set_backend(backend="mpac"):
+        """Send commands to the mpac_go2 controller ("mpac") or the simulated robot ("fake")"""
+        global mpac_cmd
+        if backend == "fake":
+            from ctrl_interface import fake_mpac_cmd
+            mpac_cmd = fake_mpac_cmd
+        elif backend == "mpac":
+            import importlib
+            try:
+                mpac_cmd = importlib.import_module("mpac_cmd")
+            except ImportError as e:
+                raise ImportError(f"mpac_cmd not found in {mpac_go2_atnmy}, use the fake backend to run without the controller") from e
+        else:
+            raise ValueError(f"Unknown controller backend '{backend}', expected one of {CTRL_BACKENDS}")
+
+    def start_dispatcher():
+        """Send walk commands asynchronously, the latest one wins"""
+        if CtrlInterface.dispatcher is None:
+            CtrlInterface.dispatcher = CommandDispatcher(CtrlInterface._send_walk)
+        CtrlInterface.dispatcher.start()
+        return CtrlInterface.dispatcher
+
+    def stop_dispatcher():
+        """Send the pending walk command and go back to synchronous commands, returns the dispatcher"""
+        dispatcher = CtrlInterface.dispatcher
+        if dispatcher is not None:
+            dispatcher.stop()
+            CtrlInterface.dispatcher = None
+        return dispatcher
+
+    def _call(command, **kwargs):
+        with CtrlInterface._mpac_lock:
+            return command(**kwargs)
+
+    def _send_mode(command, **kwargs):
+        # A walk command still queued must not override a mode change
+        if CtrlInterface.dispatcher is not None:
+            CtrlInterface.dispatcher.discard()
+        CtrlInterface._call(command, **kwargs)
+
+    def _send_walk(vx, vy, vrz):
+        CtrlInterface._call(mpac_cmd.walk_idqp, h=0.25, vx=vx, vy=vy, vrz=vrz)
+
     def walk(vx=0, vy=0, vrz=0):
-        mpac_cmd.walk_idqp(h=0.25,vx=vx, vy=vy, vrz=vrz)
+        """Returns the dispatcher sequence number of the command, None if it was sent synchronously"""
+        if CtrlInterface.dispatcher is not None:
+            return CtrlInterface.dispatcher.post(vx, vy, vrz)
+        CtrlInterface._send_walk(vx, vy, vrz)
+        return None
 
     def stand(rx=0, ry=0, rz=0):
-        mpac_cmd.stand_idqp(h=0.25, rx=rx, ry=ry, rz=rz)
+        CtrlInterface._send_mode(mpac_cmd.stand_idqp, h=0.25, rx=rx, ry=ry, rz=rz)
 
     def bound(vx=0):
-        mpac_cmd.bound(vx=vx)
+        CtrlInterface._send_mode(mpac_cmd.bound, vx=vx)
 
     def jump(vx=0, vy=0, vz=0):
-        mpac_cmd.jump(x_vel=vx, y_vel=vy, z_vel=vz)
+        CtrlInterface._send_mode(mpac_cmd.jump, x_vel=vx, y_vel=vy, z_vel=vz)
 
     def land():
-        mpac_cmd.land()
+        CtrlInterface._send_mode(mpac_cmd.land)
 
     def soft_stop():
-        mpac_cmd.soft_stop()
+        CtrlInterface._send_mode(mpac_cmd.soft_stop)
 
     def hard_stop():
-        mpac_cmd.hard_stop()
+        CtrlInterface._send_mode(mpac_cmd.hard_stop)
 
     def get_tlm_data():
-        return mpac_cmd.get_tlm_data()
+        return CtrlInterface._call(mpac_cmd.get_tlm_data)
 
-    def get_robot_orientation():
-        # Get the robots current orientation
-        tlm_data = mpac_cmd.get_tlm_data()
-        if isinstance(tlm_data, list):
-            r_roll, r_pitch, r_yaw = tlm_data[0]["q"][3:6]  # First robot
+    def get_telemetry(max_age=None):
+        """
+        Robot telemetry snapshot, one get_tlm_data call
+
+        A pending prefetch is collected first, it is the newest reading. Otherwise the cached
+        snapshot is returned while it is at most max_age seconds old; with max_age None, or once it
+        is older, telemetry is fetched now.
+        """
+        if CtrlInterface._prefetch is not None:
+            telemetry = CtrlInterface._prefetch.result()
+            CtrlInterface._prefetch = None
         else:
-            r_roll, r_pitch, r_yaw = tlm_data["q"][3:6]     # Single robot
+            telemetry = CtrlInterface._telemetry
+            if telemetry is None or max_age is None or telemetry.get_age() > max_age:
+                telemetry = CtrlInterface._fetch_telemetry()
+
+        CtrlInterface._telemetry = telemetry
+        return telemetry
 
-        # Convert eular to quat
-        robot_orientation = ctm.eular_to_quat(r_roll, r_pitch, r_yaw)
+    def prefetch_telemetry():
+        """
+        Start fetching telemetry on a worker thread, the next get_telemetry call collects it
 
-        return robot_orientation
+        Call it right after sending the tick's command; the fetch then overlaps with the wait for
+        the next tick.
+        """
+        if CtrlInterface._prefetch is not None:
+            return
+        if CtrlInterface._executor is None:
+            CtrlInterface._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TelemetryPrefetch")
+        CtrlInterface._prefetch = CtrlInterface._executor.submit(CtrlInterface._fetch_telemetry)
+
+    def _fetch_telemetry():
+        CtrlInterface.telemetry_fetch_count += 1
+        request_time = perf_counter()
+        return Telemetry(CtrlInterface.get_tlm_data(), request_time=request_time)
+
+    def get_robot_orientation(max_age=TELEMETRY_MAX_AGE):
+        """Get the robot's current orientation as a quaternion [qx, qy, qz, qw]"""
+        return CtrlInterface.get_telemetry(max_age).orientation
         
-    def get_robot_position():
+    def get_robot_position(max_age=TELEMETRY_MAX_AGE):
         """Get the robot's current position (x, y, z)"""
-        tlm_data = mpac_cmd.get_tlm_data()
-        
-        position = tlm_data["q"][:3]  # x, y, z position
-
-        return position
\ No newline at end of file
+        return CtrlInterface.get_telemetry(max_age).position
@@ -0,0 +1,89 @@
+"""
+In-process stand-in for the mpac_go2 mpac_cmd module
+
+Implements the mpac_cmd calls CtrlInterface uses. Walk commands are body frame velocities that
+are integrated into a simulated base pose, which get_tlm_data serves in the mpac layout
+(q = [x, y, z, roll, pitch, yaw, 12 joint angles], qd likewise). Lets teleop run and be profiled
+without the controller.
+"""
+import math
+from time import perf_counter
+import numpy as np
+
+STAND_HEIGHT = 0.25
+N_JOINTS = 12
+
+class FakeRobot():
+    def __init__(self, clock=perf_counter):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.q = np.zeros(6 + N_JOINTS)
+        self.qd = np.zeros(6 + N_JOINTS)
+        self.q[2] = STAND_HEIGHT
+        # Commanded body frame velocity [vx, vy, vrz]
+        self.command = (0.0, 0.0, 0.0)
+        self.mode = "stand"
+        self.last_update = self.clock()
+        self.command_count = 0
+
+    def update(self):
+        """Integrate the commanded velocity up to now"""
+        now = self.clock()
+        dt = now - self.last_update
+        self.last_update = now
+        if dt <= 0:
+            return
+
+        vx, vy, vrz = self.command
+        yaw = self.q[5]
+        cos_yaw, sin_yaw = math.cos(yaw), math.sin(yaw)
+
+        # Body to world frame, yaw only
+        self.qd[0] = cos_yaw * vx - sin_yaw * vy
+        self.qd[1] = sin_yaw * vx + cos_yaw * vy
+        self.qd[5] = vrz
+        self.q[0] += self.qd[0] * dt
+        self.q[1] += self.qd[1] * dt
+        self.q[5] = math.remainder(yaw + vrz * dt, 2 * math.pi)
+
+    def set_command(self, mode, vx=0.0, vy=0.0, vrz=0.0, h=None):
+        self.update()
+        self.mode = mode
+        self.command = (float(vx), float(vy), float(vrz))
+        if h is not None:
+            self.q[2] = h
+        self.command_count += 1
+
+    def get_tlm_data(self):
+        self.update()
+        return {"q": self.q.copy(), "qd": self.qd.copy(), "mode": self.mode}
+
+robot = FakeRobot()
+
+def walk_idqp(h=STAND_HEIGHT, vx=0, vy=0, vrz=0):
+    robot.set_command("walk", vx, vy, vrz, h)
+
+def stand_idqp(h=STAND_HEIGHT, rx=0, ry=0, rz=0):
+    # Body roll and pitch offsets, yaw is kept
+    robot.set_command("stand", h=h)
+    robot.q[3:5] = (rx, ry)
+
+def bound(vx=0):
+    robot.set_command("bound", vx)
+
+def jump(x_vel=0, y_vel=0, z_vel=0):
+    robot.set_command("jump", x_vel, y_vel)
+
+def land():
+    robot.set_command("land")
+
+def soft_stop():
+    robot.set_command("soft_stop")
+
+def hard_stop():
+    robot.set_command("hard_stop")
+
+def get_tlm_data():
+    return robot.get_tlm_data()
@@ -0,0 +1,40 @@
+from time import perf_counter
+import numpy as np
+import ct_math.ct_math as ctm
+
+class Telemetry():
+    """
+    One get_tlm_data reading of the robot base
+
+    orientation is a [qx, qy, qz, qw] quaternion, position [x, y, z]. The twist comes from qd and
+    is None if the controller does not report it. timestamp is the perf_counter time of the fetch,
+    request_time the time get_tlm_data was called; a reading reflects commands sent before it.
+    """
+    __slots__ = ("timestamp", "request_time", "orientation", "position", "linear_velocity", "angular_velocity",
+                 "tlm_data")
+
+    def __init__(self, tlm_data, timestamp=None, request_time=None):
+        self.timestamp = perf_counter() if timestamp is None else timestamp
+        self.request_time = self.timestamp if request_time is None else request_time
+        self.tlm_data = tlm_data
+
+        # First robot if the controller reports several
+        if isinstance(tlm_data, list):
+            tlm_data = tlm_data[0]
+
+        q = tlm_data["q"]
+        r_roll, r_pitch, r_yaw = q[3:6]
+        self.orientation = ctm.eular_to_quat(r_roll, r_pitch, r_yaw)
+        self.position = np.asarray(q[:3], dtype=np.float64)
+
+        qd = tlm_data.get("qd")
+        if qd is None:
+            self.linear_velocity = None
+            self.angular_velocity = None
+        else:
+            self.linear_velocity = np.asarray(qd[0:3], dtype=np.float64)
+            self.angular_velocity = np.asarray(qd[3:6], dtype=np.float64)
+
+    def get_age(self):
+        """Seconds since the reading was fetched"""
+        return perf_counter() - self.timestamp
@@ -0,0 +1,8 @@
+from mode.pipeline import run_pipeline, SOURCE_RIGID_BODIES
+from streaming.offline_source import OfflineFrameSource
+
+def run_offline_mode(args, trace=None):
+    """Replay a take through the teleop pipeline, returns the LatencyTrace"""
+    source = OfflineFrameSource(args.input_file, SOURCE_RIGID_BODIES, overrun_policy=args.overrun_policy,
+                                busy_wait=args.busy_wait_us * 1e-6, no_sleep=args.no_sleep)
+    return run_pipeline(args, source, trace)
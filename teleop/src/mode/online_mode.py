@@ -1,59 +1,58 @@
-from NatNet.natnet_client import NatNetClient
+import os
+import sys
+from ct_io.io_parser import IOParser
+from mode.pipeline import run_pipeline, SOURCE_RIGID_BODIES
+from streaming.natnet_source import NatNetFrameSource
 
-def receive_new_frame(data_dict):
-    order_list = ["frameNumber", "markerSetCount", "unlabeledMarkersCount", #type: ignore  # noqa F841
-                  "rigidBodyCount", "skeletonCount", "labeledMarkerCount",
-                  "timecode", "timecodeSub", "timestamp", "isRecording",
-                  "trackedModelsChanged"]
-    dump_args = False
-    if dump_args is True:
-        out_string = "    "
-        for key in data_dict:
-            out_string += key + "= "
-            if key in data_dict:
-                out_string += data_dict[key] + " "
-            out_string += "/"
-        print(out_string)
+# The NatNet client modules import each other by file name
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../NatNet"))
+from natnet_client import NatNetClient, DECODE_RIGID_BODIES
+from packet_capture import PacketReplay
 
+def run_online_mode(args, trace=None):
+    """Drive the robot from the live NatNet stream until it stops or Ctrl-C, returns the LatencyTrace"""
+    natnet_config = IOParser.parse_natnet_config()
 
-def receive_new_frame_with_data(data_dict):
-    order_list = ["frameNumber", "markerSetCount", "unlabeledMarkersCount", #type: ignore  # noqa F841
-                  "rigidBodyCount", "skeletonCount", "labeledMarkerCount",
-                  "timecode", "timecodeSub", "timestamp", "isRecording",
-                  "trackedModelsChanged", "offset", "mocap_data"]
-    dump_args = True
-    if dump_args is True:
-        out_string = "    "
-        for key in data_dict:
-            out_string += key + "= "
-            if key in data_dict:
-                out_string += str(data_dict[key]) + " "
-            out_string += "/"
-        print(out_string)
+    # key: teleop rigid body name, value: NatNet streaming ID
+    rigid_body_ids = {body: natnet_config['rigid_bodies'][motive_name] for body, motive_name in SOURCE_RIGID_BODIES.items()}
 
-
-# This is a callback function that gets connected to the NatNet client.
-# It is called once per rigid body per frame.
-def receive_rigid_body_frame(new_id, position, rotation):
-    pass
-    # print("Received frame for rigid body", new_id)
-    # print("Received frame for rigid body", new_id," ",position," ",rotation)
-
-
-def main():
     natnet_client = NatNetClient()
-
-    natnet_client.new_frame_listener = receive_new_frame
-    natnet_client.rigid_body_listener = receive_rigid_body_frame
-
-    print("NatNet Python Client 4.3\n")
-    is_running = natnet_client.run('d')
-
-    if not is_running:
-        print("ERROR: Could not start streaming client.")
-        try:
+    # Frames are consumed from the frame buffer, no per frame printing on the receive thread
+    natnet_client.set_print_level(0)
+    # Only the followed rigid bodies are decoded, the other frame sections are skipped
+    natnet_client.set_decode_mask(DECODE_RIGID_BODIES)
+    natnet_client.set_rigid_body_filter(rigid_body_ids.values())
+
+    replay = None
+    if args.natnet_replay:
+        # The capture is fed through the decoder, no sockets are opened
+        print(f"Replaying NatNet capture {args.natnet_replay}\n")
+        replay = PacketReplay(natnet_client, args.natnet_replay, args.replay_speed)
+        replay.start()
+    else:
+        # Capture from before connecting, the server info reply sets the decoder's version on replay
+        if args.natnet_capture:
+            natnet_client.start_capture(args.natnet_capture)
+        print("NatNet Python Client 4.3\n")
+        if not natnet_client.run('d'):
+            print("ERROR: Could not start streaming client.")
+            natnet_client.stop_capture()
             sys.exit(1)
-        except SystemExit:
-            print("...")
-        finally:
-            print("exiting")
+
+    source = NatNetFrameSource(natnet_client, rigid_body_ids, position_scale=natnet_config['position_scale'],
+                               timeout=natnet_config['stream_timeout'])
+    try:
+        return run_pipeline(args, source, trace)
+    except KeyboardInterrupt:
+        # Stopped before the control loop started, run_pipeline handles Ctrl-C inside it
+        print("\nStopped")
+        return trace
+    finally:
+        if replay is not None:
+            replay.stop()
+        else:
+            capture_stats = natnet_client.stop_capture()
+            natnet_client.shutdown()
+            if capture_stats is not None:
+                print(f"Captured {capture_stats['packet_count']} NatNet packets to {capture_stats['path']}, "
+                      f"{capture_stats['dropped_count']} dropped")
@@ -0,0 +1,205 @@
+from collections import deque
+from time import sleep, perf_counter
+from ct_io.io_parser import IOParser
+from ct_io.performance_metrics import PerformanceMetrics
+from ct_io.latency_trace import LatencyTrace
+from ct_math.command_shaper import CommandShaper
+from pose.pose import Pose
+from pose.twist import Twist
+from ctrl_interface.ctrl_interface import CtrlInterface
+import ct_math.ct_math as ctm
+
+# key: rigid body name used by teleop, value: rigid body name in Motive
+SOURCE_RIGID_BODIES = {"LFoot": "LFoot", "RFoot": "RFoot", "Root": "Waist"}
+
+# Per frame stages timed by LatencyTrace. A tick starts when its frame was received. decode ends
+# when the frame is in the frame buffer, velocity when the loop picked it up and has its
+# velocities, command when the walk command was posted (or sent, without the dispatcher). send
+# ends when the controller took the command, ack with the first telemetry reading requested after
+# that. The total is socket receive to the robot's acknowledgement.
+PIPELINE_STAGES = ("decode", "velocity", "telemetry", "transform", "metrics", "shape", "command", "send", "ack")
+PIPELINE_SPANS = {"to_send": ("decode", "send")}
+# Not in the total: Motive's mid-exposure to transmit latency, the network delay above the fastest
+# frame (Motive and this machine don't share a clock) and frame arrival against the Motive
+# timestamps
+PIPELINE_EXTRAS = ("motive", "network", "jitter")
+
+def new_latency_trace(capacity=1 << 16):
+    return LatencyTrace(PIPELINE_STAGES, capacity, extras=PIPELINE_EXTRAS, spans=PIPELINE_SPANS)
+
+def settle_commands(trace, commands, telemetry, dispatcher=None):
+    """
+    Charge the send and ack stages of earlier ticks' commands, returns the frame timestep of the
+    newest command the telemetry reflects (None if it acknowledges none)
+
+    commands holds [tick, frame timestep, command time, dispatcher sequence, send time] of the
+    commands not acknowledged yet, oldest first. A command is acknowledged by the first telemetry
+    reading requested after it was sent; one the dispatcher replaced before sending is never sent.
+    """
+    acknowledged_timestep = None
+    while commands:
+        tick, timestep, command_time, sequence, send_time = commands[0]
+        if send_time is None:
+            if dispatcher.was_dropped(sequence):
+                commands.popleft()
+                continue
+            send_time = dispatcher.get_send_time(sequence)
+            if send_time is None:
+                break
+            trace.add("send", send_time - command_time, tick)
+            commands[0][4] = send_time
+        if telemetry.request_time < send_time:
+            break
+        trace.add("ack", telemetry.timestamp - send_time, tick)
+        acknowledged_timestep = timestep
+        commands.popleft()
+    return acknowledged_timestep
+
+def run_pipeline(args, source, trace=None):
+    """
+    Drive the robot from a FrameSource until the stream ends or Ctrl-C, returns the LatencyTrace
+    (pass one in to accumulate over several runs)
+
+    Per frame: source velocities -> robot frame -> metrics -> command shaping -> walk.
+    """
+    if trace is None:
+        trace = new_latency_trace()
+
+    source.open()
+    for stage, seconds in source.setup_times.items():
+        trace.record(stage, seconds)
+
+    # key: rigid body name, value: Pose at current timestep
+    source_curr_pose = {}
+    source_prev_pose = {}
+
+    target_pose = {}
+
+    # key: rigid body name, value: twist at current timestep
+    source_twist = {}
+    target_twist = {}
+
+    # Make the robot stand and wait a second to give it time
+    CtrlInterface.stand(0, 0, 0)
+    if not args.no_sleep:
+        sleep(2)
+
+    telemetry = CtrlInterface.get_telemetry()
+    target_pose["Robot"] = Pose(0, *telemetry.orientation, *telemetry.position)
+
+    # Keep walk commands inside the controller limits, owed distance is carried to later ticks
+    shaper = None
+    if not args.no_shaping:
+        shaper = CommandShaper.from_config(IOParser.parse_controller_config(args.controller_config)['limits'])
+
+    frame = source.next_frame()
+    if frame is None:
+        CtrlInterface.hard_stop()
+        source.close()
+        source.print_summary()
+        return trace
+
+    for body_idx, body in enumerate(source.rigid_bodies):
+        source_prev_pose[body] = Pose.from_array(frame.timestep, frame.poses[body_idx])
+
+    performance_logger = PerformanceMetrics(source_prev_pose, target_pose, source_curr_pose,target_pose, source_twist, target_twist,
+                                            log_format=args.log_format, latency_trace=trace)
+
+    dispatcher = None
+    if args.command_dispatch == "async":
+        dispatcher = CtrlInterface.start_dispatcher()
+
+    # Timestep of the frame the last command was computed from
+    command_timestep = frame.timestep
+    # Timestep of the frame whose command the robot telemetry reflects. The prefetch can read
+    # telemetry before the dispatcher sends the tick's command, so it follows the acknowledgements
+    telemetry_timestep = frame.timestep
+    # Commands waiting for the robot's acknowledgement, see settle_commands
+    commands = deque()
+    previous_frame = frame
+    # Smallest receive - transmit time seen, the network delay of the fastest frame
+    network_base = float("inf")
+
+    try:
+        while True:
+            frame = source.next_frame()
+            if frame is None:
+                break
+
+            tick = trace.begin(frame.receive_time)
+            if frame.decode_time is not None:
+                trace.mark("decode", frame.decode_time)
+            curr_timestep = frame.timestep
+
+            # Update current pose and velocities with this frame's data
+            for body_idx, body in enumerate(source.rigid_bodies):
+                source_curr_pose[body] = Pose.from_array(curr_timestep, frame.poses[body_idx])
+                source_twist[body] = Twist(curr_timestep, frame.linear_velocities[body_idx],
+                                           frame.angular_velocities[body_idx])
+            trace.mark("velocity")
+
+            if frame.motive_latency is not None:
+                trace.set("motive", frame.motive_latency)
+            if frame.transmit_time is not None:
+                network_base = min(network_base, frame.receive_time - frame.transmit_time)
+                trace.set("network", frame.receive_time - frame.transmit_time - network_base)
+            if not args.no_sleep:
+                trace.set("jitter", (frame.receive_time - previous_frame.receive_time) - (curr_timestep - previous_frame.timestep))
+            previous_frame = frame
+
+            # One telemetry snapshot per tick, prefetched after the previous command was sent
+            telemetry = CtrlInterface.get_telemetry()
+            acknowledged_timestep = settle_commands(trace, commands, telemetry, dispatcher)
+            if acknowledged_timestep is not None:
+                telemetry_timestep = acknowledged_timestep
+            target_pose["Robot"] = Pose(telemetry_timestep, *telemetry.orientation, *telemetry.position)
+            trace.mark("telemetry")
+
+            robot_lv, robot_av = ctm.transform_cordinate_frame(source_twist["Root"].linear_velocity, source_twist["Root"].angular_velocity, telemetry.orientation)
+
+            target_twist["Robot"] = Twist(curr_timestep, robot_lv, robot_av)
+            trace.mark("transform")
+
+            performance_logger.log_metrics()
+            if args.metrics_display == "dashboard":
+                performance_logger.print_dashboard()
+            elif args.metrics_display == "summary":
+                performance_logger.print_metric_summary()
+            trace.mark("metrics")
+
+            robot_vx, robot_vy, robot_vrz = (target_twist["Robot"].linear_velocity[0], target_twist["Robot"].linear_velocity[1],
+                                             target_twist["Robot"].angular_velocity[2])
+            if shaper is not None:
+                robot_vx, robot_vy, robot_vrz = shaper.shape(robot_vx, robot_vy, robot_vrz, curr_timestep - command_timestep)
+            trace.mark("shape")
+
+            sequence = CtrlInterface.walk(robot_vx, robot_vy, robot_vrz)
+            command_time = perf_counter()
+            trace.mark("command", command_time)
+            # A synchronous walk has been sent when it returns
+            commands.append([tick, curr_timestep, command_time, sequence, command_time if sequence is None else None])
+
+            # Read the robot's response while waiting for the next frame, without a wait the
+            # hand-off to the prefetch thread is pure overhead
+            if not args.no_sleep:
+                CtrlInterface.prefetch_telemetry()
+            command_timestep = curr_timestep
+    except KeyboardInterrupt:
+        # A live stream never ends, Ctrl-C is the normal way out, report like the end of a stream
+        print("\nStopped")
+    finally:
+        # Stop the robot whatever ended the loop
+        trace.end()
+        CtrlInterface.hard_stop()
+        CtrlInterface.stop_dispatcher()
+        performance_logger.close()
+        source.close()
+
+    source.print_summary()
+    trace.print_summary()
+    if shaper is not None:
+        shaper.print_summary()
+    if dispatcher is not None:
+        dispatcher.print_summary()
+
+    return trace
@@ -1,12 +1,91 @@
+import numpy as np
+
 class Pose():
+    """
+    Rigid body pose backed by one contiguous [qx, qy, qz, qw, px, py, pz] array
+
+    The named attributes read and write the array, orientation and position are views into it.
+    """
+    __slots__ = ("timestep", "data")
+
     def __init__(self, timestep = None, orientationX = None, orientationY = None, orientationZ = None,
                  orientationW = None, positionX = None, positionY = None, positionZ = None):
         self.timestep = timestep
-        self.orientationX = orientationX
-        self.orientationY = orientationY
-        self.orientationZ = orientationZ
-        self.orientationW = orientationW
-
-        self.positionX = positionX
-        self.positionY = positionY
-        self.positionZ = positionZ
+
+        # Missing values are stored as NaN
+        self.data = np.array((orientationX, orientationY, orientationZ, orientationW,
+                              positionX, positionY, positionZ), dtype=np.float64)
+
+    @classmethod
+    def from_array(cls, timestep, pose):
+        """Wrap a (7,) [qx, qy, qz, qw, px, py, pz] array without copying it"""
+        obj = cls.__new__(cls)
+        obj.timestep = timestep
+        obj.data = pose
+        return obj
+
+    @property
+    def orientation(self):
+        """Quaternion view [qx, qy, qz, qw]"""
+        return self.data[0:4]
+
+    @property
+    def position(self):
+        """Position view [px, py, pz]"""
+        return self.data[4:7]
+
+    @property
+    def orientationX(self):
+        return self.data[0]
+
+    @orientationX.setter
+    def orientationX(self, value):
+        self.data[0] = value
+
+    @property
+    def orientationY(self):
+        return self.data[1]
+
+    @orientationY.setter
+    def orientationY(self, value):
+        self.data[1] = value
+
+    @property
+    def orientationZ(self):
+        return self.data[2]
+
+    @orientationZ.setter
+    def orientationZ(self, value):
+        self.data[2] = value
+
+    @property
+    def orientationW(self):
+        return self.data[3]
+
+    @orientationW.setter
+    def orientationW(self, value):
+        self.data[3] = value
+
+    @property
+    def positionX(self):
+        return self.data[4]
+
+    @positionX.setter
+    def positionX(self, value):
+        self.data[4] = value
+
+    @property
+    def positionY(self):
+        return self.data[5]
+
+    @positionY.setter
+    def positionY(self, value):
+        self.data[5] = value
+
+    @property
+    def positionZ(self):
+        return self.data[6]
+
+    @positionZ.setter
+    def positionZ(self, value):
+        self.data[6] = value
@@ -1,5 +1,7 @@
 class Twist():
+    __slots__ = ("timestep", "linear_velocity", "angular_velocity")
+
     def __init__(self, timestep = None, linear_velocity = None, angular_velocity = None):
         self.timestep = timestep
         self.linear_velocity = linear_velocity
-        self.angular_velocity = angular_velocity
\ No newline at end of file
+        self.angular_velocity = angular_velocity
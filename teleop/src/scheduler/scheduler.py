@@ -0,0 +1,154 @@
+from bisect import bisect_right
+from time import sleep, perf_counter
+import numpy as np
+
+# Upper bin edges of the jitter and overrun histograms in microseconds, the last bin is open
+HISTOGRAM_EDGES_US = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+OVERRUN_POLICIES = ("skip", "catch_up", "degrade")
+
+class Scheduler():
+    """
+    Fixed rate tick scheduler with absolute deadlines
+
+    Tick k is due at start_time + k * period, so sleep error never accumulates. wait() blocks until
+    the next deadline and returns how many base periods the loop advanced, which the caller adds to
+    its frame index.
+
+    Overrun policies, applied when a tick's work ends after the next deadline:
+        skip      drop the missed ticks and run the latest due tick right away
+        catch_up  run every missed tick back to back without sleeping
+        degrade   halve the rate (up to max_divisor) and realign, restore it after
+                  recover_ticks ticks on time
+    """
+    def __init__(self, period, overrun_policy="skip", busy_wait=0.0, max_divisor=8, recover_ticks=240):
+        if period <= 0:
+            raise ValueError(f"Scheduler period must be positive, got {period}")
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy '{overrun_policy}', expected one of {OVERRUN_POLICIES}")
+
+        self.period = period
+        self.overrun_policy = overrun_policy
+        # Spin instead of sleeping for the last busy_wait seconds before a deadline
+        self.busy_wait = busy_wait
+        self.max_divisor = max_divisor
+        self.recover_ticks = recover_ticks
+
+        self.start_time = None
+        # Base tick index of the current deadline
+        self.tick = 0
+        # Current rate is 1 / (period * divisor), only changed by the degrade policy
+        self.divisor = 1
+        self.on_time_streak = 0
+
+        self.tick_count = 0
+        self.overrun_count = 0
+        self.skipped_tick_count = 0
+        self.degrade_count = 0
+        self.max_jitter = 0.0
+        self.total_jitter = 0.0
+        self.max_overrun = 0.0
+        self.jitter_histogram = np.zeros(len(HISTOGRAM_EDGES_US) + 1, dtype=np.int64)
+        self.overrun_histogram = np.zeros(len(HISTOGRAM_EDGES_US) + 1, dtype=np.int64)
+
+    def start(self, start_time=None):
+        """Set tick 0 to now (or start_time)"""
+        self.start_time = perf_counter() if start_time is None else start_time
+        self.tick = 0
+        self.divisor = 1
+        self.on_time_streak = 0
+
+    def deadline(self, tick):
+        return self.start_time + tick * self.period
+
+    def wait(self):
+        """Block until the next tick is due, returns the number of base periods advanced"""
+        if self.start_time is None:
+            self.start()
+
+        next_tick = self.tick + self.divisor
+        now = perf_counter()
+        lateness = now - self.deadline(next_tick)
+
+        if lateness > 0:
+            self._record_overrun(lateness)
+            if self.overrun_policy == "catch_up":
+                # Keep the schedule, this tick just starts late
+                pass
+            else:
+                # Jump to the latest tick that is already due, on the grid of the rate that overran
+                due_tick = int((now - self.start_time) / self.period)
+                due_tick -= (due_tick - self.tick) % self.divisor
+                self.skipped_tick_count += max((due_tick - self.tick) // self.divisor - 1, 0)
+                next_tick = max(next_tick, due_tick)
+
+                if self.overrun_policy == "degrade" and self.divisor < self.max_divisor:
+                    self.divisor = min(self.divisor * 2, self.max_divisor)
+                    self.degrade_count += 1
+                    # Realign on the reduced rate's grid from the current tick, waiting if that tick isn't due yet
+                    next_tick = self.tick - (self.tick - next_tick) // self.divisor * self.divisor
+                    self._sleep_until(self.deadline(next_tick))
+        else:
+            self._sleep_until(self.deadline(next_tick))
+            self._record_jitter(perf_counter() - self.deadline(next_tick))
+
+            if self.divisor > 1:
+                self.on_time_streak += 1
+                if self.on_time_streak >= self.recover_ticks:
+                    self.divisor //= 2
+                    self.on_time_streak = 0
+
+        elapsed_ticks = next_tick - self.tick
+        self.tick = next_tick
+        self.tick_count += 1
+        return elapsed_ticks
+
+    def _sleep_until(self, deadline):
+        remaining = deadline - perf_counter() - self.busy_wait
+        if remaining > 0:
+            sleep(remaining)
+        while perf_counter() < deadline:
+            pass
+
+    def _record_jitter(self, jitter):
+        self.total_jitter += jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        self.jitter_histogram[bisect_right(HISTOGRAM_EDGES_US, jitter * 1e6)] += 1
+
+    def _record_overrun(self, lateness):
+        self.overrun_count += 1
+        self.on_time_streak = 0
+        self.max_overrun = max(self.max_overrun, lateness)
+        self.overrun_histogram[bisect_right(HISTOGRAM_EDGES_US, lateness * 1e6)] += 1
+
+    def get_stats(self):
+        on_time_count = self.tick_count - self.overrun_count
+        return {
+            "period": self.period,
+            "overrun_policy": self.overrun_policy,
+            "tick_count": self.tick_count,
+            "overrun_count": self.overrun_count,
+            "skipped_tick_count": self.skipped_tick_count,
+            "degrade_count": self.degrade_count,
+            "current_period": self.period * self.divisor,
+            "mean_jitter": self.total_jitter / on_time_count if on_time_count else 0.0,
+            "max_jitter": self.max_jitter,
+            "max_overrun": self.max_overrun,
+            "histogram_edges_us": HISTOGRAM_EDGES_US,
+            "jitter_histogram": self.jitter_histogram.tolist(),
+            "overrun_histogram": self.overrun_histogram.tolist(),
+        }
+
+    def print_summary(self):
+        stats = self.get_stats()
+        print("\n--------------------Scheduler--------------------")
+        print(f"Period: {stats['period'] * 1e3:.3f} ms, policy: {stats['overrun_policy']}")
+        print(f"Ticks: {stats['tick_count']}, overruns: {stats['overrun_count']}, "
+              f"skipped: {stats['skipped_tick_count']}, rate reductions: {stats['degrade_count']}")
+        print(f"Jitter mean: {stats['mean_jitter'] * 1e6:.1f} us, max: {stats['max_jitter'] * 1e6:.1f} us, "
+              f"max overrun: {stats['max_overrun'] * 1e6:.1f} us")
+
+        labels = [f"<{edge} us" for edge in HISTOGRAM_EDGES_US] + [f">={HISTOGRAM_EDGES_US[-1]} us"]
+        print(f"{'':>12}{'jitter':>10}{'overrun':>10}")
+        for label, jitter, overrun in zip(labels, stats["jitter_histogram"], stats["overrun_histogram"]):
+            print(f"{label:>12}{jitter:>10}{overrun:>10}")
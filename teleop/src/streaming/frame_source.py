@@ -0,0 +1,59 @@
+import numpy as np
+
+class Frame():
+    """
+    Source rigid body poses of one frame with the velocities since the previous frame
+
+    poses is (bodies, 7) [qx, qy, qz, qw, px, py, pz] in the robot frame, positions in mm;
+    linear_velocities (m/s) and angular_velocities (rad/s) are (bodies, 3). receive_time is the
+    perf_counter time the frame entered the process, the pipeline's latency is measured from it,
+    and decode_time the time it was decoded. Streamed frames also carry the server's latency from
+    mid-exposure to transmit and its transmit time in seconds of the server's clock. Times a
+    source doesn't know are None.
+    """
+    __slots__ = ("frame_number", "timestep", "poses", "linear_velocities", "angular_velocities", "receive_time",
+                 "decode_time", "motive_latency", "transmit_time")
+
+    def __init__(self, frame_number, timestep, poses, linear_velocities, angular_velocities, receive_time,
+                 decode_time=None, motive_latency=None, transmit_time=None):
+        self.frame_number = frame_number
+        self.timestep = timestep
+        self.poses = poses
+        self.linear_velocities = linear_velocities
+        self.angular_velocities = angular_velocities
+        self.receive_time = receive_time
+        self.decode_time = decode_time
+        self.motive_latency = motive_latency
+        self.transmit_time = transmit_time
+
+class FrameSource():
+    """
+    Where the teleop pipeline gets its frames from
+
+    open() does the slow setup (loading, connecting), next_frame() blocks until the next frame is
+    due and returns it, or None once the stream has ended. The first frame has zero velocities.
+    rigid_bodies lists the teleop names (e.g. "Root") in the order of the Frame arrays.
+    """
+    def __init__(self, rigid_bodies):
+        self.rigid_bodies = list(rigid_bodies)
+        # key: setup stage, value: seconds, filled by open()
+        self.setup_times = {}
+
+    def open(self):
+        pass
+
+    def next_frame(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def get_stats(self):
+        return {}
+
+    def print_summary(self):
+        pass
+
+def zero_velocities(n_bodies):
+    """(linear, angular) zero velocities of a first frame"""
+    return np.zeros((n_bodies, 3)), np.zeros((n_bodies, 3))
@@ -0,0 +1,136 @@
+import math
+import numpy as np
+from streaming.frame_source import Frame, FrameSource, zero_velocities
+import ct_math.ct_math as ctm
+
+class NatNetFrameSource(FrameSource):
+    """
+    Latest rigid body frames of a running NatNetClient
+
+    next_frame() sleeps until the client publishes a frame newer than the last one returned and
+    returns the newest. Frames superseded in the meantime are counted as skipped, the pipeline
+    always works on the latest pose. A frame whose frame number isn't newer than the last one used
+    arrived out of order; it is counted as reordered and never used. A rigid body that is not tracked in a frame keeps its previous
+    pose; frames are only returned once every rigid body has been seen. Streamed poses get the same
+    coordinate transformation and units as the recorded takes.
+    """
+    def __init__(self, client, rigid_body_ids, position_scale=1000.0, timeout=1.0):
+        # key: teleop rigid body name, value: NatNet streaming ID
+        super().__init__(rigid_body_ids.keys())
+        self.client = client
+        self.ids = np.array(list(rigid_body_ids.values()), dtype=np.int32)
+        self.position_scale = position_scale
+        self.timeout = timeout
+
+        columns = [f"{name}:{pose_type}:{axis}" for name in self.rigid_bodies for pose_type, axis in ctm.POSE_COLUMNS]
+        self.permutation, self.signs = ctm.coordinate_transform_indices(columns)
+
+        # Untransformed poses of the latest frame, NaN until the body was first tracked
+        self.raw_poses = np.full((len(self.rigid_bodies), 7), np.nan)
+        self.previous_poses = None
+        self.previous_timestep = None
+        self.previous_velocities = zero_velocities(len(self.rigid_bodies))
+        # FrameBuffer sequence of the latest frame read
+        self.sequence = -1
+        # NatNet frame number of the latest frame used, and the buffer's restart count it belongs to
+        self.frame_number = None
+        self.restart_count = 0
+
+        self.frame_count = 0
+        self.skipped_frame_count = 0
+        self.reordered_frame_count = 0
+        self.missing_body_count = 0
+        self.timed_out = False
+
+    def next_frame(self):
+        frame_buffer = self.client.frame_buffer
+        while True:
+            if not frame_buffer.wait_for_frame(self.sequence, self.timeout):
+                self.timed_out = True
+                return None
+
+            rigid_body_frame = frame_buffer.get_latest()
+            if rigid_body_frame is None or rigid_body_frame.sequence <= self.sequence:
+                continue
+            if self.sequence >= 0:
+                self.skipped_frame_count += rigid_body_frame.sequence - self.sequence - 1
+            self.sequence = rigid_body_frame.sequence
+
+            # The server's frame numbers started over, the last one used is meaningless
+            if frame_buffer.restart_count != self.restart_count:
+                self.restart_count = frame_buffer.restart_count
+                self.frame_number = None
+            if self.frame_number is not None and rigid_body_frame.frame_number <= self.frame_number:
+                self.reordered_frame_count += 1
+                continue
+
+            if self._update_poses(rigid_body_frame):
+                break
+
+        poses = (self.raw_poses.reshape(-1)[self.permutation] * self.signs).reshape(self.raw_poses.shape)
+        timestep = rigid_body_frame.timestamp
+
+        if self.previous_poses is None:
+            linear_velocities, angular_velocities = zero_velocities(len(self.rigid_bodies))
+        elif timestep > self.previous_timestep:
+            linear_velocities, angular_velocities = ctm.batch_velocities(np.stack((self.previous_poses, poses)),
+                                                                         np.array((self.previous_timestep, timestep)))
+            linear_velocities, angular_velocities = linear_velocities[0], angular_velocities[0]
+        else:
+            # Same capture time as the previous frame, nothing to differentiate
+            linear_velocities, angular_velocities = self.previous_velocities
+
+        self.previous_poses = poses
+        self.previous_timestep = timestep
+        self.previous_velocities = (linear_velocities, angular_velocities)
+        self.frame_number = rigid_body_frame.frame_number
+        self.frame_count += 1
+
+        # NaN when the server doesn't stamp its frames
+        motive_latency = rigid_body_frame.motive_latency
+        transmit_time = rigid_body_frame.transmit_time
+        return Frame(rigid_body_frame.frame_number, timestep, poses, linear_velocities, angular_velocities,
+                     rigid_body_frame.receive_time, rigid_body_frame.decode_time,
+                     None if math.isnan(motive_latency) else motive_latency,
+                     None if math.isnan(transmit_time) else transmit_time)
+
+    def _update_poses(self, rigid_body_frame):
+        """Copy the tracked bodies of a frame into raw_poses, False if the frame was overwritten
+        while reading or a body has never been tracked"""
+        ids = rigid_body_frame.ids
+        tracking_valid = rigid_body_frame.tracking_valid
+        for body_idx, rigid_body_id in enumerate(self.ids):
+            hits = np.flatnonzero((ids == rigid_body_id) & tracking_valid)
+            if len(hits) == 0:
+                self.missing_body_count += 1
+                continue
+            self.raw_poses[body_idx, 0:4] = rigid_body_frame.orientations[hits[0]]
+            self.raw_poses[body_idx, 4:7] = rigid_body_frame.positions[hits[0]] * self.position_scale
+
+        # The receive thread may have wrapped onto the slot while we copied it
+        if not rigid_body_frame.is_current():
+            return False
+        return not np.isnan(self.raw_poses).any()
+
+    def get_stats(self):
+        stats = {
+            'used_frame_count': self.frame_count,
+            'skipped_frame_count': self.skipped_frame_count,
+            'out_of_order_frame_count': self.reordered_frame_count,
+            'missing_body_count': self.missing_body_count,
+            'timed_out': self.timed_out,
+        }
+        stats.update(self.client.frame_buffer.get_stats())
+        stats.update(self.client.get_receive_stats())
+        return stats
+
+    def print_summary(self):
+        stats = self.get_stats()
+        print("\n--------------------NatNet---------------------")
+        print(f"Frames received: {stats['frame_count']}, used: {stats['used_frame_count']}, skipped (newer frame waiting): {stats['skipped_frame_count']}")
+        print(f"Dropped in the stream: {stats['dropped_frame_count']}, out of order: {stats['reordered_frame_count'] + stats['out_of_order_frame_count']}, "
+              f"untracked rigid body readings: {stats['missing_body_count']}")
+        print(f"Packets received: {stats['packet_count']} in {stats['batch_count']} batches (max {stats['max_batch']}), "
+              f"dropped by the kernel: {stats['kernel_drop_count']}, receive buffer: {stats['receive_buffer_size'] // 1024} KiB")
+        if self.timed_out:
+            print(f"Stream stopped: no frame for {self.timeout} s")
@@ -0,0 +1,68 @@
+from time import perf_counter
+import numpy as np
+from ct_io.trajectory_io import load_transformed_trajectory
+from scheduler.scheduler import Scheduler
+from streaming.frame_source import Frame, FrameSource, zero_velocities
+import ct_math.ct_math as ctm
+
+class OfflineFrameSource(FrameSource):
+    """
+    Replays a recorded take at its capture rate
+
+    Every pose and velocity is precomputed by open(), so next_frame() only waits for the frame's
+    deadline and indexes arrays. Frame k is due k periods after the first frame; frames the loop
+    was too slow for are handled by the scheduler's overrun policy. With no_sleep frames are
+    returned back to back.
+    """
+    def __init__(self, input_file, rigid_bodies, overrun_policy="skip", busy_wait=0.0, no_sleep=False):
+        # key: teleop rigid body name, value: rigid body name in the take
+        super().__init__(rigid_bodies.keys())
+        self.take_rigid_bodies = list(rigid_bodies.values())
+        self.input_file = input_file
+        self.overrun_policy = overrun_policy
+        self.busy_wait = busy_wait
+        self.no_sleep = no_sleep
+
+        self.frame = -1
+        self.scheduler = None
+
+    def open(self):
+        start_time = perf_counter()
+        df = load_transformed_trajectory(self.input_file)
+        self.setup_times["parse"] = perf_counter() - start_time
+
+        start_time = perf_counter()
+        self.timesteps = df["Time (Seconds)"].to_numpy(dtype=float)
+        self.poses = ctm.pose_array(df, self.take_rigid_bodies)
+        self.linear_velocities, self.angular_velocities = ctm.batch_velocities(self.poses, self.timesteps)
+        self.setup_times["velocity"] = perf_counter() - start_time
+
+        # Motive exports at a fixed rate
+        self.scheduler = Scheduler(float(np.median(np.diff(self.timesteps))), overrun_policy=self.overrun_policy,
+                                   busy_wait=self.busy_wait)
+
+    def next_frame(self):
+        if self.frame < 0:
+            self.frame = 0
+            linear_velocities, angular_velocities = zero_velocities(len(self.rigid_bodies))
+            return Frame(0, self.timesteps[0], self.poses[0], linear_velocities, angular_velocities, perf_counter())
+
+        # Frame 1 is due one period after the caller first asks for it
+        if self.scheduler.start_time is None:
+            self.scheduler.start()
+
+        # Skipped frames are still valid, the velocities were precomputed per frame
+        self.frame += 1 if self.no_sleep else self.scheduler.wait()
+        if self.frame >= len(self.timesteps):
+            return None
+
+        frame = self.frame
+        return Frame(frame, self.timesteps[frame], self.poses[frame], self.linear_velocities[frame - 1],
+                     self.angular_velocities[frame - 1], perf_counter())
+
+    def get_stats(self):
+        return self.scheduler.get_stats() if self.scheduler is not None else {}
+
+    def print_summary(self):
+        if self.scheduler is not None and not self.no_sleep:
+            self.scheduler.print_summary()
@@ -1,108 +1,10 @@
 import os
 import sys
-import copy
-from time import sleep, perf_counter
-import pandas as pd
 from ct_io.io_parser import IOParser
-from ct_io.performance_metrics import PerformanceMetrics
-from pose.pose import Pose
-from pose.twist import Twist
+from ct_io.trajectory_io import TRAJECTORY_EXTENSIONS
 from ctrl_interface.ctrl_interface import CtrlInterface
-import ct_math.ct_math as ctm
-
-def run_offline_mode(args):
-        df = pd.read_csv(args.input_file)
-        df = ctm.apply_coordinate_transformation(df)
-
-        # key: rigid body name, value: Pose at current timestep
-        source_curr_pose = {}
-        source_prev_pose = {}
-
-        target_pose = {}
-
-        # key: rigid body name, value: twist at current timestep
-        source_twist = {}
-        target_twist = {}
-
-        # Make the robot stand and wait a second to give it time
-        CtrlInterface.stand(0, 0, 0)
-        sleep(2)
-
-        robot_orientation = CtrlInterface.get_robot_orientation()
-        robot_position = CtrlInterface.get_robot_position()
-
-        target_pose["Robot"] = Pose(0, robot_orientation[0], robot_orientation[1], 
-                            robot_orientation[2], robot_orientation[3], 
-                            robot_position[0], robot_position[1], robot_position[2])
-
-        # At frame 0  (timesep 0)
-        prev_timestep = df.at[(0, "Time (Seconds)")]
-        source_prev_pose["LFoot"] = Pose(df.at[(0, "Time (Seconds)")], df.at[(0, "LFoot:Rotation:X")], df.at[(0, "LFoot:Rotation:Y")], df.at[(0, "LFoot:Rotation:Z")],
-                                df.at[(0, "LFoot:Rotation:W")], df.at[(0, "LFoot:Position:X")], df.at[(0, "LFoot:Position:Y")], df.at[(0, "LFoot:Position:Z")])
-        source_prev_pose["RFoot"] = Pose(df.at[(0, "Time (Seconds)")], df.at[(0, "RFoot:Rotation:X")], df.at[(0, "RFoot:Rotation:Y")], df.at[(0, "RFoot:Rotation:Z")],
-                                df.at[(0, "RFoot:Rotation:W")], df.at[(0, "RFoot:Position:X")], df.at[(0, "RFoot:Position:Y")], df.at[(0, "RFoot:Position:Z")])
-        source_prev_pose["Root"] = Pose(df.at[(0, "Time (Seconds)")], df.at[(0, "Waist:Rotation:X")], df.at[(0, "Waist:Rotation:Y")], df.at[(0, "Waist:Rotation:Z")],
-                                df.at[(0, "Waist:Rotation:W")], df.at[(0, "Waist:Position:X")], df.at[(0, "Waist:Position:Y")], df.at[(0, "Waist:Position:Z")])
-        
-        performance_logger = PerformanceMetrics(source_prev_pose, target_pose, source_curr_pose,target_pose, source_twist, target_twist)
-
-        for index, row in df.iloc[1:].iterrows(): # At frame 1 (timestep ~0.05)
-
-            start_time = perf_counter()
-            curr_timestep = row["Time (Seconds)"]
-
-            # Update current pose with this frame's data
-            source_curr_pose["LFoot"] = Pose(row["Time (Seconds)"], row["LFoot:Rotation:X"], row["LFoot:Rotation:Y"], row["LFoot:Rotation:Z"], row["LFoot:Rotation:W"], 
-                                    row["LFoot:Position:X"], row["LFoot:Position:Y"], row["LFoot:Position:Z"])
-            source_curr_pose["RFoot"] = Pose(row["Time (Seconds)"], row["RFoot:Rotation:X"], row["RFoot:Rotation:Y"], row["RFoot:Rotation:Z"], row["RFoot:Rotation:W"], 
-                                    row["RFoot:Position:X"], row["RFoot:Position:Y"], row["RFoot:Position:Z"])
-            source_curr_pose["Root"] = Pose(row["Time (Seconds)"], row["Waist:Rotation:X"], row["Waist:Rotation:Y"], row["Waist:Rotation:Z"], row["Waist:Rotation:W"], 
-                                    row["Waist:Position:X"], row["Waist:Position:Y"], row["Waist:Position:Z"])
-            
-            
-            # Calculate velocities
-            dt = curr_timestep - prev_timestep
-            source_twist["LFoot"] = Twist(source_curr_pose["LFoot"].timestep, ctm.linear_velocity(source_curr_pose["LFoot"], source_prev_pose["LFoot"], dt),
-                                          ctm.angular_velocity(source_curr_pose["LFoot"], source_prev_pose["LFoot"], dt))
-            source_twist["RFoot"] = Twist(source_curr_pose["RFoot"].timestep, ctm.linear_velocity(source_curr_pose["RFoot"], source_prev_pose["LFoot"], dt),
-                                          ctm.angular_velocity(source_curr_pose["RFoot"], source_prev_pose["RFoot"], dt))
-            source_twist["Root"] = Twist(source_curr_pose["Root"].timestep, ctm.linear_velocity(source_curr_pose["Root"], source_prev_pose["Root"], dt),
-                                          ctm.angular_velocity(source_curr_pose["Root"], source_prev_pose["Root"], dt))
-
-            robot_lv, robot_av = ctm.transform_cordinate_frame(source_twist["Root"].linear_velocity, source_twist["Root"].angular_velocity, robot_orientation)
-
-            target_twist["Robot"] = Twist(curr_timestep, robot_lv, robot_av)
-
-            performance_logger.log_metrics()
-            performance_logger.print_metric_summary()
-            
-            # If you need to scale the values change this variable
-            scale = 1.0
-            CtrlInterface.walk(scale * target_twist["Robot"].linear_velocity[0], 
-                               scale * target_twist["Robot"].linear_velocity[1], 
-                               scale * target_twist["Robot"].angular_velocity[2])
-            
-            robot_orientation = CtrlInterface.get_robot_orientation()
-            robot_position = CtrlInterface.get_robot_position()
-
-            target_pose["Robot"] = Pose(curr_timestep, robot_orientation[0], robot_orientation[1], 
-                                        robot_orientation[2], robot_orientation[3], 
-                                        robot_position[0], robot_position[1], robot_position[2])
-
-            # Sleep for the duration of the remaining time-step
-            end_time = perf_counter()
-            elapsed_time = end_time - start_time
-            sleep(dt - elapsed_time)
-
-            # Update timestep
-            prev_timestep = curr_timestep
-
-            # Update previous pose for next iteration
-            source_prev_pose["LFoot"] = copy.deepcopy(source_curr_pose["LFoot"])
-            source_prev_pose["RFoot"] = copy.deepcopy(source_curr_pose["RFoot"])
-            source_prev_pose["Root"] = copy.deepcopy(source_curr_pose["Root"])
-
-        CtrlInterface.hard_stop()
+from mode.offline_mode import run_offline_mode
+from mode.online_mode import run_online_mode
 
 def main():
     # Create arg parser and get cmd arguments
@@ -119,12 +21,12 @@ def main():
     if args.input_mode == 'offline' and not args.input_file:
         parser.error("--input_mode offline requires --input_file")
     
-    # Input file should be a valid CSV file for offline mode
+    # Input file should be a valid CSV or binary trajectory file for offline mode
     if args.input_file:
         if args.input_mode != 'offline':
             parser.error("--input_file can only be used with --input_mode offline")
-        if not args.input_file.endswith('.csv'):
-            parser.error("Input file must be a CSV file")
+        if not args.input_file.endswith(TRAJECTORY_EXTENSIONS):
+            parser.error("Input file must be a CSV or .npy trajectory file")
         if not os.path.exists(args.input_file):
             parser.error(f"Input file not found: {args.input_file}")
     
@@ -135,14 +37,21 @@ def main():
     # Online mode shouldn't have input_file
     if args.input_mode == 'online' and args.input_file:
         parser.error("--input_file cannot be used with --input_mode online")
+
+    # NatNet capture and replay are online mode options
+    if (args.natnet_capture or args.natnet_replay) and args.input_mode != 'online':
+        parser.error("--natnet_capture and --natnet_replay can only be used with --input_mode online")
+    if args.natnet_capture and args.natnet_replay:
+        parser.error("--natnet_capture cannot be used with --natnet_replay")
+    if args.natnet_replay and not os.path.exists(args.natnet_replay):
+        parser.error(f"Capture file not found: {args.natnet_replay}")
     
     # ------------------------------------ Arg Error handling ----------------------------------- #
 
     print("\n--------------------CrossTele--------------------")
     print(f"Running with input_mode={args.input_mode}, io_mode={args.io_mode}")
 
-    # parse controller command config
-    IOParser.parse_controller_config()
+    CtrlInterface.set_backend(args.ctrl_backend)
 
     if args.training:
         # Run in training mode
@@ -153,11 +62,8 @@ def main():
     elif args.input_mode == "offline" and args.io_mode == "hardware":
         pass
     elif args.input_mode == "online" and args.io_mode == "mujoco":
-        # parse natnet_Config
-        IOParser.parse_natnet_config()
-
-        # Set up Natnet client
-        pass
+        # Stream poses from Motive through NatNet
+        run_online_mode(args)
     elif args.input_mode == "online" and args.io_mode == "hardware":
         pass
     else:
@@ -1,18 +1,122 @@
 import os
+import sys
+import numpy as np
+import torch
 from torch.utils.data import Dataset
-import pandas as pd
+
+# Trajectory loading shared with the teleop offline mode (formatted CSV or binary .npy)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../teleop/src"))
+from ct_io.trajectory_io import load_trajectory_array, BINARY_EXTENSION, TRAJECTORY_EXTENSIONS
+import ct_math.ct_math as ctm
+
+# Per frame features: [qx, qy, qz, qw, px, py, pz] pose, then linear and angular velocity
+POSE_FEATURES = 7
+VELOCITY_FEATURES = 6
 
 class MotiveDataset(Dataset):
-    def __init__(self, dir, transform=None, target_transform=None):
+    """
+    Fixed-length sliding windows over every take in a directory
+
+    All takes are loaded once into one contiguous float32 tensor of shape (frames, bodies, 13),
+    takes back to back, with offsets[i]:offsets[i+1] the frames of take i. Frame f holds the pose
+    at f and the velocity from the previous frame to f, so the first frame of each take is dropped.
+    A sample is a view into that tensor, found by index arithmetic only.
+
+    The tensor is moved to shared memory, DataLoader workers use it without copying.
+    """
+    def __init__(self, dir, window_size=60, stride=1, rigid_bodies=("LFoot", "RFoot", "Waist"),
+                 apply_transform=True, drop_invalid=True, transform=None, target_transform=None):
         self.dir = dir
+        self.window_size = window_size
+        self.stride = stride
+        self.rigid_bodies = list(rigid_bodies)
+        self.apply_transform = apply_transform
         self.transform = transform
         self.target_transform = target_transform
 
+        data, offsets, self.take_names = self.process_data(dir)
+        window_starts = self.window_starts(data, offsets, drop_invalid)
+
+        self.data = torch.from_numpy(data).share_memory_()
+        self.offsets = torch.from_numpy(offsets).share_memory_()
+        self.starts = torch.from_numpy(window_starts).share_memory_()
+
     def __len__(self):
-        return len(self.img_labels)
+        return len(self.starts)
 
     def __getitem__(self, idx):
-        pass
-    
+        start = int(self.starts[idx])
+        window = self.data[start:start + self.window_size]
+
+        poses = window[:, :, :POSE_FEATURES]
+        velocities = window[:, :, POSE_FEATURES:]
+        if self.transform:
+            poses = self.transform(poses)
+        if self.target_transform:
+            velocities = self.target_transform(velocities)
+        return poses, velocities
+
+    def take_files(self, dir):
+        """Trajectory files in dir, the binary version of a take wins over its CSV"""
+        takes = {}
+        for file_name in sorted(os.listdir(dir)):
+            name, extension = os.path.splitext(file_name)
+            if extension in TRAJECTORY_EXTENSIONS and (name not in takes or extension == BINARY_EXTENSION):
+                takes[name] = os.path.join(dir, file_name)
+        return takes
+
+    def load_take(self, path):
+        """(N-1, bodies, 13) float32 array of one take"""
+        # CSV takes are parsed at full precision, so velocities match the ones teleop computes
+        data, header = load_trajectory_array(path, dtype=np.float64)
+        columns = header['columns']
+
+        # Pose columns of the selected rigid bodies, gathered in one indexing operation
+        pose_columns = [f"{name}:{kind}:{axis}" for name in self.rigid_bodies for kind, axis in ctm.POSE_COLUMNS]
+        missing = [col for col in pose_columns if col not in columns]
+        if missing:
+            raise ValueError(f"Take {path} is missing columns {missing}")
+
+        index = {col: i for i, col in enumerate(columns)}
+        poses = data[:, [index[col] for col in pose_columns]].astype(np.float64, copy=False)
+        timesteps = np.asarray(data[:, index["Time (Seconds)"]], dtype=np.float64)
+
+        if self.apply_transform:
+            ctm.apply_coordinate_transformation_array(poses, pose_columns)
+
+        poses = poses.reshape(len(poses), len(self.rigid_bodies), POSE_FEATURES)
+        linear_vels, angular_vels = ctm.batch_velocities(poses, timesteps)
+
+        return np.concatenate((poses[1:], linear_vels, angular_vels), axis=2).astype(np.float32)
+
     def process_data(self, dir):
-        df = pd.read_csv(dir)
+        """Load every take into one contiguous array, returns (data, offsets, take_names)"""
+        takes = self.take_files(dir)
+        if not takes:
+            raise ValueError(f"No trajectories found in {dir}")
+
+        arrays = [self.load_take(path) for path in takes.values()]
+
+        offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(array) for array in arrays])
+
+        data = np.empty((offsets[-1], len(self.rigid_bodies), POSE_FEATURES + VELOCITY_FEATURES), dtype=np.float32)
+        for array, start in zip(arrays, offsets[:-1]):
+            data[start:start + len(array)] = array
+
+        return data, offsets, list(takes.keys())
+
+    def window_starts(self, data, offsets, drop_invalid):
+        """First frame of every window that fits inside one take"""
+        # Prefix count of frames with NaNs (dropped tracking), a window is valid if it adds no NaN frame
+        invalid = np.isnan(data).any(axis=(1, 2))
+        invalid_before = np.concatenate(([0], np.cumsum(invalid)))
+
+        starts = []
+        for take_start, take_end in zip(offsets[:-1], offsets[1:]):
+            take_starts = np.arange(take_start, take_end - self.window_size + 1, self.stride)
+            if drop_invalid:
+                take_starts = take_starts[invalid_before[take_starts + self.window_size] == invalid_before[take_starts]]
+            starts.append(take_starts)
+
+        return np.concatenate(starts).astype(np.int64)
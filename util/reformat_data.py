@@ -1,71 +1,188 @@
 import os
+import io
+import sys
+import csv
+import argparse
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 
+# Binary trajectory format shared with the teleop offline mode
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../teleop/src"))
+from ct_io.trajectory_io import save_trajectory, BINARY_EXTENSION
+
 '''
     The data in the proccessed directory does to need to be reformated. It was already run through this script.
-    If you need to transfer a CSV from the motive format to the training format you can either call the function
-    in the scripts or change the raw data directory in the generate_reformatted_data() function
+    To convert Motive exports to the training format run this script on the raw data directory, e.g.
+
+        python3 util/reformat_data.py --input_dir training/dataset/TrackingDataV3 --output_dir training/dataset/FormattedDataV3
+
+    or call reformat_motive_csv() on a single file.
 '''
-def reformat_motive_csv(input_file, output_file):
-    raw = pd.read_csv(input_file, header=None)
+def read_motive_header(csv_file):
+    """
+    Parse the multi-row header of a Motive export from an open file
+
+    Reads up to and including the 'Frame,Time (Seconds),X,...' row, so the file is left at the first
+    data row.
+
+    Returns:
+        (columns, keep) where columns are Frame, Time (Seconds) and RigidBodyName:Rotation/Position:Axis
+        and keep are the indices of the data fields that belong to those columns
+    """
+    rigid_body_names = None
+    labels_row = None
+    previous_row = None
+
+    for line in csv_file:
+        row = next(csv.reader([line]))
+        if not row:
+            continue
 
-    # Detect header row
-    header_row_idx = raw.index[raw.iloc[:, 0] == "Frame"][0]
+        if len(row) > 1 and row[1] == "Name":
+            rigid_body_names = row[2:]
+        elif row[0] == "Frame":
+            # The Rotation/Position labels are the row right above the axis row
+            labels_row = previous_row[2:]
+            axes_row = row[2:]
+            break
+        previous_row = row
+    else:
+        raise ValueError(f"No 'Frame' header row found in {csv_file.name}")
 
-    # Load data without motive header
-    data = pd.read_csv(input_file, skiprows=header_row_idx)
+    if rigid_body_names is None:
+        raise ValueError(f"No rigid body 'Name' header row found in {csv_file.name}")
 
-    # Frame/Time
-    frame_time = data.iloc[:, :2].copy()
-    frame_time.columns = ["Frame", "Time (Seconds)"]
+    # Build column RigidBodyName:Rotation/Position:Axis
+    columns = ["Frame", "Time (Seconds)"]
+    keep = [0, 1]
+    for i, (rb_name, label, axis) in enumerate(zip(rigid_body_names, labels_row, axes_row)):
+        if rb_name == "":  # skip blanks
+            continue
+        columns.append(f"{rb_name}:{label}:{axis}")
+        keep.append(i + 2)
 
-    # Rigid body names
-    name_row_idx = raw.index[raw.iloc[:, 1] == "Name"][0]
-    rigid_body_names = raw.iloc[name_row_idx, 2:].tolist()
+    return columns, keep
 
-    # Rotation/Position labels
-    label_row_idx = raw.index[raw.iloc[:, 1] == "ID"][0] + 2
-    labels_row = raw.iloc[label_row_idx, 2:].tolist()
 
-    # Axis row
-    axes_row = raw.iloc[header_row_idx, 2:].tolist()
+def read_motive_export(input_file):
+    """
+    Read a Motive export in one pass
 
-    # Build column RigidBodyName:Rotation/Position:Axis
-    col_names = []
-    for rb_name, label, axis in zip(rigid_body_names, labels_row, axes_row):
-        if pd.isna(rb_name):  # skip blanks
-            continue
-        col_names.append(f"{rb_name}:{label}:{axis}")
+    Returns:
+        (columns, data_text) where data_text holds the data rows as CSV text, unchanged apart
+        from line endings and dropped unnamed columns
+    """
+    with open(input_file, 'r') as csv_file:
+        columns, keep = read_motive_header(csv_file)
+        data_text = csv_file.read()
 
-    # Assign columns
-    rigid_body_data = data.iloc[:, 2:]
-    rigid_body_data.columns = col_names
+    data_text = data_text.rstrip("\n") + "\n"
 
-    rigid_body_data = rigid_body_data.drop(index=0).reset_index(drop=True)
-    frame_time = frame_time.drop(index=0).reset_index(drop=True)
+    # Only rebuild the rows when some columns have to go
+    n_fields = data_text.count(",", 0, data_text.find("\n")) + 1
+    if keep != list(range(n_fields)):
+        rows = csv.reader(io.StringIO(data_text))
+        out = io.StringIO()
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerows([row[i] for i in keep] for row in rows)
+        data_text = out.getvalue()
+
+    return columns, data_text
+
+
+def write_formatted_csv(output_file, columns, data_text):
+    with open(output_file, 'w', newline='') as csv_file:
+        csv_file.write(",".join(columns) + "\n")
+        csv_file.write(data_text)
 
-    # Reformatted DataFrame
-    final_df = pd.concat([frame_time, rigid_body_data], axis=1)
+
+def reformat_motive_csv(input_file, output_file=None):
+    columns, data_text = read_motive_export(input_file)
 
     # Save
-    final_df.to_csv(output_file, index=False)
-    print(f"Reformatted CSV saved to {output_file}")
+    if output_file is not None:
+        write_formatted_csv(output_file, columns, data_text)
+        print(f"Reformatted CSV saved to {output_file}")
+
+    # Reformatted DataFrame
+    return pd.read_csv(io.StringIO(data_text), header=None, names=columns)
+
 
+def is_motive_export(input_file):
+    """Raw Motive exports start with the 'Format Version' metadata row"""
+    with open(input_file, 'r') as csv_file:
+        return csv_file.readline().startswith("Format Version")
 
-def generate_reformatted_data():
 
-    # Dir's for reading and saving 
-    raw_files_dir = "../dataset/TrackingDataV2/"
-    processed_files_dir = "../dataset/FormattedDataV2/"
+def is_up_to_date(input_file, output_file):
+    """Output exists and is not older than its input"""
+    return os.path.exists(output_file) and os.path.getmtime(output_file) >= os.path.getmtime(input_file)
+
+
+def convert_file(job):
+    """Process pool worker, returns the number of input bytes converted"""
+    input_file, output_file, output_format = job
+
+    if output_format == "binary":
+        # Raw Motive exports and already formatted CSVs both convert
+        if is_motive_export(input_file):
+            df = reformat_motive_csv(input_file)
+        else:
+            df = pd.read_csv(input_file)
+        save_trajectory(df, output_file)
+    else:
+        columns, data_text = read_motive_export(input_file)
+        write_formatted_csv(output_file, columns, data_text)
+
+    return os.path.getsize(input_file)
+
+
+def convert_directory(input_dir, output_dir, output_format="csv", workers=None, force=False):
+    """Convert every CSV in input_dir in parallel, skipping outputs that are up to date"""
+    extension = ".csv" if output_format == "csv" else BINARY_EXTENSION
 
     # Create the output directory if it does not already exist
-    os.makedirs(processed_files_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs = []
+    skipped = 0
+    for file_name in sorted(os.listdir(input_dir)):
+        input_file = os.path.join(input_dir, file_name)
+        if not (os.path.isfile(input_file) and file_name.endswith(".csv")):
+            continue
+        output_file = os.path.join(output_dir, os.path.splitext(file_name)[0] + extension)
+        if not force and is_up_to_date(input_file, output_file):
+            skipped += 1
+            continue
+        jobs.append((input_file, output_file, output_format))
+
+    start_time = perf_counter()
+    total_bytes = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for converted_bytes in executor.map(convert_file, jobs, chunksize=max(1, len(jobs) // 64)):
+                total_bytes += converted_bytes
+    elapsed_time = perf_counter() - start_time
+
+    print(f"Converted {len(jobs)} files, skipped {skipped} up to date, in {elapsed_time:.2f} s")
+    if jobs and elapsed_time > 0:
+        print(f"Throughput: {len(jobs) / elapsed_time:.1f} files/s, {total_bytes / elapsed_time / 2**20:.1f} MiB/s")
+
+    return len(jobs), skipped
+
+
+def main():
+    parser = argparse.ArgumentParser("Convert Motive CSV exports to the formatted CSV or binary trajectory format")
+    parser.add_argument('--input_dir', type=str, required=True, help="Directory of Motive exports")
+    parser.add_argument('--output_dir', type=str, required=True, help="Directory for the converted files")
+    parser.add_argument('--format', choices=['csv', 'binary'], default='csv', help="Formatted CSV or .npy binary trajectory")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--force', action='store_true', help="Convert files even if the output is up to date")
+    args = parser.parse_args()
+
+    convert_directory(args.input_dir, args.output_dir, args.format, args.workers, args.force)
 
-    # Loop through input directory and run the reformatter on each file
-    for file_name in os.listdir(raw_files_dir):
-        raw_full_path = os.path.join(raw_files_dir, file_name)
-        processed_full_path = os.path.join(processed_files_dir, file_name)
-        if os.path.isfile(raw_full_path):
-            reformat_motive_csv(raw_full_path, processed_full_path)
 
-generate_reformatted_data()
\ No newline at end of file
+if __name__ == "__main__":
+    main()